@@ -0,0 +1,129 @@
+"""This benchmark measures how the time and memory taken to build an
+AncestryIndex grow with the size of the graph.
+
+Two kinds of synthetic graphs are built for each size. In the "tree"
+graphs, most records have one advisor and a few have a second, like
+real advisor trees. In the "deep" graphs, every record has two or
+three advisors among the records just before it, so most records have
+thousands of ancestors. For each graph, the time to add the records
+and label them (the first query), the peak memory allocated while
+doing so (measured in a second, slower build), the time per
+is_ancestor query, and the time per record to add the last quarter
+of the records one at a time with an is_ancestor query after each
+(as when querying while records stream in) are reported.
+
+Running:
+```
+$ poetry run python benchmarks/ancestry_scaling.py
+$ poetry run python benchmarks/ancestry_scaling.py --tree-sizes 250000
+```
+
+"""
+
+from geneagrapher_core.ancestry import AncestryIndex
+from geneagrapher_core.record import RecordId
+
+import argparse
+import random
+import time
+import tracemalloc
+
+
+def make_records(kind, size, rng):
+    records = []
+    for rid in range(size):
+        if rid == 0:
+            advisors = []
+        elif kind == "tree":
+            advisors = [rng.randrange(rid)]
+            if rid > 1 and rng.random() < 0.05:
+                advisors.append(rng.randrange(rid))
+        else:
+            window = range(max(0, rid - 50), rid)
+            advisors = rng.sample(window, min(len(window), rng.randint(2, 3)))
+        records.append(
+            {
+                "id": RecordId(rid),
+                "name": "",
+                "institution": None,
+                "year": None,
+                "descendants": [],
+                "advisors": sorted(set(advisors)),
+            }
+        )
+    rng.shuffle(records)
+    return records
+
+
+def build(records):
+    index = AncestryIndex()
+    index.extend(records)
+    index.descendant_count(records[0]["id"])
+    return index
+
+
+def measure(records, num_queries, rng):
+    start = time.perf_counter()
+    index = build(records)
+    build_time = time.perf_counter() - start
+
+    tracemalloc.start()
+    build(records)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    pairs = [
+        (RecordId(rng.randrange(len(records))), RecordId(rng.randrange(len(records))))
+        for _ in range(num_queries)
+    ]
+    start = time.perf_counter()
+    for a, b in pairs:
+        index.is_ancestor(a, b)
+    query = (time.perf_counter() - start) / num_queries
+
+    num_streamed = max(1, len(records) // 4)
+    index = build(records[:-num_streamed])
+    ancestors = [r["id"] for r in rng.choices(records[:-num_streamed], k=num_streamed)]
+    start = time.perf_counter()
+    for a, record in zip(ancestors, records[-num_streamed:]):
+        index.add(record)
+        index.is_ancestor(a, record["id"])
+    stream = (time.perf_counter() - start) / num_streamed
+    return build_time, peak, query, stream
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--tree-sizes", type=int, nargs="+", default=[10000, 40000, 100000]
+    )
+    parser.add_argument(
+        "--deep-sizes", type=int, nargs="+", default=[2500, 5000, 10000]
+    )
+    parser.add_argument("--queries", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    header = (
+        "graph",
+        "records",
+        "build (s)",
+        "peak (MiB)",
+        "query (us)",
+        "stream (us)",
+    )
+    print(f"{header[0]:<8}{header[1]:>10}" + "".join(f"{h:>12}" for h in header[2:]))
+    for kind, sizes in (("tree", args.tree_sizes), ("deep", args.deep_sizes)):
+        for size in sizes:
+            rng = random.Random(args.seed)
+            build, peak, query, stream = measure(
+                make_records(kind, size, rng), args.queries, rng
+            )
+            print(
+                f"{kind:<8}{size:>10}{build:>12.2f}{peak / 2**20:>12.1f}"
+                f"{query * 1e6:>12.2f}{stream * 1e6:>12.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
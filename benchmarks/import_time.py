@@ -0,0 +1,105 @@
+"""This benchmark measures the cold start cost of the package: the time
+taken to import its modules in a fresh interpreter and the time taken
+to set up the first HTTP connector.
+
+Each module is imported in a new Python process with `-X importtime`,
+several times, and the fastest run is reported along with the
+top-level packages that took the most time to import in that run. The
+time to build the first connector for the Math Genealogy Project
+(which reads the intermediate certificate) and the time to build later
+connectors (which reuse the SSL context) are reported as well.
+
+Running:
+```
+$ poetry run python benchmarks/import_time.py
+$ poetry run python benchmarks/import_time.py --modules geneagrapher_core.record
+```
+
+"""
+
+import argparse
+from collections import Counter
+import subprocess
+import sys
+
+DEFAULT_MODULES = [
+    "geneagrapher_core.record",
+    "geneagrapher_core.traverse",
+    "geneagrapher_core.sync",
+    "geneagrapher_core.server",
+]
+
+CONNECTOR_SCRIPT = """
+import asyncio, time
+from geneagrapher_core.record import build_intermediate_connector
+
+async def main():
+    start = time.perf_counter()
+    await build_intermediate_connector().close()
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(10):
+        await build_intermediate_connector().close()
+    later = (time.perf_counter() - start) / 10
+    print(first, later)
+
+asyncio.run(main())
+"""
+
+
+def import_times(module):
+    """Import a module in a new interpreter and return the total
+    import time and the self time of each top-level package, in
+    microseconds.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total = 0
+    packages = Counter()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        packages[name.strip().split(".")[0]] += int(self_us)
+        if name.strip() == module:
+            total = int(cumulative_us)
+    return total, packages
+
+
+def connector_times():
+    result = subprocess.run(
+        [sys.executable, "-c", CONNECTOR_SCRIPT],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    first, later = result.stdout.split()
+    return float(first), float(later)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+
+    for module in args.modules:
+        total, packages = min(
+            (import_times(module) for _ in range(args.repeat)), key=lambda r: r[0]
+        )
+        print(f"{module}: {total / 1000:.1f} ms")
+        for name, self_us in packages.most_common(args.top):
+            print(f"    {name:<24}{self_us / 1000:>8.1f} ms")
+
+    first, later = connector_times()
+    print(f"first connector: {first * 1000:.2f} ms")
+    print(f"later connectors: {later * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""This benchmark measures the time taken by compute_layout for
+synthetic advisor trees of the given sizes.
+
+In each tree, most records have one advisor among the records before
+them and a few have a second, like real advisor trees. Each record
+lists its advisors and its students, as records retrieved by
+build_graph do. The time to assign generations alone (compute_layout
+with no ordering sweeps) and the time for a full layout with the
+default number of sweeps are reported, each the best of several
+repeats.
+
+Running:
+```
+$ poetry run python benchmarks/layout.py
+$ poetry run python benchmarks/layout.py --sizes 500000
+```
+
+"""
+
+from geneagrapher_core.layout import compute_layout
+from geneagrapher_core.record import RecordId
+
+import argparse
+import random
+import time
+
+
+def make_graph(size, rng):
+    advisors = {0: []}
+    students = {0: []}
+    for rid in range(1, size):
+        advisors[rid] = [rng.randrange(rid)]
+        if rid > 1 and rng.random() < 0.05:
+            advisors[rid].append(rng.randrange(rid))
+        advisors[rid] = sorted(set(advisors[rid]))
+        students[rid] = []
+        for a in advisors[rid]:
+            students[a].append(rid)
+    nodes = {
+        RecordId(rid): {
+            "id": RecordId(rid),
+            "name": "",
+            "institution": None,
+            "year": None,
+            "descendants": students[rid],
+            "advisors": advisors[rid],
+        }
+        for rid in range(size)
+    }
+    return {"start_nodes": [RecordId(0)], "nodes": nodes, "status": "complete"}
+
+
+def timed(ggraph, sweeps, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        compute_layout(ggraph, sweeps)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 200000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    header = ("records", "generations (s)", "layout (s)")
+    print(f"{header[0]:>10}" + "".join(f"{h:>18}" for h in header[1:]))
+    for size in args.sizes:
+        ggraph = make_graph(size, random.Random(args.seed))
+        generations = timed(ggraph, 0, args.repeat)
+        layout = timed(ggraph, 4, args.repeat)
+        print(f"{size:>10}{generations:>18.2f}{layout:>18.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""This benchmark measures the time and memory taken to parse record
+pages.
+
+Each extractor in geneagrapher_core.record (has_record, get_name,
+get_institution, get_year, get_descendants, and get_advisors) is run on
+every page in tests/testdata_records and on synthetic pages with very
+large descendant tables. The full parse done by get_record_inner
+(decoding the response, building the tree, and running every
+extractor) is measured as well, with a fake HTTP client that returns
+the page.
+
+For each function, the best time per page over several repeats and
+the peak memory allocated while processing the pages, divided by the
+number of pages, are reported. The results can be saved
+as a baseline and later runs compared against it. A comparison exits
+with a non-zero status if any function became slower than the allowed
+ratio.
+
+Running:
+```
+$ poetry run python benchmarks/parser.py
+$ poetry run python benchmarks/parser.py --save-baseline parser-baseline.json
+$ poetry run python benchmarks/parser.py --baseline parser-baseline.json
+
+# Profile the full parse of the synthetic pages, by time or by the
+# lines that allocated the most memory.
+$ poetry run python benchmarks/parser.py --profile
+$ poetry run python benchmarks/parser.py --allocations
+```
+
+"""
+
+from geneagrapher_core.record import (
+    RecordId,
+    get_advisors,
+    get_descendants,
+    get_institution,
+    get_name,
+    get_record_inner,
+    get_year,
+    has_record,
+)
+
+import argparse
+import asyncio
+from bs4 import BeautifulSoup
+import cProfile
+import json
+from pathlib import Path
+import pstats
+import sys
+import time
+import tracemalloc
+
+TESTDATA_DIR = Path(__file__).absolute().parent.parent / "tests" / "testdata_records"
+EXTRACTORS = [
+    has_record,
+    get_name,
+    get_institution,
+    get_year,
+    get_descendants,
+    get_advisors,
+]
+
+
+class FakeContent:
+    def __init__(self, body):
+        self.body = body
+
+    async def iter_chunked(self, n):
+        for i in range(0, len(self.body), n):
+            yield self.body[i : i + n]
+
+    async def read(self):
+        return b""
+
+
+class FakeResponse:
+    charset = "utf-8"
+
+    def __init__(self, body):
+        self.content = FakeContent(body)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+
+class FakeClient:
+    """A client session that returns the same page for every
+    request.
+    """
+
+    def __init__(self, body):
+        self.body = body
+
+    def get(self, url):
+        return FakeResponse(self.body)
+
+
+def load_corpus():
+    return {path.stem: path.read_text() for path in sorted(TESTDATA_DIR.glob("*.html"))}
+
+
+def make_huge_page(num_descendants):
+    """Return a copy of a record page with ``num_descendants`` rows in
+    its descendants table.
+    """
+    page = (TESTDATA_DIR / "51506.html").read_text()
+    rows = "".join(
+        f'<tr ><td><a href="id.php?id={i}">Student {i}</a></td>'
+        "<td>Universiteit van Amsterdam</td>"
+        '<td style="padding-left: 2px; padding-right: 2px">2000</td>'
+        '<td style="text-align: center"></td></tr>\n'
+        for i in range(1_000_000, 1_000_000 + num_descendants)
+    )
+    return page.replace("</table>", rows + "</table>", 1)
+
+
+def parse_record(page):
+    client = FakeClient(page.encode())
+    return asyncio.run(get_record_inner(RecordId(1), client))
+
+
+def make_cases(pages):
+    """Return (name, function) pairs to measure. Each function
+    processes every page once.
+    """
+    soups = [BeautifulSoup(page, "html.parser") for page in pages]
+    cases = [
+        ("BeautifulSoup", lambda: [BeautifulSoup(p, "html.parser") for p in pages])
+    ]
+    for extractor in EXTRACTORS:
+        cases.append((extractor.__name__, lambda f=extractor: [f(s) for s in soups]))
+    cases.append(("get_record_inner", lambda: [parse_record(p) for p in pages]))
+    return cases
+
+
+def measure(function, num_pages, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"time_us": best / num_pages * 1e6, "peak_kib": peak / num_pages / 1024}
+
+
+def run(corpora, repeat):
+    results = {}
+    for corpus_name, pages in corpora.items():
+        for name, function in make_cases(pages):
+            results[f"{corpus_name}/{name}"] = measure(function, len(pages), repeat)
+    return results
+
+
+def profile(pages, limit):
+    profiler = cProfile.Profile()
+    profiler.enable()
+    for page in pages:
+        parse_record(page)
+    profiler.disable()
+    pstats.Stats(profiler).sort_stats("cumulative").print_stats(limit)
+
+
+def profile_allocations(pages, limit):
+    tracemalloc.start()
+    records = [parse_record(page) for page in pages]
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    del records
+    for stat in snapshot.statistics("lineno")[:limit]:
+        print(stat)
+
+
+def compare(results, baseline, max_ratio):
+    """Print each result next to its baseline and return True if none
+    are slower than ``max_ratio`` times the baseline.
+    """
+    ok = True
+    print(f"{'function':<36}{'baseline':>12}{'now':>12}{'ratio':>8}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]["time_us"]
+        ratio = result["time_us"] / before
+        flag = ""
+        if ratio > max_ratio:
+            ok = False
+            flag = "  slower"
+        print(f"{name:<36}{before:>12.1f}{result['time_us']:>12.1f}{ratio:>8.2f}{flag}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--huge-descendants",
+        type=int,
+        default=5000,
+        help="the number of descendants on each synthetic page",
+    )
+    parser.add_argument("--huge-pages", type=int, default=3)
+    parser.add_argument("--profile", action="store_true")
+    parser.add_argument("--allocations", action="store_true")
+    parser.add_argument("--profile-limit", type=int, default=25)
+    parser.add_argument("--baseline", help="a baseline file to compare against")
+    parser.add_argument("--save-baseline", help="a file to save the results to")
+    parser.add_argument(
+        "--max-ratio",
+        type=float,
+        default=1.2,
+        help="the largest allowed ratio of a time to its baseline",
+    )
+    args = parser.parse_args()
+
+    corpora = {
+        "corpus": list(load_corpus().values()),
+        "huge": [make_huge_page(args.huge_descendants)] * args.huge_pages,
+    }
+
+    if args.profile:
+        profile(corpora["huge"], args.profile_limit)
+        return
+    if args.allocations:
+        profile_allocations(corpora["huge"], args.profile_limit)
+        return
+
+    results = run(corpora, args.repeat)
+    print(f"{'function':<36}{'time/page (us)':>16}{'peak/page (KiB)':>17}")
+    for name, result in results.items():
+        print(f"{name:<36}{result['time_us']:>16.1f}{result['peak_kib']:>17.1f}")
+
+    if args.save_baseline is not None:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline is not None:
+        print()
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, args.max_ratio):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""This benchmark compares the memory used by LifecycleTracking and
+CompactLifecycleTracking when tracking a traversal over many records.
+
+Each tracker is filled with the given number of record IDs, which are
+then moved through the todo, doing, and done states the same way
+build_graph does. The memory held by the tracker once all records are
+done and the peak memory allocated along the way are reported, along
+with the time taken.
+
+Running:
+```
+$ poetry run python benchmarks/tracking_memory.py
+$ poetry run python benchmarks/tracking_memory.py --records 1000000
+```
+
+"""
+
+from geneagrapher_core.record import RecordId
+from geneagrapher_core.traverse import (
+    CompactLifecycleTracking,
+    LifecycleTracking,
+    TraverseDirection,
+    TraverseItem,
+)
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+
+async def traverse(tracking_class, num_records, concurrency):
+    tracking = tracking_class(
+        [TraverseItem(RecordId(1), TraverseDirection.DESCENDANTS)], None
+    )
+    for rid in range(2, num_records + 1):
+        await tracking.create(RecordId(rid), TraverseDirection.DESCENDANTS)
+
+    doing = []
+    while tracking.num_todo > 0 or doing:
+        while tracking.num_todo > 0 and len(doing) < concurrency:
+            doing.append((await tracking.start_next()).id)
+        await tracking.finish(doing.pop(), True)
+    return tracking
+
+
+def run(tracking_class, num_records, concurrency):
+    # Time the traversal without tracing allocations, which slows it
+    # down considerably.
+    start = time.perf_counter()
+    asyncio.run(traverse(tracking_class, num_records, concurrency))
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    tracking = asyncio.run(traverse(tracking_class, num_records, concurrency))
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tracking
+
+    return current, peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--records", type=int, default=300_000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{args.records} records")
+    print(f"{'tracker':<26}{'done (MiB)':>12}{'peak (MiB)':>12}{'time (s)':>10}")
+    for tracking_class in (LifecycleTracking, CompactLifecycleTracking):
+        current, peak, elapsed = run(tracking_class, args.records, args.concurrency)
+        print(
+            f"{tracking_class.__name__:<26}{current / 2**20:>12.1f}"
+            f"{peak / 2**20:>12.1f}{elapsed:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
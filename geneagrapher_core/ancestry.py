@@ -0,0 +1,447 @@
+from geneagrapher_core.record import Record, RecordId
+from geneagrapher_core.traverse import Geneagraph
+
+from array import array
+import asyncio
+from bisect import bisect_left, bisect_right
+from typing import Iterable, Iterator, List, Set
+
+
+class Reachability:
+    """Interval labels for the records reachable from each record by
+    following edges in one direction.
+
+    The records are numbered in post-order over a spanning forest of
+    the edges, so the records in each record's spanning subtree have
+    consecutive numbers. The records reachable from a record are then
+    a short list of number intervals: its own subtree plus the
+    intervals of records reached over edges outside the spanning
+    forest. For tree-like graphs, such as advisor trees, most records
+    have one interval.
+
+    :param order: record positions ordered so that every edge goes
+        from an earlier record to a later one
+    :param edges: the positions each position has edges to
+    """
+
+    def __init__(self, order: List[int], edges: List[Set[int]]) -> None:
+        size = len(order)
+        rank = array("q", bytes(8 * size))
+        for i, pos in enumerate(order):
+            rank[pos] = i
+
+        # Follow only edges that go forward in the order, which breaks
+        # any cycles.
+        forward = [
+            sorted((t for t in edges[pos] if rank[t] > rank[pos]), key=rank.__getitem__)
+            for pos in range(size)
+        ]
+        tree_children: List[List[int]] = [[] for _ in range(size)]
+        has_parent = bytearray(size)
+        for pos in order:
+            for t in forward[pos]:
+                if not has_parent[t]:
+                    has_parent[t] = 1
+                    tree_children[pos].append(t)
+
+        self.post = array("q", bytes(8 * size))
+        self.at_post = array("q", bytes(8 * size))
+        low = array("q", bytes(8 * size))
+        counter = 0
+        for root in order:
+            if has_parent[root]:
+                continue
+            low[root] = counter
+            stack = [(root, iter(tree_children[root]))]
+            while stack:
+                (pos, children) = stack[-1]
+                child = next(children, None)
+                if child is None:
+                    stack.pop()
+                    self.post[pos] = counter
+                    self.at_post[counter] = pos
+                    counter += 1
+                else:
+                    low[child] = counter
+                    stack.append((child, iter(tree_children[child])))
+
+        # Each record's intervals, flattened into [start, end, start,
+        # end, ...] with inclusive ends, are merged from its own
+        # subtree and the intervals of every record it has an edge to.
+        self.intervals: List[array[int]] = [array("q")] * size
+        for pos in reversed(order):
+            start = low[pos]
+            end = self.post[pos]
+            targets = forward[pos]
+            if all(
+                len(self.intervals[t]) == 2 and start <= low[t] and self.post[t] <= end
+                for t in targets
+            ):
+                # Every record reached is in this record's subtree,
+                # which is the common case in a tree.
+                self.intervals[pos] = array("q", (start, end))
+                continue
+            spans = [(start, end)]
+            for t in targets:
+                it = iter(self.intervals[t])
+                spans.extend(zip(it, it))
+            spans.sort()
+            merged = [spans[0][0], spans[0][1]]
+            for start, end in spans:
+                if start <= merged[-1] + 1:
+                    if end > merged[-1]:
+                        merged[-1] = end
+                else:
+                    merged.append(start)
+                    merged.append(end)
+            self.intervals[pos] = array("q", merged)
+
+    def reaches(self, source: int, target: int) -> bool:
+        """Return True if ``target`` is reachable from ``source`` (or
+        is ``source``).
+        """
+        spans = self.intervals[source]
+        post = self.post[target]
+        i = bisect_right(spans, post)
+        # An odd index means that post is within an interval, and an
+        # index after an end means that post is that end.
+        return i % 2 == 1 or (i > 0 and spans[i - 1] == post)
+
+    def count(self, source: int) -> int:
+        """Return the number of records reachable from ``source``,
+        including ``source``.
+        """
+        spans = self.intervals[source]
+        return sum(end - start + 1 for start, end in zip(spans[::2], spans[1::2]))
+
+    def reachable(self, source: int) -> Iterator[int]:
+        """Yield the positions reachable from ``source``, including
+        ``source``.
+        """
+        spans = self.intervals[source]
+        for start, end in zip(spans[::2], spans[1::2]):
+            for post in range(start, end + 1):
+                yield self.at_post[post]
+
+
+class NewEdges:
+    """The edges added since labelling that go from a labelled record
+    to an unlabelled one, ordered by the labelled record's post-order
+    number so that the edges from the records in an interval can be
+    found with a binary search.
+    """
+
+    def __init__(self) -> None:
+        self.posts: List[int] = []
+        self.targets: List[int] = []
+
+    def add(self, post: int, target: int) -> None:
+        i = bisect_right(self.posts, post)
+        self.posts.insert(i, post)
+        self.targets.insert(i, target)
+
+    def within(self, start: int, end: int) -> List[int]:
+        """Return the targets of the edges from the records numbered
+        ``start`` through ``end``.
+        """
+        return self.targets[
+            bisect_left(self.posts, start) : bisect_right(self.posts, end)
+        ]
+
+
+class PartialReach:
+    """The records reachable from a record by following edges in one
+    direction when the records from position ``labelled`` onward were
+    added after the :class:`Reachability` labels were computed.
+
+    Every edge added since then has an unlabelled end, so the search
+    only follows the new edges. The labelled records reached are kept
+    as intervals of the labels' post-order numbers.
+
+    :param labels: the labels of the records before ``labelled``
+    :param edges: the positions each position has edges to
+    :param new_edges: the edges from labelled to unlabelled records
+    :param labelled: the number of labelled positions
+    :param source: the position to start from
+    """
+
+    def __init__(
+        self,
+        labels: Reachability,
+        edges: List[Set[int]],
+        new_edges: NewEdges,
+        labelled: int,
+        source: int,
+    ) -> None:
+        self.labels = labels
+        self.labelled = labelled
+        # The post-order numbers of the labelled records reached, as
+        # merged intervals flattened into [start, end, start, end, ...].
+        self.spans: List[int] = []
+        self.unlabelled: Set[int] = set()
+        stack = [source]
+        while stack:
+            pos = stack.pop()
+            if pos >= labelled:
+                if pos not in self.unlabelled:
+                    self.unlabelled.add(pos)
+                    stack.extend(edges[pos])
+            elif not self.reaches(pos):
+                # A labelled record that was already reached adds
+                # nothing, because its labels are within the labels of
+                # the record it was reached from.
+                it = iter(labels.intervals[pos])
+                for start, end in zip(it, it):
+                    self.insert(start, end)
+                    stack.extend(new_edges.within(start, end))
+
+    def insert(self, start: int, end: int) -> None:
+        spans = self.spans
+        # Merge with the intervals that overlap or touch [start, end].
+        lo = bisect_left(spans, start - 1)
+        if lo % 2 == 1:
+            lo -= 1
+            start = spans[lo]
+        elif lo < len(spans):
+            start = min(start, spans[lo])
+        hi = bisect_right(spans, end + 1)
+        if hi % 2 == 1:
+            end = spans[hi]
+            hi += 1
+        elif hi > lo:
+            end = max(end, spans[hi - 1])
+        spans[lo:hi] = (start, end)
+
+    def reaches(self, target: int) -> bool:
+        if target >= self.labelled:
+            return target in self.unlabelled
+        post = self.labels.post[target]
+        i = bisect_right(self.spans, post)
+        return i % 2 == 1 or (i > 0 and self.spans[i - 1] == post)
+
+    def count(self) -> int:
+        spans = self.spans
+        return len(self.unlabelled) + sum(
+            end - start + 1 for start, end in zip(spans[::2], spans[1::2])
+        )
+
+
+class AncestryIndex:
+    """An index over advisor relationships that answers ancestry
+    queries without traversing the graph.
+
+    Adding a record only records its edges. A query labels every
+    record in one pass over the graph in topological order (see
+    :class:`Reachability`), after which queries take a binary search
+    or a walk over a few intervals. Records can be added in any order
+    (e.g., as they stream in from :func:`build_graph
+    <geneagrapher_core.traverse.build_graph>`); an edge becomes part of
+    the index as soon as both of its records have been added.
+
+    Labelling again for every query would make querying while records
+    stream in take time proportional to the size of the graph per
+    record. Instead, until an eighth of the records (or
+    ``MIN_UNLABELLED`` records, if more) have been added since the last
+    labelling, :meth:`is_ancestor`, :meth:`ancestor_count` and
+    :meth:`descendant_count` combine the labels with a search over the
+    edges added since then.
+
+    Record IDs that have not been added raise :class:`KeyError`.
+    """
+
+    #: The number of records that can always be added after labelling
+    #: before a query labels the index again.
+    MIN_UNLABELLED = 64
+    DIV = 4
+
+    def __init__(self) -> None:
+        self.positions: dict[RecordId, int] = {}
+        self.ids: List[RecordId] = []
+        self.advisors: List[Set[int]] = []
+        self.students: List[Set[int]] = []
+
+        # Map record IDs that have not been added yet to the positions
+        # of added records that refer to them as an advisor or as a
+        # descendant.
+        self.waiting_advisors: dict[int, List[int]] = {}
+        self.waiting_descendants: dict[int, List[int]] = {}
+
+        self.order: List[int] = []
+        self.descendant_labels = Reachability([], [])
+        self.ancestor_labels = Reachability([], [])
+        self.labelled = 0
+        self.new_students = NewEdges()
+        self.new_advisors = NewEdges()
+
+    @classmethod
+    def from_graph(cls, ggraph: Geneagraph) -> "AncestryIndex":
+        """Build an index containing every record in a graph."""
+        index = cls()
+        index.extend(ggraph["nodes"].values())
+        return index
+
+    def __contains__(self, id: object) -> bool:
+        return id in self.positions
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def extend(self, records: Iterable[Record]) -> None:
+        for record in records:
+            self.add(record)
+
+    def add(self, record: Record) -> None:
+        """Add a record to the index. Adding a record that is already
+        in the index does nothing.
+        """
+        rid = record["id"]
+        if rid in self.positions:
+            return
+
+        pos = len(self.ids)
+        self.positions[rid] = pos
+        self.ids.append(rid)
+        self.advisors.append(set())
+        self.students.append(set())
+
+        for a in self.waiting_descendants.pop(rid, []):
+            self.add_edge(a, pos)
+        for d in self.waiting_advisors.pop(rid, []):
+            self.add_edge(pos, d)
+        for a in record["advisors"]:
+            if a in self.positions:
+                self.add_edge(self.positions[RecordId(a)], pos)
+            else:
+                self.waiting_advisors.setdefault(a, []).append(pos)
+        for d in record["descendants"]:
+            if d in self.positions:
+                self.add_edge(pos, self.positions[RecordId(d)])
+            else:
+                self.waiting_descendants.setdefault(d, []).append(pos)
+
+    def add_edge(self, advisor: int, student: int) -> None:
+        if advisor == student:
+            return
+        self.students[advisor].add(student)
+        self.advisors[student].add(advisor)
+        # One of the records was just added, so it is not labelled.
+        if advisor < self.labelled:
+            self.new_students.add(self.descendant_labels.post[advisor], student)
+        elif student < self.labelled:
+            self.new_advisors.add(self.ancestor_labels.post[student], advisor)
+
+    async def record_callback(self, tg: asyncio.TaskGroup, record: Record) -> None:
+        """Add a record as it is retrieved. This has the signature
+        expected of the ``record_callback`` argument to
+        :func:`build_graph <geneagrapher_core.traverse.build_graph>`.
+        """
+        self.add(record)
+
+    def label(self) -> None:
+        """Label the records for queries if records were added since
+        they were last labelled.
+        """
+        if self.labelled == len(self.ids):
+            return
+
+        # Kahn's algorithm, with advisors before their students.
+        num_advisors = [len(a) for a in self.advisors]
+        ready = [p for p in range(len(self.ids)) if num_advisors[p] == 0]
+        order = []
+        while ready:
+            pos = ready.pop()
+            order.append(pos)
+            for s in self.students[pos]:
+                num_advisors[s] -= 1
+                if num_advisors[s] == 0:
+                    ready.append(s)
+        if len(order) < len(self.ids):
+            # The remaining records are in or below advisor cycles,
+            # which are errors in the data. Their edges that go
+            # backward in this order are ignored.
+            placed = set(order)
+            order.extend(p for p in range(len(self.ids)) if p not in placed)
+
+        self.order = order
+        self.descendant_labels = Reachability(order, self.students)
+        self.ancestor_labels = Reachability(order[::-1], self.advisors)
+        self.labelled = len(self.ids)
+        self.new_students = NewEdges()
+        self.new_advisors = NewEdges()
+
+    def label_if_stale(self) -> bool:
+        """Label the records if many were added since they were last
+        labelled. Return True if some records are still unlabelled.
+        """
+        num_unlabelled = len(self.ids) - self.labelled
+        if num_unlabelled > max(AncestryIndex.MIN_UNLABELLED, len(self.ids) // 8):
+            self.label()
+            return False
+        return num_unlabelled > 0
+
+    def descendants_of(self, pos: int) -> PartialReach:
+        return PartialReach(
+            self.descendant_labels,
+            self.students,
+            self.new_students,
+            self.labelled,
+            pos,
+        )
+
+    def ancestors_of(self, pos: int) -> PartialReach:
+        return PartialReach(
+            self.ancestor_labels, self.advisors, self.new_advisors, self.labelled, pos
+        )
+
+    def is_ancestor(self, ancestor: RecordId, id: RecordId) -> bool:
+        """Return True if ``ancestor`` is an academic ancestor of
+        ``id`` and False otherwise.
+        """
+        a = self.positions[ancestor]
+        p = self.positions[id]
+        if a == p:
+            return False
+        if self.label_if_stale():
+            return self.descendants_of(a).reaches(p)
+        return self.descendant_labels.reaches(a, p)
+
+    def ancestor_count(self, id: RecordId) -> int:
+        pos = self.positions[id]
+        if self.label_if_stale():
+            return self.ancestors_of(pos).count() - 1
+        return self.ancestor_labels.count(pos) - 1
+
+    def descendant_count(self, id: RecordId) -> int:
+        pos = self.positions[id]
+        if self.label_if_stale():
+            return self.descendants_of(pos).count() - 1
+        return self.descendant_labels.count(pos) - 1
+
+    def lowest_common_ancestors(self, id1: RecordId, id2: RecordId) -> set[RecordId]:
+        """Return the common ancestors of two records that do not have
+        a descendant that is also a common ancestor. A record counts
+        as its own ancestor here, so if one record is an ancestor of
+        the other, it is the result.
+        """
+        pos1 = self.positions[id1]
+        pos2 = self.positions[id2]
+        self.label()
+        common = {
+            c
+            for c in self.ancestor_labels.reachable(pos1)
+            if self.ancestor_labels.reaches(pos2, c)
+        }
+        # If a descendant of a common ancestor is also a common
+        # ancestor, so is one of its students.
+        return {
+            self.ids[c]
+            for c in common
+            if not any(s in common for s in self.students[c])
+        }
+
+    def topological_order(self) -> List[RecordId]:
+        """Return the record IDs ordered so that every record comes
+        after all of its ancestors.
+        """
+        self.label()
+        return [self.ids[p] for p in self.order]
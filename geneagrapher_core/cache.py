@@ -0,0 +1,340 @@
+from geneagrapher_core.record import BatchCache, Cache, CacheResult, Record, RecordId
+
+import asyncio
+import math
+import time
+from types import TracebackType
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Literal,
+    Optional,
+    Tuple,
+    Type,
+    TypedDict,
+    cast,
+)
+
+
+class StoredRecord(TypedDict):
+    """A record as :class:`StaleWhileRevalidateCache` stores it in the
+    cache it wraps, with the time it was fetched.
+    """
+
+    stored_at: float
+    record: Optional[Record]
+
+
+def unwrap_stored(value: Any) -> Optional[StoredRecord]:
+    """Return a cached value as a :class:`StoredRecord`, or None if it
+    was not stored by a :class:`StaleWhileRevalidateCache`.
+    """
+    if isinstance(value, dict) and value.keys() == {"stored_at", "record"}:
+        return cast(StoredRecord, value)
+    return None
+
+
+class StaleWhileRevalidateCache:
+    """A :class:`Cache <geneagrapher_core.record.Cache>` wrapper that
+    keeps cached records fresh without making callers wait for HTTP
+    requests.
+
+    Each record is stored in the wrapped cache together with the time
+    it was stored, as a :class:`StoredRecord`, so record ages survive
+    restarts and are shared by every process using the cache. A record
+    younger than ``soft_ttl`` is returned as a hit. A record older
+    than ``soft_ttl`` but younger than ``hard_ttl`` is also returned
+    as a hit, and a background task is started to fetch it again
+    (only one per record at a time). A record older than ``hard_ttl``
+    is reported as a miss, so the caller fetches it and waits.
+
+    Values in the wrapped cache that were not stored by this wrapper
+    have no known age and are reported as misses, so the records are
+    fetched again and stored with their time.
+
+    :param cache: the cache to wrap
+    :param fetch: a function that fetches a record without using the
+        cache, such as ``functools.partial(get_record_inner, client=client)``
+    :param soft_ttl: the age in seconds after which records are refreshed
+        in the background
+    :param hard_ttl: the age in seconds after which records are not returned
+    :param clock: a function returning the current time in seconds
+    """
+
+    def __init__(
+        self,
+        cache: Cache,
+        fetch: Callable[[RecordId], Awaitable[Optional[Record]]],
+        soft_ttl: float,
+        hard_ttl: float = math.inf,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.cache = cache
+        self.fetch = fetch
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = hard_ttl
+        self.clock = clock
+        self.refreshing: dict[RecordId, asyncio.Task[None]] = {}
+        self.num_refresh_failures = 0
+
+    async def get(self, id: RecordId) -> Tuple[CacheResult, Optional[Record]]:
+        (status, value) = await self.cache.get(id)
+        stored = unwrap_stored(value) if status is CacheResult.HIT else None
+        if stored is None:
+            return (CacheResult.MISS, None)
+
+        age = self.clock() - stored["stored_at"]
+        if age > self.hard_ttl:
+            return (CacheResult.MISS, None)
+        if age > self.soft_ttl:
+            self.refresh_in_background(id)
+        return (CacheResult.HIT, stored["record"])
+
+    async def set(self, id: RecordId, value: Optional[Record]) -> None:
+        stored: StoredRecord = {"stored_at": self.clock(), "record": value}
+        # The wrapped cache stores the envelope as it would a record.
+        await self.cache.set(id, cast(Record, stored))
+
+    def refresh_in_background(self, id: RecordId) -> None:
+        """Start a task to fetch and store a record, unless one is
+        already running for that record.
+        """
+        if id not in self.refreshing:
+            task = asyncio.create_task(self.refresh(id))
+            self.refreshing[id] = task
+            task.add_done_callback(lambda _: self.refreshing.pop(id, None))
+
+    async def refresh(self, id: RecordId) -> None:
+        try:
+            await self.set(id, await self.fetch(id))
+        except Exception:
+            # Keep serving the stale record. It will be refreshed
+            # again the next time it is requested.
+            self.num_refresh_failures += 1
+
+    async def wait_refreshes(self) -> None:
+        """Wait for all background refreshes that are running to
+        finish.
+        """
+        while self.refreshing:
+            await asyncio.gather(*self.refreshing.values())
+
+
+class MemoryCache:
+    """A :class:`Cache <geneagrapher_core.record.Cache>` that keeps
+    records in a dictionary in this process.
+    """
+
+    def __init__(self) -> None:
+        self.records: Dict[RecordId, Optional[Record]] = {}
+
+    async def get(self, id: RecordId) -> Tuple[CacheResult, Optional[Record]]:
+        if id in self.records:
+            return (CacheResult.HIT, self.records[id])
+        return (CacheResult.MISS, None)
+
+    async def set(self, id: RecordId, value: Optional[Record]) -> None:
+        self.records[id] = value
+
+
+class TierStats:
+    """Hit and miss counts for one tier of a :class:`TieredCache`.
+    Only lookups that reach the tier are counted.
+    """
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """The fraction of lookups that were hits, or 0 if there have
+        been no lookups.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+
+class TieredCache:
+    """A :class:`Cache <geneagrapher_core.record.Cache>` made of an
+    ordered list of caches, fastest first (e.g., in-process memory,
+    then local disk, then a remote server).
+
+    A lookup tries each tier in order and stops at the first hit. The
+    record is then stored in the tiers above the one that had it, so
+    later lookups are served by the fastest tier.
+
+    With the ``"write-through"`` write policy, records are stored in
+    all tiers before :meth:`set` returns. With the ``"write-back"``
+    policy, records are stored only in the first tier and written to
+    the others when :meth:`flush` or :meth:`close` is called, or when
+    an ``async with`` block using the cache ends.
+    :func:`build_graph <geneagrapher_core.traverse.build_graph>`
+    flushes a write-back cache before returning.
+
+    :param tiers: the caches to compose, fastest first
+    :param write_policy: ``"write-through"`` or ``"write-back"``
+    """
+
+    def __init__(
+        self,
+        tiers: List[Cache],
+        write_policy: Literal["write-through", "write-back"] = "write-through",
+    ) -> None:
+        if len(tiers) == 0:
+            raise ValueError("TieredCache requires at least one tier")
+        self.tiers = tiers
+        self.write_policy = write_policy
+        self.stats = [TierStats() for _ in tiers]
+        self.dirty: Dict[RecordId, Optional[Record]] = {}
+
+    async def get(self, id: RecordId) -> Tuple[CacheResult, Optional[Record]]:
+        for i, (tier, stats) in enumerate(zip(self.tiers, self.stats)):
+            (status, record) = await tier.get(id)
+            if status is CacheResult.HIT:
+                stats.hits += 1
+                await asyncio.gather(*[t.set(id, record) for t in self.tiers[:i]])
+                return (status, record)
+            stats.misses += 1
+        return (CacheResult.MISS, None)
+
+    async def set(self, id: RecordId, value: Optional[Record]) -> None:
+        if self.write_policy == "write-back":
+            await self.tiers[0].set(id, value)
+            self.dirty[id] = value
+        else:
+            await asyncio.gather(*[t.set(id, value) for t in self.tiers])
+
+    async def flush(self) -> None:
+        """Write records stored with the ``"write-back"`` policy to
+        the lower tiers.
+        """
+        for id, value in list(self.dirty.items()):
+            await asyncio.gather(*[t.set(id, value) for t in self.tiers[1:]])
+            if self.dirty.get(id, value) is value:
+                # Only forget the record if it was not stored again
+                # while it was being written.
+                del self.dirty[id]
+
+    async def close(self) -> None:
+        """Write records stored with the ``"write-back"`` policy to
+        the lower tiers. The cache can still be used afterward.
+        """
+        await self.flush()
+
+    async def __aenter__(self) -> "TieredCache":
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        await self.close()
+
+
+class WriteBehindCache:
+    """A :class:`Cache <geneagrapher_core.record.Cache>` wrapper that
+    stores records in the background, so callers of :meth:`set` do not
+    wait for the wrapped cache.
+
+    Stored records are queued and written by a background task in
+    batches of up to ``batch_size``. If the wrapped cache implements
+    :class:`BatchCache <geneagrapher_core.record.BatchCache>`, each
+    batch is written with one ``set_many`` call. When ``max_pending``
+    records are queued, :meth:`set` waits for room in the queue. Until
+    a record is written, :meth:`get` returns the queued value.
+
+    A failed write does not raise an exception. Instead, it is counted
+    in ``num_write_failures`` and, if given, ``on_error`` is called
+    with the IDs in the failed batch and the exception. Exceptions
+    raised by ``on_error`` are ignored.
+
+    Call :meth:`close` when done to write the remaining records and
+    stop the background task.
+
+    :param cache: the cache to wrap
+    :param max_pending: the maximum number of queued records
+    :param batch_size: the maximum number of records to write at once
+    :param on_error: a function called when a batch fails to be written
+    """
+
+    def __init__(
+        self,
+        cache: Cache,
+        max_pending: int = 1000,
+        batch_size: int = 100,
+        on_error: Optional[Callable[[List[RecordId], Exception], None]] = None,
+    ) -> None:
+        self.cache = cache
+        self.batch_size = batch_size
+        self.on_error = on_error
+        self.pending: Dict[RecordId, Optional[Record]] = {}
+        self.queue: asyncio.Queue[RecordId] = asyncio.Queue(max_pending)
+        self.writer: Optional[asyncio.Task[None]] = None
+        self.num_write_failures = 0
+
+    async def get(self, id: RecordId) -> Tuple[CacheResult, Optional[Record]]:
+        if id in self.pending:
+            return (CacheResult.HIT, self.pending[id])
+        return await self.cache.get(id)
+
+    async def set(self, id: RecordId, value: Optional[Record]) -> None:
+        if self.writer is None:
+            self.writer = asyncio.create_task(self.write_batches())
+        self.pending[id] = value
+        await self.queue.put(id)
+
+    async def write_batches(self) -> None:
+        while True:
+            ids = [await self.queue.get()]
+            while len(ids) < self.batch_size and not self.queue.empty():
+                ids.append(self.queue.get_nowait())
+
+            batch = {id: self.pending[id] for id in ids if id in self.pending}
+            try:
+                await self.write(batch)
+            except Exception as e:
+                self.num_write_failures += len(batch)
+                if self.on_error is not None:
+                    try:
+                        self.on_error(list(batch), e)
+                    except Exception:
+                        # The writer must keep running, or flush would
+                        # wait forever for the remaining records.
+                        pass
+
+            for id, value in batch.items():
+                if self.pending.get(id, value) is value:
+                    # Only forget the record if it was not stored
+                    # again while it was being written.
+                    del self.pending[id]
+            for _ in ids:
+                self.queue.task_done()
+
+    async def write(self, batch: Dict[RecordId, Optional[Record]]) -> None:
+        if hasattr(self.cache, "set_many"):
+            await cast(BatchCache, self.cache).set_many(batch)
+        else:
+            await asyncio.gather(*[self.cache.set(id, v) for id, v in batch.items()])
+
+    async def flush(self) -> None:
+        """Wait until all queued records have been written."""
+        await self.queue.join()
+
+    async def close(self) -> None:
+        """Write all queued records and stop the background task. If
+        this is cancelled (e.g., by a timeout), the background task is
+        stopped anyway and the records still in ``pending`` are not
+        written.
+        """
+        try:
+            await self.flush()
+        finally:
+            if self.writer is not None:
+                self.writer.cancel()
+                self.writer = None
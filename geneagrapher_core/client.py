@@ -0,0 +1,114 @@
+"""A client for the graph service in :mod:`geneagrapher_core.server`.
+
+This module uses only the standard library. Importing aiohttp and the
+parsing libraries that the service uses takes most of a second, which
+would be most of the time taken by a request for a small graph, so the
+``geneagrapher-core-client`` console script does not import them.
+"""
+
+import argparse
+import http.client
+import json
+import socket
+import sys
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+DIRECTIONS = ("ADVISORS", "DESCENDANTS")
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """An HTTP connection to a server listening on a Unix socket.
+
+    :param socket_path: the path of the socket
+    """
+
+    def __init__(self, socket_path: str) -> None:
+        super().__init__("localhost")
+        self.socket_path = socket_path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.socket_path)
+
+
+def parse_item(text: str) -> Dict[str, Any]:
+    """Parse a start item written like ``18231`` or
+    ``18231:ADVISORS|DESCENDANTS`` into the form the service expects.
+    The direction defaults to ``ADVISORS``.
+    """
+    (rid, _, direction) = text.partition(":")
+    names = [name.strip().upper() for name in (direction or "ADVISORS").split("|")]
+    for name in names:
+        if name not in DIRECTIONS:
+            raise ValueError(f"unknown traversal direction: {name}")
+    return {"id": int(rid), "direction": "|".join(names)}
+
+
+def request_graph(
+    connection: http.client.HTTPConnection,
+    start_items: List[Dict[str, Any]],
+    max_records: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Request a graph from a running service and return it.
+
+    :param connection: a connection to the service
+    :param start_items: the start items, as returned by :func:`parse_item`
+    :param max_records: the maximum number of records to include in the built graph
+    """
+    body = json.dumps({"start_items": start_items, "max_records": max_records})
+    connection.request(
+        "POST", "/graph", body, headers={"Content-Type": "application/json"}
+    )
+    response = connection.getresponse()
+    if response.status != 200:
+        raise RuntimeError(
+            f"graph service error: {response.status} {response.read().decode()}"
+        )
+
+    nodes: Dict[int, Any] = {}
+    for line in response:
+        message = json.loads(line)
+        if "record" in message:
+            nodes[message["record"]["id"]] = message["record"]
+        elif "graph" in message:
+            graph: Dict[str, Any] = message["graph"]
+            graph["nodes"] = nodes
+            return graph
+        else:
+            raise RuntimeError(f"graph service error: {message['error']}")
+    raise RuntimeError("graph service closed the response early")
+
+
+def main() -> None:
+    """Request a graph from a running service and print it as JSON."""
+    parser = argparse.ArgumentParser(
+        description="Request a graph from a geneagrapher-core server."
+    )
+    parser.add_argument(
+        "items",
+        nargs="+",
+        type=parse_item,
+        metavar="ID[:DIRECTION]",
+        help="a record ID and traversal direction, such as 18231:ADVISORS|DESCENDANTS",
+    )
+    parser.add_argument("--max-records", type=int)
+    address = parser.add_mutually_exclusive_group()
+    address.add_argument("--socket", help="path of the server's Unix socket")
+    address.add_argument("--url", default="http://127.0.0.1:8421")
+    args = parser.parse_args()
+
+    connection: http.client.HTTPConnection
+    if args.socket is not None:
+        connection = UnixHTTPConnection(args.socket)
+    else:
+        url = urlsplit(args.url)
+        connection = http.client.HTTPConnection(url.hostname or "", url.port)
+    try:
+        graph = request_graph(connection, args.items, args.max_records)
+    except (OSError, RuntimeError) as e:
+        sys.exit(str(e))
+    finally:
+        connection.close()
+    json.dump(graph, sys.stdout)
+    print()
@@ -0,0 +1,162 @@
+from geneagrapher_core.record import Record, RecordId
+
+import abc
+import asyncio
+import json
+from types import TracebackType
+from typing import Iterable, Optional, TextIO, Tuple, Type
+
+
+class Exporter(abc.ABC):
+    """This is the base class for exporters that write a graph to a
+    text stream incrementally, one record at a time, instead of
+    serializing a complete :class:`Geneagraph
+    <geneagrapher_core.traverse.Geneagraph>` at the end.
+
+    An exporter is used as a context manager, which writes any header
+    the format needs on entry and any footer on exit. Its
+    :meth:`record_callback` method can be passed directly as the
+    ``record_callback`` argument to :func:`build_graph
+    <geneagrapher_core.traverse.build_graph>`.
+
+    :param stream: the text stream to write to (e.g., an open file or
+        the result of :meth:`socket.socket.makefile`)
+    """
+
+    def __init__(self, stream: TextIO) -> None:
+        self.stream = stream
+
+    def __enter__(self) -> "Exporter":
+        self.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.finish()
+
+    def start(self) -> None:
+        """Write the format header, if the format has one."""
+        pass
+
+    @abc.abstractmethod
+    def add_record(self, record: Record) -> None:
+        """Write a record and any edges it completes."""
+        ...
+
+    def finish(self) -> None:
+        """Write the format footer, if the format has one, and flush
+        the stream.
+        """
+        self.stream.flush()
+
+    def export(self, records: Iterable[Record]) -> None:
+        """Write a complete export of already-retrieved records (e.g.,
+        ``ggraph["nodes"].values()``).
+        """
+        with self:
+            for record in records:
+                self.add_record(record)
+
+    async def record_callback(self, tg: asyncio.TaskGroup, record: Record) -> None:
+        """Write a record as it is retrieved. This has the signature
+        expected of the ``record_callback`` argument to
+        :func:`build_graph <geneagrapher_core.traverse.build_graph>`.
+        """
+        self.add_record(record)
+
+
+class JSONLinesExporter(Exporter):
+    """Write each record as a JSON object on its own line. Edges are
+    implied by each record's ``advisors`` and ``descendants`` lists.
+    """
+
+    def add_record(self, record: Record) -> None:
+        self.stream.write(json.dumps(record))
+        self.stream.write("\n")
+
+
+class EdgeExporter(Exporter):
+    """This is the base class for exporters that write edges between
+    records. An edge is written as soon as both of its records have
+    been seen, so only the IDs of seen records are kept in memory.
+    Edges point from advisor to student.
+    """
+
+    def __init__(self, stream: TextIO) -> None:
+        super().__init__(stream)
+        self.seen: set[RecordId] = set()
+
+    def new_edges(self, record: Record) -> Iterable[Tuple[int, int]]:
+        """Record that ``record`` has been seen and return the edges
+        between it and previously-seen records.
+        """
+        rid = record["id"]
+        self.seen.add(rid)
+        advisors = {a for a in record["advisors"] if a in self.seen and a != rid}
+        descendants = {d for d in record["descendants"] if d in self.seen and d != rid}
+        return [(a, rid) for a in sorted(advisors)] + [
+            (rid, d) for d in sorted(descendants)
+        ]
+
+
+class EdgeListExporter(EdgeExporter):
+    """Write a compact edge list with one ``<advisor id> <student id>``
+    pair per line.
+    """
+
+    def add_record(self, record: Record) -> None:
+        for advisor, student in self.new_edges(record):
+            self.stream.write(f"{advisor} {student}\n")
+
+
+class DotExporter(EdgeExporter):
+    """Write a `Graphviz <https://graphviz.org/>`_ DOT graph with a
+    node per record and an edge from each advisor to each
+    student. The output uses the same node labels and styling as
+    Geneagrapher.
+    """
+
+    def start(self) -> None:
+        self.stream.write(
+            """digraph {
+    graph [charset="utf-8"];
+    node [shape=plaintext];
+    edge [style=bold];
+
+"""
+        )
+
+    def add_record(self, record: Record) -> None:
+        self.stream.write(f'    {record["id"]} [label="{make_label(record)}"];\n')
+        for advisor, student in self.new_edges(record):
+            self.stream.write(f"    {advisor} -> {student};\n")
+
+    def finish(self) -> None:
+        self.stream.write("}\n")
+        super().finish()
+
+
+def escape_dot(text: str) -> str:
+    """Escape text for use inside a double-quoted DOT string."""
+    return text.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def make_label(record: Record) -> str:
+    """Build the DOT node label for a record. The label has the
+    mathematician's name on the first line and the institution and
+    year, when known, on the second line.
+    """
+    label = escape_dot(record["name"])
+    institution = record["institution"]
+    year = record["year"]
+    if institution is not None or year is not None:
+        label += "\\n"
+        if institution is not None:
+            label += escape_dot(institution)
+        if year is not None:
+            label += f" ({year})" if institution is not None else f"({year})"
+    return label
@@ -0,0 +1,159 @@
+from geneagrapher_core.traverse import Geneagraph, TraverseItem, build_graph
+
+import asyncio
+from collections import OrderedDict
+import math
+import time
+from typing import Any, Awaitable, Callable, Coroutine, Dict, List, Optional, Tuple
+
+GraphKey = Tuple[Tuple[Tuple[int, int], ...], Optional[int]]
+
+
+def request_key(
+    start_items: List[TraverseItem], max_records: Optional[int]
+) -> GraphKey:
+    """Return a key that is the same for all requests for the same
+    graph, whatever the order of their start items.
+    """
+    return (
+        tuple(sorted((item.id, item.traverse_direction.value) for item in start_items)),
+        max_records,
+    )
+
+
+def is_cacheable(ggraph: Geneagraph) -> bool:
+    """Return True if a graph is the same as any later build of it
+    would be (apart from changes to the records themselves). Graphs
+    cut short by a time budget or missing failed records are not, and
+    neither are graphs whose records are kept in a store that the
+    caller must close, such as a
+    :class:`~geneagrapher_core.store.SpillingRecordStore`.
+    """
+    if not isinstance(ggraph["nodes"], dict):
+        return False
+    if ggraph["status"] == "complete":
+        return True
+    return (
+        ggraph["status"] == "truncated"
+        and ggraph.get("truncation_reason") == "max_records"
+    )
+
+
+class GraphResultCache:
+    """Builds graphs and keeps the finished graphs, so that a repeated
+    request for the same graph is answered with one lookup instead of
+    a traversal.
+
+    Requests are identified by their start items (in any order, with
+    their traversal directions) and ``max_records``. Only complete
+    graphs and graphs truncated by ``max_records`` are kept. A kept
+    graph is rebuilt once it is older than ``ttl`` or when
+    ``validate`` returns False for it. Concurrent requests for a graph
+    that is being built wait for the same build.
+
+    Graphs are shared between callers, so they must not be modified.
+    For the same reason, the ``memory_budget`` argument of
+    :func:`~geneagrapher_core.traverse.build_graph` is not accepted:
+    a graph built with it holds its records in a store that its caller
+    closes.
+
+    :param build: the function that builds graphs, called with the
+        start items and keyword arguments
+    :param ttl: the age in seconds after which a kept graph is rebuilt
+    :param max_entries: the maximum number of graphs to keep; the least
+        recently used graphs are dropped first
+    :param validate: a function called with a kept graph before it is
+        returned; if it returns False, the graph is rebuilt
+    :param clock: a function returning the current time in seconds
+
+    **Example**::
+
+        graphs = GraphResultCache(ttl=3600)
+        graph = await graphs.build_graph(start_items, max_records=1000, cache=cache)
+
+    """
+
+    def __init__(
+        self,
+        build: Callable[..., Coroutine[Any, Any, Geneagraph]] = build_graph,
+        *,
+        ttl: float = math.inf,
+        max_entries: Optional[int] = None,
+        validate: Optional[Callable[[Geneagraph], Awaitable[bool]]] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.build = build
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.validate = validate
+        self.clock = clock
+        self.entries: OrderedDict[GraphKey, Tuple[float, Geneagraph]] = OrderedDict()
+        self.in_flight: Dict[GraphKey, asyncio.Task[Geneagraph]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def build_graph(
+        self,
+        start_items: List[TraverseItem],
+        *,
+        max_records: Optional[int] = None,
+        **kwargs: Any,
+    ) -> Geneagraph:
+        """Return a kept graph for the request or build it.
+
+        :param start_items: a list of nodes and direction from which to traverse
+        :param max_records: the maximum number of records to include in the graph
+        :param kwargs: other arguments passed to ``build`` when the graph
+            is built; they are not part of the request's key
+        """
+        if kwargs.get("memory_budget") is not None:
+            raise ValueError("graphs built with a memory budget cannot be shared")
+        key = request_key(start_items, max_records)
+        ggraph = await self.lookup(key)
+        if ggraph is not None:
+            self.hits += 1
+            return ggraph
+
+        self.misses += 1
+        if key not in self.in_flight:
+            task = asyncio.create_task(
+                self.build(start_items, max_records=max_records, **kwargs)
+            )
+            self.in_flight[key] = task
+            task.add_done_callback(lambda t: self.finish(key, t))
+        # The build continues for other callers if this one is
+        # cancelled.
+        return await asyncio.shield(self.in_flight[key])
+
+    async def lookup(self, key: GraphKey) -> Optional[Geneagraph]:
+        if key not in self.entries:
+            return None
+        (stored_at, ggraph) = self.entries[key]
+        if self.clock() - stored_at > self.ttl or (
+            self.validate is not None and not await self.validate(ggraph)
+        ):
+            self.entries.pop(key, None)
+            return None
+        self.entries.move_to_end(key)
+        return ggraph
+
+    def finish(self, key: GraphKey, task: asyncio.Task[Geneagraph]) -> None:
+        self.in_flight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        ggraph = task.result()
+        if is_cacheable(ggraph):
+            self.entries[key] = (self.clock(), ggraph)
+            self.entries.move_to_end(key)
+            if self.max_entries is not None and len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(
+        self, start_items: List[TraverseItem], max_records: Optional[int] = None
+    ) -> None:
+        """Drop the kept graph for a request, if there is one."""
+        self.entries.pop(request_key(start_items, max_records), None)
+
+    def clear(self) -> None:
+        """Drop all kept graphs."""
+        self.entries.clear()
@@ -1,13 +1,39 @@
-from aiohttp import ClientSession
+from geneagrapher_core.trace import NULL_TRACER, Tracer
+
+from aiohttp import ClientSession, TCPConnector
 import asyncio
 from bs4 import BeautifulSoup, Tag
+import codecs
 from contextlib import asynccontextmanager
 from enum import Enum, auto
+import functools
+from pathlib import Path
 import re
-from typing import AsyncIterator, List, NewType, Optional, Protocol, Tuple, TypedDict
+import ssl
+from typing import (
+    AsyncIterator,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    NewType,
+    Optional,
+    Protocol,
+    Tuple,
+    TypedDict,
+    cast,
+)
 
 RecordId = NewType("RecordId", int)
 
+# The comment that closes the part of a record page holding the
+# record. Nothing after it is needed to extract the record.
+PAGE_END_MARKER = "<!-- end #paddingWrapper -->"
+PAGE_CHUNK_SIZE = 16384
+
+REPEATED_SPACES = re.compile(" {2,}")
+ADVISOR_LABEL = re.compile("(Advisor|Promotor)")
+
 
 class Record(TypedDict):
     id: RecordId
@@ -18,6 +44,17 @@ class Record(TypedDict):
     advisors: List[int]
 
 
+class RecordResult(NamedTuple):
+    """The result of getting one record with :func:`get_records`. If
+    the request failed, ``record`` is None and ``error`` is the
+    exception that was raised.
+    """
+
+    id: RecordId
+    record: Optional[Record]
+    error: Optional[Exception] = None
+
+
 class CacheResult(Enum):
     HIT = auto()
     MISS = auto()
@@ -42,6 +79,103 @@ class Cache(Protocol):
         ...
 
 
+class Transport(Protocol):
+    """This defines an interface for objects that retrieve record
+    pages. Passing a transport to :func:`get_record_inner` replaces
+    its HTTP requests, for example to replay saved pages.
+    """
+
+    async def fetch(self, id: RecordId) -> str:
+        """Return the HTML text of a record page.
+
+        :param id: Math Genealogy Project ID of the record to retrieve
+        """
+        ...
+
+
+class BatchCache(Cache, Protocol):
+    """This extends :class:`Cache` with methods for getting and
+    storing several records in one round trip. Wrappers that batch
+    cache access use these methods when the cache provides them.
+    """
+
+    async def get_many(
+        self, ids: List[RecordId]
+    ) -> Dict[RecordId, Tuple[CacheResult, Optional[Record]]]:
+        """Get several records from the cache.
+
+        :param ids: Math Genealogy Project IDs of the records to retrieve
+        """
+        ...
+
+    async def set_many(self, values: Dict[RecordId, Optional[Record]]) -> None:
+        """Store several records in the cache.
+
+        :param values: the values to store, keyed by record ID
+        """
+        ...
+
+
+class WriteOnlyCache:
+    """A cache wrapper whose lookups always miss. Stores are passed on
+    to the wrapped cache.
+    """
+
+    def __init__(self, cache: Cache) -> None:
+        self.cache = cache
+
+    async def get(self, id: RecordId) -> Tuple[CacheResult, Optional[Record]]:
+        return (CacheResult.MISS, None)
+
+    async def set(self, id: RecordId, value: Optional[Record]) -> None:
+        await self.cache.set(id, value)
+
+
+@functools.cache
+def intermediate_ssl_context() -> ssl.SSLContext:
+    """Return an SSL context that includes intermediate certificates
+    needed to currently validate the Math Genealogy Project SSL
+    certificate. The context is created once and shared, so the
+    certificate file is only read the first time.
+    """
+    current_directory_path = Path(__file__).absolute().parent
+    intermediate_cert_path = current_directory_path / "mathgenealogy-intermediate.pem"
+
+    # Create a default SSL context.
+    ssl_context = ssl.create_default_context()
+
+    # Load the intermediate certificate. This adds it to the chain of trust.
+    ssl_context.load_verify_locations(cafile=intermediate_cert_path)
+    return ssl_context
+
+
+def build_intermediate_connector() -> TCPConnector:
+    """Build a connector object to be used by aiohttp that includes intermediate
+    certificates needed to currently validate the Math Genealogy Project SSL
+    certificate.
+
+    This was added for #5 and can hopefully be removed in the future.
+    """
+    # Create a TCPConnector with our custom SSL context.
+    return TCPConnector(ssl=intermediate_ssl_context())
+
+
+def make_session(user_agent: Optional[str] = None) -> ClientSession:
+    """Make an HTTP session for requests to the Math Genealogy Project
+    that uses the connector from :func:`build_intermediate_connector
+    <build_intermediate_connector>`. This must be called while an
+    event loop is running.
+
+    :param user_agent: a custom user agent string to use in HTTP requests
+    """
+    headers = None if user_agent is None else {"User-Agent": user_agent}
+    return ClientSession(
+        "https://www.mathgenealogy.org",
+        headers=headers,
+        connector=build_intermediate_connector(),
+    )
+
+
 @asynccontextmanager
 async def fake_semaphore() -> AsyncIterator[None]:
     """If the caller to the `get_record*` functions below does not
@@ -74,10 +208,10 @@ async def get_record(
 ) -> Optional[Record]:
     """Get a single record. This is meant to be called for one-off
     requests. If the calling code is planning to get several records
-    during its lifetime, it should instantiate a
-    :class:`aiohttp.ClientSession` object as
-    ``ClientSession("https://www.mathgenealogy.org")`` and call
-    :func:`get_record_inner <get_record_inner>` instead.
+    during its lifetime, it should call :func:`get_records
+    <get_records>` or create a session with :func:`make_session
+    <make_session>` and call :func:`get_record_inner <get_record_inner>`
+    instead.
 
     :param record_id: Math Genealogy Project ID of the record to retrieve
     :param cache: a cache object for getting and storing results
@@ -87,15 +221,92 @@ async def get_record(
         record = await get_record(RecordId(18231))
 
     """
-    async with ClientSession("https://www.mathgenealogy.org") as client:
+    async with make_session() as client:
         return await get_record_inner(record_id, client, cache=cache)
 
 
+async def get_records(
+    record_ids: Iterable[RecordId],
+    *,
+    http_semaphore: Optional[asyncio.Semaphore] = None,
+    user_agent: Optional[str] = None,
+    cache: Optional[Cache] = None,
+) -> AsyncIterator[RecordResult]:
+    """Get several records concurrently over one HTTP session. This
+    is meant for fetching lists of unrelated records. Results are
+    yielded as they become available, so they are generally not in the
+    order of ``record_ids``. Each ID is fetched once, even if it is
+    repeated.
+
+    A failed request does not stop the others. Its result has the
+    exception in ``error`` instead.
+
+    If ``cache`` implements :class:`BatchCache`, the cached records
+    are looked up with one ``get_many`` call before any HTTP requests
+    are made.
+
+    :param record_ids: Math Genealogy Project IDs of the records to retrieve
+    :param http_semaphore: a semaphore to limit HTTP request concurrency
+        (by default, 10 requests are made at a time)
+    :param user_agent: a custom user agent string to use in HTTP requests
+    :param cache: a cache object for getting and storing results
+
+    **Example**::
+
+        records = {
+            result.id: result.record
+            async for result in get_records([RecordId(18231), RecordId(18230)])
+        }
+
+    """
+    ids = list(dict.fromkeys(record_ids))
+    semaphore = http_semaphore or asyncio.Semaphore(10)
+
+    fetch_cache = cache
+    if cache is not None and hasattr(cache, "get_many"):
+        cached = await cast(BatchCache, cache).get_many(ids)
+        misses = []
+        for id in ids:
+            (status, record) = cached.get(id, (CacheResult.MISS, None))
+            if status is CacheResult.HIT:
+                yield RecordResult(id, record)
+            else:
+                misses.append(id)
+        if len(misses) == 0:
+            return
+        ids = misses
+        # The remaining records are known to be missing from the
+        # cache, so only store them.
+        fetch_cache = WriteOnlyCache(cache)
+
+    async with make_session(user_agent) as client:
+
+        async def fetch(id: RecordId) -> RecordResult:
+            try:
+                return RecordResult(
+                    id, await get_record_inner(id, client, semaphore, fetch_cache)
+                )
+            except Exception as e:
+                return RecordResult(id, None, e)
+
+        tasks = [asyncio.create_task(fetch(id)) for id in ids]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            # Stop outstanding requests if the caller stops early.
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
 async def get_record_inner(
     record_id: RecordId,
     client: ClientSession,
     http_semaphore: Optional[asyncio.Semaphore] = None,
     cache: Optional[Cache] = None,
+    tracer: Optional[Tracer] = None,
+    transport: Optional[Transport] = None,
 ) -> Optional[Record]:
     """Get a single record using the provided
     :class:`aiohttp.ClientSession` and :class:`asyncio.Semaphore`
@@ -105,44 +316,85 @@ async def get_record_inner(
     :param client: a client session object with which to make HTTP requests
     :param http_semaphore: a semaphore to limit HTTP request concurrency
     :param cache: a cache object for getting and storing results
+    :param tracer: a tracer that records the steps of getting the record
+    :param transport: a transport with which to retrieve the record
+        page instead of making an HTTP request with ``client``
 
     """
+    tracer = tracer or NULL_TRACER
     if cache:
-        (status, record) = await cache.get(record_id)
+        with tracer.span("cache get", record_id):
+            (status, record) = await cache.get(record_id)
         if status is CacheResult.HIT:
+            tracer.instant("cache hit", record_id)
             return record
 
+    tracer.begin("semaphore wait", record_id)
     async with http_semaphore or fake_semaphore():
-        soup: BeautifulSoup = await fetch_document(record_id, client)
-
-    if not has_record(soup):
-        record = None
-    else:
-        record = {
-            "id": record_id,
-            "name": get_name(soup),
-            "institution": get_institution(soup),
-            "year": get_year(soup),
-            "descendants": get_descendants(soup),
-            "advisors": get_advisors(soup),
-        }
+        tracer.end("semaphore wait", record_id)
+        with tracer.span("http", record_id):
+            page = await (
+                fetch_page(record_id, client)
+                if transport is None
+                else transport.fetch(record_id)
+            )
+
+    with tracer.span("parse", record_id):
+        soup = BeautifulSoup(page, "html.parser")
+        if not has_record(soup):
+            record = None
+        else:
+            record = {
+                "id": record_id,
+                "name": get_name(soup),
+                "institution": get_institution(soup),
+                "year": get_year(soup),
+                "descendants": get_descendants(soup),
+                "advisors": get_advisors(soup),
+            }
 
     if cache:
-        await cache.set(record_id, record)
+        with tracer.span("cache set", record_id):
+            await cache.set(record_id, record)
 
     return record
 
 
-async def fetch_document(rid: RecordId, client: ClientSession) -> BeautifulSoup:
+async def fetch_page(rid: RecordId, client: ClientSession) -> str:
+    """Return the text of a record page up to the end of the record.
+
+    The response is decoded as it arrives. Everything after
+    ``PAGE_END_MARKER``, which closes the part of the page that holds
+    the record, is read but not decoded, so that the connection can be
+    reused and the page footer does not need to be parsed.
+    """
     async with client.get(f"/id.php?id={rid}") as resp:
-        return BeautifulSoup(await resp.text(), "html.parser")
+        decoder = codecs.getincrementaldecoder(resp.charset or "utf-8")()
+        parts: List[str] = []
+        tail = ""  # the end of the text so far, to find a marker split by chunks
+        async for chunk in resp.content.iter_chunked(PAGE_CHUNK_SIZE):
+            text = decoder.decode(chunk)
+            window = tail + text
+            end = window.find(PAGE_END_MARKER)
+            if end != -1:
+                parts.append(text[: end + len(PAGE_END_MARKER) - len(tail)])
+                await resp.content.read()
+                return "".join(parts)
+            parts.append(text)
+            tail = window[-(len(PAGE_END_MARKER) - 1) :]
+        parts.append(decoder.decode(b"", final=True))
+        return "".join(parts)
+
+
+async def fetch_document(rid: RecordId, client: ClientSession) -> BeautifulSoup:
+    return BeautifulSoup(await fetch_page(rid, client), "html.parser")
 
 
 def get_name(soup: BeautifulSoup) -> str:
     """Extract the mathematician name."""
     el = soup.find("h2")
     name = el.get_text(strip=True) if el is not None else ""
-    return re.sub(" {2,}", " ", name)  # remove redundant whitespace
+    return REPEATED_SPACES.sub(" ", name)  # remove redundant whitespace
 
 
 def get_institution(soup: BeautifulSoup) -> Optional[str]:
@@ -210,6 +462,6 @@ def get_advisors(soup: BeautifulSoup) -> List[int]:
     """
     return [
         extract_id(info.find_next())
-        for info in soup.find_all(string=re.compile("(Advisor|Promotor)"))
+        for info in soup.find_all(string=ADVISOR_LABEL)
         if "Advisor: Unknown" not in info
     ]
@@ -0,0 +1,116 @@
+import asyncio
+from collections import deque
+from typing import Deque, Dict, Literal
+
+
+class FairScheduler:
+    """Shares a limit on concurrent HTTP requests among several graph
+    builds, so that a large build does not delay small ones.
+
+    Each build gets its own :class:`ScheduledSemaphore` from
+    :meth:`handle`, which is passed to :func:`build_graph
+    <geneagrapher_core.traverse.build_graph>` as its ``http_semaphore``.
+    When a request slot frees up, it goes to the waiting build that
+    has received the fewest slots relative to its weight (weighted fair
+    queuing). With equal weights, builds with waiting requests take
+    turns, so a small build waits for at most one request per other
+    build instead of for every request queued before it. A build that
+    is alone uses all of the slots.
+
+    :param concurrency: the maximum number of concurrent requests
+        across all builds
+
+    **Example**::
+
+        scheduler = FairScheduler(10)
+        big, small = await asyncio.gather(
+            build_graph(big_items, http_semaphore=scheduler.handle()),
+            build_graph(small_items, http_semaphore=scheduler.handle()),
+        )
+
+    """
+
+    def __init__(self, concurrency: int) -> None:
+        self.available = concurrency
+        # The virtual time of the last grant. A build that starts
+        # waiting is brought forward to it, so that it cannot claim
+        # credit for the time it was idle.
+        self.virtual_time = 0.0
+        self.waiting: Dict[ScheduledSemaphore, None] = {}
+
+    def handle(self, weight: float = 1.0) -> "ScheduledSemaphore":
+        """Return a semaphore for one build.
+
+        :param weight: the build's share of request slots relative to
+            other builds when they compete
+        """
+        return ScheduledSemaphore(self, weight)
+
+    def grant(self, handle: "ScheduledSemaphore") -> None:
+        self.available -= 1
+        self.virtual_time = max(self.virtual_time, handle.virtual_time)
+        handle.virtual_time = self.virtual_time + 1 / handle.weight
+
+    def release(self) -> None:
+        self.available += 1
+        self.dispatch()
+
+    def dispatch(self) -> None:
+        while self.available > 0 and self.waiting:
+            handle = min(self.waiting, key=lambda h: h.virtual_time)
+            waiter = handle.waiters.popleft()
+            if len(handle.waiters) == 0:
+                del self.waiting[handle]
+            if waiter.done():
+                # The waiter was cancelled and has not yet removed
+                # itself.
+                continue
+            self.grant(handle)
+            waiter.set_result(None)
+
+
+class ScheduledSemaphore(asyncio.Semaphore):
+    """A semaphore whose slots are shared with other builds by a
+    :class:`FairScheduler`. Create these with
+    :meth:`FairScheduler.handle`.
+    """
+
+    def __init__(self, scheduler: FairScheduler, weight: float) -> None:
+        super().__init__(0)
+        self.scheduler = scheduler
+        self.weight = weight
+        self.virtual_time = 0.0
+        self.waiters: Deque[asyncio.Future[None]] = deque()
+
+    def locked(self) -> bool:
+        return self.scheduler.available == 0 or bool(self.scheduler.waiting)
+
+    async def acquire(self) -> Literal[True]:
+        scheduler = self.scheduler
+        if scheduler.available > 0 and not scheduler.waiting:
+            scheduler.grant(self)
+            return True
+
+        waiter = asyncio.get_running_loop().create_future()
+        if len(self.waiters) == 0:
+            self.virtual_time = max(self.virtual_time, scheduler.virtual_time)
+            scheduler.waiting[self] = None
+        self.waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was granted as the wait was cancelled, so
+                # pass it on.
+                scheduler.release()
+            elif waiter in self.waiters:
+                self.waiters.remove(waiter)
+                if len(self.waiters) == 0:
+                    del scheduler.waiting[self]
+                # A later waiter may now be able to take a free slot.
+                scheduler.dispatch()
+            raise
+        return True
+
+    def release(self) -> None:
+        self.scheduler.release()
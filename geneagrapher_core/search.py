@@ -0,0 +1,176 @@
+from geneagrapher_core.record import Record, RecordId
+from geneagrapher_core.traverse import TraverseDirection, TraverseItem
+
+import asyncio
+from array import array
+from bisect import bisect_left
+import re
+import unicodedata
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+WORD = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase words with accents removed, so that
+    ``"Gauß"`` matches ``"gauss"`` and ``"Poincaré"`` matches
+    ``"poincare"``.
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return WORD.findall(stripped.casefold())
+
+
+class SearchResult(NamedTuple):
+    id: RecordId
+    name: str
+    institution: Optional[str]
+    year: Optional[int]
+
+    def traverse_item(self, direction: TraverseDirection) -> TraverseItem:
+        """Return an item for traversing the graph from this record."""
+        return TraverseItem(self.id, direction)
+
+
+class TokenIndex:
+    """A sorted list of (token, record ID) pairs, stored as a list of
+    tokens and a parallel array of IDs, for finding the records with a
+    token that starts with a prefix.
+    """
+
+    def __init__(self, entries: Iterable[tuple[str, RecordId]]) -> None:
+        pairs = sorted(entries)
+        self.tokens = [token for (token, _) in pairs]
+        self.ids = array("q", (id for (_, id) in pairs))
+
+    def prefix_ids(self, prefix: str) -> Set[RecordId]:
+        ids = set()
+        i = bisect_left(self.tokens, prefix)
+        while i < len(self.tokens) and self.tokens[i].startswith(prefix):
+            ids.add(RecordId(self.ids[i]))
+            i += 1
+        return ids
+
+
+class SearchIndex:
+    """A local index of record names and institutions for finding
+    record IDs without searching the Math Genealogy Project website.
+
+    Every word of a query must match the start of a word in the
+    searched field, ignoring case and accents, so ``"c f gau"`` finds
+    Carl Friedrich Gauß. Records can be added from any source, such as
+    a cache, a saved graph, or a traversal in progress (using
+    :meth:`record_callback`).
+
+    **Example**::
+
+        index = SearchIndex(graph["nodes"].values())
+        [result] = index.search(name="gauss", max_year=1800)
+        graph = await build_graph(
+            [result.traverse_item(TraverseDirection.DESCENDANTS)]
+        )
+
+    :param records: records to add to the index
+    """
+
+    def __init__(self, records: Iterable[Record] = ()) -> None:
+        self.records: Dict[RecordId, SearchResult] = {}
+        self.name_index: Optional[TokenIndex] = None
+        self.institution_index: Optional[TokenIndex] = None
+        self.add_many(records)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def add(self, record: Record) -> None:
+        """Add a record to the index, replacing any record with the
+        same ID.
+        """
+        self.records[record["id"]] = SearchResult(
+            record["id"], record["name"], record["institution"], record["year"]
+        )
+        # The token indexes are rebuilt at the next search.
+        self.name_index = None
+        self.institution_index = None
+
+    def add_many(self, records: Iterable[Record]) -> None:
+        """Add several records to the index."""
+        for record in records:
+            self.add(record)
+
+    async def record_callback(self, tg: asyncio.TaskGroup, record: Record) -> None:
+        """Add a record to the index. This can be passed as the
+        ``record_callback`` argument of :func:`build_graph
+        <geneagrapher_core.traverse.build_graph>` to index records as
+        they are retrieved.
+        """
+        self.add(record)
+
+    def search(
+        self,
+        name: Optional[str] = None,
+        institution: Optional[str] = None,
+        *,
+        min_year: Optional[int] = None,
+        max_year: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> List[SearchResult]:
+        """Return the records that match all of the given criteria,
+        sorted by name.
+
+        :param name: words that must start words of the record's
+            name; text without any words matches no records
+        :param institution: words that must start words of the
+            record's institution; text without any words matches no
+            records
+        :param min_year: the earliest degree year to include; records
+            without a year are excluded if a year bound is given
+        :param max_year: the latest degree year to include
+        :param limit: the maximum number of results to return
+        """
+        if self.name_index is None or self.institution_index is None:
+            self.name_index = TokenIndex(
+                (token, r.id)
+                for r in self.records.values()
+                for token in tokenize(r.name)
+            )
+            self.institution_index = TokenIndex(
+                (token, r.id)
+                for r in self.records.values()
+                for token in tokenize(r.institution or "")
+            )
+
+        candidates: Optional[Set[RecordId]] = None
+        for text, index in (
+            (name, self.name_index),
+            (institution, self.institution_index),
+        ):
+            if text is None:
+                continue
+            tokens = tokenize(text)
+            if len(tokens) == 0:
+                # Text without any words (e.g., "-") matches nothing.
+                return []
+            for token in tokens:
+                ids = index.prefix_ids(token)
+                candidates = ids if candidates is None else candidates & ids
+
+        results = [
+            self.records[id]
+            for id in (self.records if candidates is None else candidates)
+            if self.in_years(self.records[id], min_year, max_year)
+        ]
+        results.sort(key=lambda r: (r.name, r.id))
+        return results if limit is None else results[:limit]
+
+    @staticmethod
+    def in_years(
+        result: SearchResult, min_year: Optional[int], max_year: Optional[int]
+    ) -> bool:
+        if min_year is None and max_year is None:
+            return True
+        if result.year is None:
+            return False
+        return (min_year is None or result.year >= min_year) and (
+            max_year is None or result.year <= max_year
+        )
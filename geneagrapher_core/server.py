@@ -0,0 +1,278 @@
+"""A long-running service that builds graphs on request.
+
+Starting Python, importing the parsing and HTTP libraries, and setting
+up an HTTP session with its TLS context takes much longer than
+building a small graph from cached records. The service does that work
+once and keeps one :class:`aiohttp.ClientSession`, HTTP request limit, and
+cache for all requests.
+
+Requests are made by posting a JSON object to ``/graph``::
+
+    {"start_items": [{"id": 18231, "direction": "ADVISORS|DESCENDANTS"}],
+     "max_records": 100}
+
+The response is a stream of JSON Lines. Each record is sent in a
+``{"record": ...}`` line as soon as it is retrieved. The last line is
+``{"graph": ...}``, which holds the graph without its nodes, or
+``{"error": ...}`` if the graph could not be built. Concurrent
+requests for the same graph share one traversal.
+
+Graphs can be requested with :func:`request_graph` from code that
+already uses aiohttp, or with :mod:`geneagrapher_core.client`, which
+uses only the standard library and starts quickly.
+"""
+
+from geneagrapher_core.cache import MemoryCache
+from geneagrapher_core.graph_cache import GraphKey, request_key
+from geneagrapher_core.record import (
+    Cache,
+    Record,
+    RecordId,
+    make_session,
+)
+from geneagrapher_core.scheduler import FairScheduler
+from geneagrapher_core.traverse import (
+    Geneagraph,
+    TraverseDirection,
+    TraverseItem,
+    build_graph,
+)
+from geneagrapher_core.warm import parse_direction
+
+from aiohttp import ClientSession, web
+import argparse
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+
+
+def format_direction(direction: TraverseDirection) -> str:
+    """Format a traversal direction the way :func:`parse_direction
+    <geneagrapher_core.warm.parse_direction>` reads it.
+    """
+    return "|".join(str(d.name) for d in TraverseDirection if d in direction)
+
+
+class SharedGraph:
+    """A graph being built for one or more requests. Records are kept
+    as they are retrieved so that requests that join late receive all
+    of them.
+    """
+
+    def __init__(self) -> None:
+        self.records: List[Record] = []
+        self.graph: Optional[Geneagraph] = None
+        self.error: Optional[Exception] = None
+        self.finished = False
+        self._changed = asyncio.Event()
+
+    def notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def record_callback(self, tg: asyncio.TaskGroup, record: Record) -> None:
+        self.records.append(record)
+        self.notify()
+
+    def finish(
+        self, graph: Optional[Geneagraph], error: Optional[Exception] = None
+    ) -> None:
+        self.graph = graph
+        self.error = error
+        self.finished = True
+        self.notify()
+
+    async def stream(self) -> AsyncIterator[Record]:
+        """Yield every record of the graph, waiting for records that
+        have not been retrieved yet.
+        """
+        i = 0
+        while True:
+            changed = self._changed
+            while i < len(self.records):
+                yield self.records[i]
+                i += 1
+            if self.finished:
+                return
+            await changed.wait()
+
+
+class GraphService:
+    """Builds graphs with a shared session, HTTP semaphore, and cache.
+
+    :param client: a client session object with which to make HTTP
+        requests; if None, each graph is built with its own session
+    :param http_semaphore: a semaphore to limit HTTP request
+        concurrency; if a :class:`FairScheduler
+        <geneagrapher_core.scheduler.FairScheduler>`, each graph gets
+        its own handle so that large graphs do not delay small ones
+    :param cache: a cache object for getting and storing results
+    """
+
+    def __init__(
+        self,
+        client: Optional[ClientSession] = None,
+        http_semaphore: Optional[Union[asyncio.Semaphore, FairScheduler]] = None,
+        cache: Optional[Cache] = None,
+    ) -> None:
+        self.client = client
+        self.http_semaphore = http_semaphore
+        self.cache = cache
+        self.in_flight: Dict[GraphKey, SharedGraph] = {}
+
+    def request(
+        self, start_items: List[TraverseItem], max_records: Optional[int]
+    ) -> SharedGraph:
+        """Return the graph being built for ``start_items`` and
+        ``max_records``, starting to build it if no identical request
+        is in progress.
+        """
+        key = request_key(start_items, max_records)
+        if key not in self.in_flight:
+            shared = SharedGraph()
+            self.in_flight[key] = shared
+            task = asyncio.create_task(self.build(shared, start_items, max_records))
+            task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        return self.in_flight[key]
+
+    async def build(
+        self,
+        shared: SharedGraph,
+        start_items: List[TraverseItem],
+        max_records: Optional[int],
+    ) -> None:
+        http_semaphore = self.http_semaphore
+        if isinstance(http_semaphore, FairScheduler):
+            http_semaphore = http_semaphore.handle()
+        try:
+            graph = await build_graph(
+                start_items,
+                http_semaphore=http_semaphore,
+                max_records=max_records,
+                client=self.client,
+                cache=self.cache,
+                record_callback=shared.record_callback,
+            )
+        except Exception as e:
+            shared.finish(None, e)
+        else:
+            shared.finish(graph)
+
+
+SERVICE_KEY = web.AppKey("service", GraphService)
+
+
+def parse_request(body: Any) -> Tuple[List[TraverseItem], Optional[int]]:
+    start_items = [
+        TraverseItem(RecordId(int(item["id"])), parse_direction(item["direction"]))
+        for item in body["start_items"]
+    ]
+    max_records = body.get("max_records")
+    return (start_items, None if max_records is None else int(max_records))
+
+
+async def handle_graph(request: web.Request) -> web.StreamResponse:
+    service = request.app[SERVICE_KEY]
+    try:
+        (start_items, max_records) = parse_request(await request.json())
+    except (ValueError, KeyError, TypeError) as e:
+        raise web.HTTPBadRequest(text=f"invalid graph request: {e!r}")
+
+    shared = service.request(start_items, max_records)
+    response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+    await response.prepare(request)
+    async for record in shared.stream():
+        await response.write(json.dumps({"record": record}).encode() + b"\n")
+
+    if shared.graph is not None:
+        graph = {k: v for (k, v) in shared.graph.items() if k != "nodes"}
+        await response.write(json.dumps({"graph": graph}).encode() + b"\n")
+    else:
+        await response.write(json.dumps({"error": repr(shared.error)}).encode() + b"\n")
+    await response.write_eof()
+    return response
+
+
+def make_app(service: GraphService) -> web.Application:
+    """Make the web application that serves ``service``."""
+    app = web.Application()
+    app[SERVICE_KEY] = service
+    app.router.add_post("/graph", handle_graph)
+    return app
+
+
+def make_server_app(
+    http_concurrency: int = 10, user_agent: Optional[str] = None
+) -> web.Application:
+    """Make the web application for a service with an in-memory cache
+    and a session that is opened when the application starts and
+    closed when it stops.
+
+    :param http_concurrency: the maximum number of concurrent HTTP
+        requests, shared fairly among the graphs being built
+    :param user_agent: a custom user agent string to use in HTTP requests
+    """
+    service = GraphService(None, FairScheduler(http_concurrency), MemoryCache())
+
+    async def client_context(app: web.Application) -> AsyncIterator[None]:
+        async with make_session(user_agent) as client:
+            service.client = client
+            yield
+            service.client = None
+
+    app = make_app(service)
+    app.cleanup_ctx.append(client_context)
+    return app
+
+
+def main() -> None:
+    """Run the graph service."""
+    parser = argparse.ArgumentParser(description="Run a geneagrapher-core server.")
+    address = parser.add_mutually_exclusive_group()
+    address.add_argument("--socket", help="path of a Unix socket to listen on")
+    address.add_argument("--port", type=int, default=8421, help="TCP port")
+    parser.add_argument("--host", default="127.0.0.1", help="TCP host")
+    parser.add_argument("--http-concurrency", type=int, default=10)
+    parser.add_argument("--user-agent")
+    args = parser.parse_args()
+
+    app = make_server_app(args.http_concurrency, args.user_agent)
+    if args.socket is not None:
+        web.run_app(app, path=args.socket)
+    else:
+        web.run_app(app, host=args.host, port=args.port)
+
+
+async def request_graph(
+    client: ClientSession,
+    start_items: List[TraverseItem],
+    max_records: Optional[int] = None,
+) -> Geneagraph:
+    """Request a graph from a running service and return it.
+
+    :param client: a client session connected to the service
+    :param start_items: a list of nodes and direction from which to traverse from them
+    :param max_records: the maximum number of records to include in the built graph
+    """
+    body = {
+        "start_items": [
+            {"id": item.id, "direction": format_direction(item.traverse_direction)}
+            for item in start_items
+        ],
+        "max_records": max_records,
+    }
+    nodes: Dict[RecordId, Record] = {}
+    async with client.post("/graph", json=body) as resp:
+        resp.raise_for_status()
+        async for line in resp.content:
+            message = json.loads(line)
+            if "record" in message:
+                record: Record = message["record"]
+                nodes[record["id"]] = record
+            elif "graph" in message:
+                graph: Geneagraph = message["graph"]
+                graph["nodes"] = nodes
+                return graph
+            else:
+                raise RuntimeError(f"graph service error: {message['error']}")
+    raise RuntimeError("graph service closed the response early")
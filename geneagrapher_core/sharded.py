@@ -0,0 +1,253 @@
+from geneagrapher_core.record import (
+    Cache,
+    Record,
+    RecordId,
+    get_record_inner,
+    make_session,
+)
+from geneagrapher_core.traverse import (
+    Geneagraph,
+    LifecycleTracking,
+    TraverseDirection,
+    TraverseItem,
+)
+
+from aiohttp import ClientSession
+import asyncio
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.util import Finalize
+import os
+from typing import Awaitable, Callable, List, Literal, Optional, Tuple
+
+
+class WorkerState:
+    """The per-process state of a shard worker. Each worker process
+    owns one event loop and one :class:`aiohttp.ClientSession` for its
+    lifetime.
+    """
+
+    def __init__(
+        self,
+        user_agent: Optional[str],
+        http_concurrency: int,
+        cache_factory: Optional[Callable[[], Cache]],
+    ) -> None:
+        self.loop = asyncio.new_event_loop()
+        self.http_semaphore = asyncio.Semaphore(http_concurrency)
+        self.cache = None if cache_factory is None else cache_factory()
+        self.client = self.loop.run_until_complete(self.make_client(user_agent))
+
+    async def make_client(self, user_agent: Optional[str]) -> ClientSession:
+        return make_session(user_agent)
+
+    async def fetch(
+        self, ids: List[RecordId]
+    ) -> List[Tuple[RecordId, Optional[Record]]]:
+        records = await asyncio.gather(
+            *[
+                get_record_inner(rid, self.client, self.http_semaphore, self.cache)
+                for rid in ids
+            ]
+        )
+        return list(zip(ids, records))
+
+    def close(self) -> None:
+        self.loop.run_until_complete(self.client.close())
+        self.loop.close()
+
+
+worker_state: Optional[WorkerState] = None
+
+
+def init_worker(
+    user_agent: Optional[str],
+    http_concurrency: int,
+    cache_factory: Optional[Callable[[], Cache]],
+) -> None:
+    """Initialize a shard worker process."""
+    global worker_state
+    worker_state = WorkerState(user_agent, http_concurrency, cache_factory)
+    Finalize(worker_state, worker_state.close, exitpriority=10)
+
+
+def fetch_batch(ids: List[RecordId]) -> List[Tuple[RecordId, Optional[Record]]]:
+    """Fetch and parse a batch of records in a shard worker process."""
+    assert worker_state is not None
+    return worker_state.loop.run_until_complete(worker_state.fetch(ids))
+
+
+def shard_for(id: RecordId, num_shards: int) -> int:
+    """Return the shard that owns a record ID."""
+    return hash(id) % num_shards
+
+
+async def build_graph_sharded(
+    start_items: List[TraverseItem],
+    *,
+    num_shards: Optional[int] = None,
+    http_concurrency: int = 10,
+    batch_size: int = 50,
+    max_records: Optional[int] = None,
+    user_agent: Optional[str] = None,
+    cache_factory: Optional[Callable[[], Cache]] = None,
+    record_callback: Optional[
+        Callable[[asyncio.TaskGroup, Record], Awaitable[None]]
+    ] = None,
+    report_callback: Optional[
+        Callable[[asyncio.TaskGroup, int, int, int], Awaitable[None]]
+    ] = None,
+) -> Geneagraph:
+    """Build a geneagraph like :func:`build_graph
+    <geneagrapher_core.traverse.build_graph>` does, but fetch and
+    parse records in several worker processes.
+
+    Record IDs are partitioned across shards by hash. Each shard is a
+    worker process with its own event loop and
+    :class:`aiohttp.ClientSession`. The calling process coordinates
+    the traversal: it deduplicates record IDs across shards, sends
+    each shard batches of the IDs it owns, and assembles the
+    graph. Callbacks are called in the calling process.
+
+    :param start_items: a list of nodes and direction from which to traverse from them
+    :param num_shards: the number of worker processes (defaults to the CPU count)
+    :param http_concurrency: the maximum concurrent HTTP requests per worker
+    :param batch_size: the maximum number of records sent to a worker at once
+    :param max_records: the maximum number of records to include in the built graph
+    :param user_agent: a custom user agent string to use in HTTP requests
+    :param cache_factory: a picklable callable that creates a cache object in
+        each worker
+    :param record_callback: callback function called with record data as it is retrieved
+    :param report_callback: callback function called to report graph-building progress
+    """
+    num_shards = num_shards or os.cpu_count() or 1
+    ggraph: Geneagraph = {
+        "start_nodes": [n.id for n in start_items],
+        "nodes": {},
+        "status": "complete",
+    }
+
+    seen: set[RecordId] = set()
+    pending: List[deque[TraverseItem]] = [deque() for _ in range(num_shards)]
+    for item in start_items:
+        if item.id not in seen:
+            seen.add(item.id)
+            pending[shard_for(item.id, num_shards)].append(item)
+
+    # Each shard has at most one batch in flight. This maps the
+    # in-flight task to its shard and the items in its batch.
+    in_flight: dict[
+        asyncio.Task[List[Tuple[RecordId, Optional[Record]]]],
+        Tuple[int, dict[RecordId, TraverseItem]],
+    ] = {}
+    num_doing = 0
+    num_done = 0
+    num_received = 0
+
+    def num_todo() -> int:
+        return sum(len(p) for p in pending)
+
+    async def report_back(tg: asyncio.TaskGroup) -> None:
+        if report_callback is not None:
+            await report_callback(tg, num_todo(), num_doing, num_done)
+
+    def dispatch_limit() -> int:
+        if max_records is None:
+            return batch_size
+        # Like build_graph, allow only slightly more records to be
+        # requested than are needed.
+        return min(
+            batch_size,
+            max_records
+            + LifecycleTracking.PROCESSING_OVERAGE_BUFFER
+            - num_received
+            - num_doing,
+        )
+
+    def add_neighbor_work(
+        record: Record, traverse_direction: TraverseDirection
+    ) -> None:
+        key: Literal["advisors", "descendants"] = (
+            "advisors"
+            if traverse_direction is TraverseDirection.ADVISORS
+            else "descendants"
+        )
+        for id in record[key]:
+            if id not in seen:
+                seen.add(RecordId(id))
+                pending[shard_for(RecordId(id), num_shards)].append(
+                    TraverseItem(RecordId(id), traverse_direction)
+                )
+
+    async def add_record(
+        tg: asyncio.TaskGroup, record: Record, item: TraverseItem
+    ) -> None:
+        if max_records is not None and len(ggraph["nodes"]) >= max_records:
+            # The graph is now as large as it is allowed to be.
+            ggraph["status"] = "truncated"
+            ggraph["truncation_reason"] = "max_records"
+            return
+
+        ggraph["nodes"][item.id] = record
+        if record_callback is not None:
+            await record_callback(tg, record)
+
+        for td in (TraverseDirection.ADVISORS, TraverseDirection.DESCENDANTS):
+            if td in item.traverse_direction:
+                add_neighbor_work(record, td)
+
+    async def run_batch(
+        shard: int, ids: List[RecordId]
+    ) -> List[Tuple[RecordId, Optional[Record]]]:
+        return await asyncio.wrap_future(executors[shard].submit(fetch_batch, ids))
+
+    executors = [
+        ProcessPoolExecutor(
+            max_workers=1,
+            initializer=init_worker,
+            initargs=(user_agent, http_concurrency, cache_factory),
+        )
+        for _ in range(num_shards)
+    ]
+    try:
+        async with asyncio.TaskGroup() as tg:
+            while in_flight or num_todo() > 0:
+                busy = {shard for (shard, _) in in_flight.values()}
+                for shard, queue in enumerate(pending):
+                    limit = dispatch_limit()
+                    if shard in busy or not queue or limit <= 0:
+                        continue
+                    batch: dict[RecordId, TraverseItem] = {}
+                    while queue and len(batch) < limit:
+                        item = queue.popleft()
+                        batch[item.id] = item
+                    task = tg.create_task(run_batch(shard, list(batch)))
+                    in_flight[task] = (shard, batch)
+                    num_doing += len(batch)
+                    await report_back(tg)
+
+                if not in_flight:
+                    # Nothing could be dispatched because the maximum
+                    # number of records has been received. We're done.
+                    for queue in pending:
+                        queue.clear()
+                    await report_back(tg)
+                    break
+
+                finished, _ = await asyncio.wait(
+                    in_flight, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in finished:
+                    (_, batch) = in_flight.pop(task)
+                    for rid, record in task.result():
+                        num_doing -= 1
+                        num_done += 1
+                        if record is not None:
+                            num_received += 1
+                            await add_record(tg, record, batch[rid])
+                    await report_back(tg)
+    finally:
+        for executor in executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    return ggraph
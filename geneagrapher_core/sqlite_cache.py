@@ -0,0 +1,157 @@
+from geneagrapher_core.record import CacheResult, Record, RecordId
+from geneagrapher_core.traverse import CacheClosure, TraverseDirection, TraverseItem
+
+import asyncio
+import json
+import sqlite3
+import threading
+from typing import Any, Dict, List, Literal, Optional, Tuple
+
+# Each record's advisors or descendants, followed transitively from
+# the IDs in the JSON array parameter, joined to their cached rows.
+# IDs without a row are not cached. IDs with a NULL record are cached
+# as not existing. The second parameter limits the number of IDs
+# visited (-1 for no limit).
+CLOSURE_QUERY = """
+WITH RECURSIVE reachable(id) AS (
+    SELECT value FROM json_each(?)
+    UNION
+    SELECT linked.value
+    FROM reachable
+    JOIN records ON records.id = reachable.id,
+    json_each(records.record, '$.{key}') AS linked
+    LIMIT ?
+)
+SELECT reachable.id, records.id IS NOT NULL, records.record
+FROM reachable LEFT JOIN records ON records.id = reachable.id
+"""
+
+
+class SQLiteCache:
+    """A :class:`Cache <geneagrapher_core.record.Cache>` stored in a
+    SQLite database file. It implements :class:`BatchCache
+    <geneagrapher_core.record.BatchCache>` and :class:`ClosureCache
+    <geneagrapher_core.traverse.ClosureCache>`. The closure of a set
+    of items is found with one recursive query, so a graph whose
+    records are all cached is resolved without a lookup per record.
+
+    :param path: the path of the database file
+
+    **Example**::
+
+        cache = SQLiteCache("records.db")
+        graph = await build_graph(start_items, cache=cache)
+
+    """
+
+    def __init__(self, path: str) -> None:
+        # Queries run in worker threads so that waiting for another
+        # process's write lock (up to the 30 second timeout) does not
+        # block the event loop. The lock keeps one thread at a time on
+        # the connection.
+        self.db = sqlite3.connect(
+            path, isolation_level=None, timeout=30, check_same_thread=False
+        )
+        self.lock = threading.Lock()
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS records (id INTEGER PRIMARY KEY, record TEXT)"
+        )
+
+    def close(self) -> None:
+        with self.lock:
+            self.db.close()
+
+    def query(self, sql: str, params: Tuple[Any, ...]) -> List[Tuple[Any, ...]]:
+        with self.lock:
+            return self.db.execute(sql, params).fetchall()
+
+    def write(self, rows: List[Tuple[int, Optional[str]]]) -> None:
+        with self.lock:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO records (id, record) VALUES (?, ?)", rows
+            )
+
+    async def get(self, id: RecordId) -> Tuple[CacheResult, Optional[Record]]:
+        return (await self.get_many([id]))[id]
+
+    async def set(self, id: RecordId, value: Optional[Record]) -> None:
+        await self.set_many({id: value})
+
+    async def get_many(
+        self, ids: List[RecordId]
+    ) -> Dict[RecordId, Tuple[CacheResult, Optional[Record]]]:
+        results: Dict[RecordId, Tuple[CacheResult, Optional[Record]]] = {
+            id: (CacheResult.MISS, None) for id in ids
+        }
+        rows = await asyncio.to_thread(
+            self.query,
+            """SELECT id, record FROM records
+            WHERE id IN (SELECT value FROM json_each(?))""",
+            (json.dumps(ids),),
+        )
+        for id, record in rows:
+            results[id] = (
+                CacheResult.HIT,
+                None if record is None else json.loads(record),
+            )
+        return results
+
+    async def set_many(self, values: Dict[RecordId, Optional[Record]]) -> None:
+        await asyncio.to_thread(
+            self.write,
+            [
+                (id, None if record is None else json.dumps(record))
+                for (id, record) in values.items()
+            ],
+        )
+
+    async def get_closure(
+        self, items: List[TraverseItem], limit: Optional[int] = None
+    ) -> Optional[CacheClosure]:
+        # Like LifecycleTracking, the last of several items with the
+        # same ID wins.
+        start = {item.id: item.traverse_direction for item in items}
+        records: Dict[RecordId, Record] = {}
+        reached: Dict[RecordId, TraverseDirection] = {}
+        key: Literal["advisors", "descendants"]
+        for direction, key in (
+            (TraverseDirection.ADVISORS, "advisors"),
+            (TraverseDirection.DESCENDANTS, "descendants"),
+        ):
+            ids = [id for (id, d) in start.items() if direction in d]
+            if len(ids) == 0:
+                continue
+            rows = await asyncio.to_thread(
+                self.query,
+                CLOSURE_QUERY.format(key=key),
+                (json.dumps(ids), -1 if limit is None else limit + 1),
+            )
+            if limit is not None and len(rows) > limit:
+                return None
+            for id, cached, record in rows:
+                if cached and record is None:
+                    # Records that do not exist have no links to follow.
+                    continue
+                reached[id] = reached.get(id, TraverseDirection(0)) | direction
+                if cached and id not in records:
+                    records[id] = json.loads(record)
+
+        # build_graph follows each record only in its start direction
+        # or the direction in which it is first reached. Where the
+        # query followed a record in another direction as well, its
+        # result could include records that build_graph would not.
+        both = TraverseDirection.ADVISORS | TraverseDirection.DESCENDANTS
+        for id, direction in reached.items():
+            if direction != start.get(id, direction) or (
+                id not in start and direction == both
+            ):
+                return None
+
+        return CacheClosure(
+            records,
+            [
+                TraverseItem(RecordId(id), d)
+                for (id, d) in reached.items()
+                if id not in records
+            ],
+        )
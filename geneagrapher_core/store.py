@@ -0,0 +1,116 @@
+from geneagrapher_core.record import Record, RecordId
+
+import json
+import sqlite3
+from types import TracebackType
+from typing import Dict, Iterator, MutableMapping, Optional, Type
+
+
+class SpillingRecordStore(MutableMapping[RecordId, Record]):
+    """A mapping of record IDs to records that keeps up to
+    ``max_in_memory`` records in memory and stores the rest in a
+    SQLite database on disk. Reads of stored records load them from
+    the database, so the memory used stays bounded however many
+    records the mapping holds.
+
+    By default, the database is a temporary file that SQLite deletes
+    when the store is closed.
+
+    The store is not a :class:`dict`, so :func:`json.dumps` needs
+    ``default=dict`` to serialize it (or a structure containing it).
+
+    :param max_in_memory: the maximum number of records to keep in memory
+    :param path: the path of the database file, or an empty string for
+        a temporary file
+
+    **Example**::
+
+        with SpillingRecordStore(10000) as nodes:
+            nodes[record["id"]] = record
+            ...
+            for record in nodes.values():
+                ...
+
+    """
+
+    def __init__(self, max_in_memory: int, path: str = "") -> None:
+        self.max_in_memory = max_in_memory
+        self.memory: Dict[RecordId, Record] = {}
+        self.num_spilled = 0
+        self.db = sqlite3.connect(path, isolation_level=None)
+        # The database only holds data for the life of this object, so
+        # it does not need to survive crashes.
+        self.db.executescript(
+            """
+            PRAGMA journal_mode = OFF;
+            PRAGMA synchronous = OFF;
+            DROP TABLE IF EXISTS records;
+            CREATE TABLE records (
+                id INTEGER PRIMARY KEY,
+                record TEXT NOT NULL
+            );
+            """
+        )
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self) -> "SpillingRecordStore":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+    def __getitem__(self, id: RecordId) -> Record:
+        if id in self.memory:
+            return self.memory[id]
+        row = self.db.execute(
+            "SELECT record FROM records WHERE id = ?", (id,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(id)
+        record: Record = json.loads(row[0])
+        return record
+
+    def __setitem__(self, id: RecordId, record: Record) -> None:
+        if id in self.memory or len(self.memory) < self.max_in_memory:
+            if id not in self.memory and self.num_spilled > 0:
+                # Keep each ID in only one place.
+                if self.delete_spilled(id):
+                    self.num_spilled -= 1
+            self.memory[id] = record
+            return
+        if not self.delete_spilled(id):
+            self.num_spilled += 1
+        self.db.execute(
+            "INSERT INTO records (id, record) VALUES (?, ?)", (id, json.dumps(record))
+        )
+
+    def __delitem__(self, id: RecordId) -> None:
+        if id in self.memory:
+            del self.memory[id]
+        elif self.delete_spilled(id):
+            self.num_spilled -= 1
+        else:
+            raise KeyError(id)
+
+    def delete_spilled(self, id: RecordId) -> bool:
+        """Delete a record from the database and return True if it was
+        there. The count of spilled records is not changed.
+        """
+        cursor = self.db.execute("DELETE FROM records WHERE id = ?", (id,))
+        return cursor.rowcount > 0
+
+    def __iter__(self) -> Iterator[RecordId]:
+        yield from list(self.memory)
+        if self.num_spilled > 0:
+            for (id,) in self.db.execute("SELECT id FROM records ORDER BY id"):
+                yield RecordId(id)
+
+    def __len__(self) -> int:
+        return len(self.memory) + self.num_spilled
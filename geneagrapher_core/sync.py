@@ -0,0 +1,145 @@
+from geneagrapher_core.record import (
+    Cache,
+    Record,
+    RecordId,
+    get_record_inner,
+    make_session,
+)
+from geneagrapher_core.traverse import Geneagraph, TraverseItem, build_graph
+
+from aiohttp import ClientSession
+import asyncio
+import threading
+from types import TracebackType
+from typing import Any, Coroutine, List, Optional, Type, TypeVar
+
+T = TypeVar("T")
+
+
+class SyncClient:
+    """A client for code that does not run an event loop, such as
+    request handlers in synchronous web frameworks.
+
+    The client runs an event loop in a background thread for its
+    lifetime, with one :class:`aiohttp.ClientSession` and HTTP
+    semaphore that are shared by all calls. This reuses connections
+    across calls, which ``asyncio.run(build_graph(...))`` cannot do.
+    Its methods block until the result is available and may be called
+    from any number of threads at once.
+
+    Call :meth:`close` (or use the client as a context manager) to
+    close the session and stop the thread.
+
+    :param http_concurrency: the maximum number of concurrent HTTP
+        requests, across all calls
+    :param user_agent: a custom user agent string to use in HTTP requests
+    :param cache: a cache object for getting and storing results; it
+        is only used from the background thread
+
+    **Example**::
+
+        client = SyncClient()
+
+        def handle_request(request):
+            record = client.get_record(RecordId(18231), timeout=10)
+            ...
+
+    """
+
+    def __init__(
+        self,
+        *,
+        http_concurrency: int = 10,
+        user_agent: Optional[str] = None,
+        cache: Optional[Cache] = None,
+    ) -> None:
+        self.cache = cache
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(
+            target=self.loop.run_forever, name="geneagrapher-core", daemon=True
+        )
+        self.thread.start()
+        self.http_semaphore = asyncio.Semaphore(http_concurrency)
+        self.client = self.run(self.make_client(user_agent))
+
+    async def make_client(self, user_agent: Optional[str]) -> ClientSession:
+        return make_session(user_agent)
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: Optional[float] = None) -> T:
+        """Run a coroutine on the background event loop and return its
+        result. If ``timeout`` seconds pass first, the coroutine is
+        cancelled and :class:`TimeoutError` is raised.
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def get_record(
+        self, record_id: RecordId, timeout: Optional[float] = None
+    ) -> Optional[Record]:
+        """Get a single record.
+
+        :param record_id: Math Genealogy Project ID of the record to retrieve
+        :param timeout: the maximum number of seconds to wait
+        """
+        return self.run(
+            get_record_inner(record_id, self.client, self.http_semaphore, self.cache),
+            timeout,
+        )
+
+    def build_graph(
+        self,
+        start_items: List[TraverseItem],
+        *,
+        timeout: Optional[float] = None,
+        max_records: Optional[int] = None,
+        time_budget: Optional[float] = None,
+        max_retries: int = 0,
+        skip_failures: bool = False,
+    ) -> Geneagraph:
+        """Build a geneagraph. See :func:`build_graph
+        <geneagrapher_core.traverse.build_graph>` for a description of
+        the arguments.
+
+        Unlike ``time_budget``, which returns the part of the graph
+        built in time, ``timeout`` raises :class:`TimeoutError` if the
+        graph is not built in time.
+
+        :param timeout: the maximum number of seconds to wait
+        """
+        return self.run(
+            build_graph(
+                start_items,
+                http_semaphore=self.http_semaphore,
+                max_records=max_records,
+                time_budget=time_budget,
+                max_retries=max_retries,
+                skip_failures=skip_failures,
+                client=self.client,
+                cache=self.cache,
+            ),
+            timeout,
+        )
+
+    def close(self) -> None:
+        """Close the session and stop the background thread."""
+        if self.loop.is_closed():
+            return
+        self.run(self.client.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    def __enter__(self) -> "SyncClient":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
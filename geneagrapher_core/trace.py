@@ -0,0 +1,91 @@
+from contextlib import contextmanager
+import json
+import os
+import time
+from typing import Any, Callable, Dict, Iterator, List, Literal, TextIO
+
+
+class Tracer:
+    """Records timestamped events for the records of a traversal and
+    exports them in the Chrome trace event format, which can be
+    opened in timeline viewers such as Perfetto or ``about:tracing``.
+
+    Each record's events are shown on their own row (the record ID is
+    used as the thread ID), so a timeline shows when each record was
+    queued, how long it waited for the HTTP semaphore, and how long
+    its cache lookup, HTTP request, and parsing took.
+
+    :param clock: a function returning the current time in seconds
+
+    **Example**::
+
+        tracer = Tracer()
+        graph = await build_graph(start_items, tracer=tracer)
+        with open("trace.json", "w") as f:
+            tracer.write(f)
+
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter) -> None:
+        self.clock = clock
+        self.start = clock()
+        self.pid = os.getpid()
+        self.events: List[Dict[str, Any]] = []
+
+    def add_event(
+        self, name: str, phase: Literal["B", "E", "i"], record_id: int
+    ) -> None:
+        self.events.append(
+            {
+                "name": name,
+                "ph": phase,
+                "ts": (self.clock() - self.start) * 1e6,
+                "pid": self.pid,
+                "tid": record_id,
+            }
+        )
+
+    def instant(self, name: str, record_id: int) -> None:
+        """Record an event that happened to a record now."""
+        self.add_event(name, "i", record_id)
+
+    def begin(self, name: str, record_id: int) -> None:
+        """Record the beginning of a step for a record. Steps for one
+        record must end in the reverse order that they begin.
+        """
+        self.add_event(name, "B", record_id)
+
+    def end(self, name: str, record_id: int) -> None:
+        """Record the end of a step for a record."""
+        self.add_event(name, "E", record_id)
+
+    @contextmanager
+    def span(self, name: str, record_id: int) -> Iterator[None]:
+        """Record the beginning and end of a step for a record."""
+        self.begin(name, record_id)
+        try:
+            yield
+        finally:
+            self.end(name, record_id)
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Return the events in the Chrome trace event format."""
+        return {"traceEvents": self.events, "displayTimeUnit": "ms"}
+
+    def write(self, f: TextIO) -> None:
+        """Write the events to a file in the Chrome trace event format."""
+        json.dump(self.to_chrome_trace(), f)
+
+
+class NullTracer(Tracer):
+    """A tracer that records nothing. It is used when no tracer is
+    passed.
+    """
+
+    def add_event(
+        self, name: str, phase: Literal["B", "E", "i"], record_id: int
+    ) -> None:
+        pass
+
+
+NULL_TRACER = NullTracer()
@@ -0,0 +1,60 @@
+from geneagrapher_core.record import RecordId, Transport, fetch_page
+
+from aiohttp import ClientSession
+from pathlib import Path
+from typing import Union
+
+
+class HTTPTransport:
+    """A :class:`Transport <geneagrapher_core.record.Transport>` that
+    requests record pages from the Math Genealogy Project. This is
+    what :func:`get_record_inner
+    <geneagrapher_core.record.get_record_inner>` does when no
+    transport is passed.
+
+    :param client: a client session object with which to make HTTP requests
+    """
+
+    def __init__(self, client: ClientSession) -> None:
+        self.client = client
+
+    async def fetch(self, id: RecordId) -> str:
+        return await fetch_page(id, self.client)
+
+
+class DirectoryTransport:
+    """A :class:`Transport <geneagrapher_core.record.Transport>` that
+    reads record pages from files named ``<id>.html`` in a directory,
+    such as one written by :class:`RecordingTransport`. Requests for
+    pages that are not in the directory raise
+    :class:`FileNotFoundError`.
+
+    :param path: the directory of record pages
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+
+    async def fetch(self, id: RecordId) -> str:
+        return (self.path / f"{id}.html").read_text(encoding="utf-8")
+
+
+class RecordingTransport:
+    """A :class:`Transport <geneagrapher_core.record.Transport>` that
+    saves every page retrieved by another transport to a directory.
+    The pages can be replayed later with :class:`DirectoryTransport`.
+
+    :param transport: the transport that retrieves pages
+    :param path: the directory to save pages in, which is created if
+        it does not exist
+    """
+
+    def __init__(self, transport: Transport, path: Union[str, Path]) -> None:
+        self.transport = transport
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    async def fetch(self, id: RecordId) -> str:
+        page = await self.transport.fetch(id)
+        (self.path / f"{id}.html").write_text(page, encoding="utf-8")
+        return page
@@ -1,43 +1,47 @@
+from geneagrapher_core.cache import TieredCache, WriteBehindCache
 from geneagrapher_core.record import (
     Cache,
     Record,
     RecordId,
+    Transport,
     get_record_inner,
+    make_session,
 )
+from geneagrapher_core.store import SpillingRecordStore
+from geneagrapher_core.trace import NULL_TRACER, Tracer
 
-from aiohttp import ClientSession, TCPConnector
+from aiohttp import ClientSession
+from array import array
 import asyncio
+import contextlib
 from enum import Flag, auto
 import functools
-from pathlib import Path
-import ssl
-from typing import Awaitable, Callable, List, Literal, NamedTuple, Optional, TypedDict
-
-
-def build_intermediate_connector() -> TCPConnector:
-    """Build a connector object to be used by aiohttp that includes intermediate
-    certificates needed to currently validate the Math Genealogy Project SSL
-    certificate.
-
-    This was added for #5 and can hopefully be removed in the future.
-    """
-    current_directory_path = Path(__file__).absolute().parent
-    intermediate_cert_path = current_directory_path / "mathgenealogy-intermediate.pem"
-
-    # Create a default SSL context.
-    ssl_context = ssl.create_default_context()
-
-    # Load the intermediate certificate. This adds it to the chain of trust.
-    ssl_context.load_verify_locations(cafile=intermediate_cert_path)
-
-    # Create a TCPConnector with our custom SSL context.
-    return TCPConnector(ssl=ssl_context)
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Iterator,
+    Literal,
+    MutableMapping,
+    MutableSet,
+    NamedTuple,
+    NotRequired,
+    Optional,
+    Protocol,
+    Set,
+    TypedDict,
+    cast,
+)
 
 
 class Geneagraph(TypedDict):
     start_nodes: List[RecordId]
-    nodes: dict[RecordId, Record]
-    status: Literal["complete", "truncated"]
+    nodes: MutableMapping[RecordId, Record]
+    status: Literal["complete", "truncated", "incomplete"]
+    truncation_reason: NotRequired[Literal["max_records", "time_budget"]]
+    failed: NotRequired[List[RecordId]]
+    cache_write_failed: NotRequired[List[RecordId]]
 
 
 class TraverseDirection(Flag):
@@ -55,6 +59,56 @@ class TraverseItem(NamedTuple):
     traverse_direction: TraverseDirection
 
 
+class CacheClosure(NamedTuple):
+    """The part of a graph that a :class:`ClosureCache` could resolve."""
+
+    #: The cached records reachable from the start items.
+    records: Dict[RecordId, Record]
+    #: Items reachable from the start items whose records are not in
+    #: the cache, with the directions in which they are reached.
+    frontier: List[TraverseItem]
+
+
+class ClosureCache(Cache, Protocol):
+    """This extends :class:`Cache <geneagrapher_core.record.Cache>`
+    with a method that resolves the cached part of a graph in one
+    call, for caches that can follow links between records themselves
+    (e.g., with a recursive query). :func:`build_graph` uses it when
+    the cache provides it and only requests the frontier records.
+    """
+
+    async def get_closure(
+        self, items: List[TraverseItem], limit: Optional[int] = None
+    ) -> Optional[CacheClosure]:
+        """Return the cached records that can be reached from
+        ``items`` by following advisors from items with the
+        ``ADVISORS`` direction and descendants from items with the
+        ``DESCENDANTS`` direction, and the reachable items whose
+        records are not cached. Records cached as not existing are in
+        neither.
+
+        :func:`build_graph` follows each record only in the direction
+        in which it is first reached (or its start direction), so
+        return None when a record would be reached from both
+        directions or a start item would be reached in a direction
+        other than its own. The caller then traverses the graph
+        incrementally, and the result matches a traversal without the
+        closure.
+
+        :param items: the items from which to traverse
+        :param limit: if given, return None instead when more than
+            this many records would be visited from the items of
+            either direction, so that the caller can traverse the graph
+            incrementally instead of loading it all at once
+        """
+        ...
+
+
+#: The delay, in seconds, before the first retry of a failed record
+#: request. The delay doubles with each subsequent retry.
+RETRY_BASE_DELAY = 0.5
+
+
 class MaxRecordsException(Exception):
     pass
 
@@ -74,7 +128,7 @@ class LifecycleTracking:
     ):
         self.todo: dict[RecordId, TraverseItem] = {ti.id: ti for ti in start_items}
         self.doing: dict[RecordId, TraverseItem] = {}
-        self.done: set[RecordId] = set()
+        self.done: MutableSet[RecordId] = set()
         self.max_records = max_records
         self._report_callback = report_callback
         self.num_records_received = 0
@@ -117,6 +171,13 @@ class LifecycleTracking:
         await self.report_back()
         return item
 
+    def mark_done(self, id: RecordId) -> None:
+        """Record that a record was retrieved before the traversal
+        started (e.g., from a :class:`ClosureCache`).
+        """
+        self.done.add(id)
+        self.num_records_received += 1
+
     async def finish(self, id: RecordId, got_record: bool) -> None:
         """Move a record ID from the `doing` set to the `done` set and
         call the `report_back` callback function. Record if a record
@@ -160,12 +221,152 @@ class LifecycleTracking:
             await self._report_callback(self.num_todo, len(self.doing), len(self.done))
 
 
+class RecordIdBitmap(MutableSet[RecordId]):
+    """A set of record IDs stored as a bitmap with one bit per
+    possible ID. Math Genealogy Project IDs are dense, so this takes
+    far less memory than a :class:`set` for large traversals.
+
+    Only IDs from 0 up to ``MAX_DENSE_ID`` are kept in the bitmap, so
+    it never grows beyond ``MAX_DENSE_ID / 8`` bytes (2 MiB). Other
+    IDs, which can be requested but do not exist, are kept in a
+    :class:`set`.
+    """
+
+    MAX_DENSE_ID = (1 << 24) - 1
+
+    def __init__(self) -> None:
+        self.bits = bytearray()
+        self.count = 0
+        self.others: Set[RecordId] = set()
+
+    def __contains__(self, id: object) -> bool:
+        if not isinstance(id, int):
+            return False
+        if not 0 <= id <= RecordIdBitmap.MAX_DENSE_ID:
+            return id in self.others
+        byte = id >> 3
+        return byte < len(self.bits) and bool(self.bits[byte] & (1 << (id & 7)))
+
+    def __iter__(self) -> Iterator[RecordId]:
+        for byte, value in enumerate(self.bits):
+            if value:
+                for bit in range(8):
+                    if value & (1 << bit):
+                        yield RecordId(byte << 3 | bit)
+        yield from sorted(self.others)
+
+    def __len__(self) -> int:
+        return self.count + len(self.others)
+
+    def add(self, id: RecordId) -> None:
+        if not 0 <= id <= RecordIdBitmap.MAX_DENSE_ID:
+            self.others.add(id)
+            return
+        byte = id >> 3
+        if byte >= len(self.bits):
+            self.bits.extend(bytes(byte + 1 - len(self.bits)))
+        mask = 1 << (id & 7)
+        if not self.bits[byte] & mask:
+            self.bits[byte] |= mask
+            self.count += 1
+
+    def discard(self, id: RecordId) -> None:
+        if not 0 <= id <= RecordIdBitmap.MAX_DENSE_ID:
+            self.others.discard(id)
+        elif id in self:
+            self.bits[id >> 3] &= ~(1 << (id & 7)) & 0xFF
+            self.count -= 1
+
+
+class CompactLifecycleTracking(LifecycleTracking):
+    """A :class:`LifecycleTracking` that uses less memory for very
+    large traversals. The records that have been seen (in any state)
+    and the records that are done are kept in bitmaps, and the records
+    to do are kept in an integer array with each record's traversal
+    direction packed into the low bits of its entry. Records being
+    fetched are kept in ``doing`` as usual; there are only as many of
+    those as there are concurrent requests. The ``todo`` dictionary is
+    not used.
+
+    IDs too large (or negative) to pack into a 64-bit entry are kept
+    in a list of items instead.
+    """
+
+    DIRECTION_BITS = 2
+    MAX_PACKED_ID = (1 << (63 - DIRECTION_BITS)) - 1
+
+    def __init__(
+        self,
+        start_items: List[TraverseItem],
+        max_records: Optional[int],
+        report_callback: Optional[Callable[[int, int, int], Awaitable[None]]] = None,
+    ):
+        super().__init__([], max_records, report_callback)
+        self.done = RecordIdBitmap()
+        self.seen = RecordIdBitmap()
+        self.todo_stack = array("q")
+        self.unpacked_todo: List[TraverseItem] = []
+        for ti in start_items:
+            self.push(ti.id, ti.traverse_direction)
+
+    def push(self, id: RecordId, direction: TraverseDirection) -> None:
+        if id not in self.seen:
+            self.seen.add(id)
+            if 0 <= id <= CompactLifecycleTracking.MAX_PACKED_ID:
+                self.todo_stack.append(
+                    id << CompactLifecycleTracking.DIRECTION_BITS | direction.value
+                )
+            else:
+                self.unpacked_todo.append(TraverseItem(id, direction))
+
+    @property
+    def num_todo(self) -> int:
+        return len(self.todo_stack) + len(self.unpacked_todo)
+
+    def mark_done(self, id: RecordId) -> None:
+        super().mark_done(id)
+        self.seen.add(id)
+
+    async def purge_todo(self) -> None:
+        del self.todo_stack[:]
+        self.unpacked_todo.clear()
+        await self.report_back()
+
+    async def create(self, id: RecordId, direction: TraverseDirection) -> None:
+        if id not in self.seen:
+            self.push(id, direction)
+            await self.report_back()
+
+    async def start_next(self) -> TraverseItem:
+        if self.unpacked_todo:
+            item = self.unpacked_todo.pop()
+        else:
+            packed = self.todo_stack.pop()
+            mask = (1 << CompactLifecycleTracking.DIRECTION_BITS) - 1
+            item = TraverseItem(
+                RecordId(packed >> CompactLifecycleTracking.DIRECTION_BITS),
+                TraverseDirection(packed & mask),
+            )
+        self.doing[item.id] = item
+        await self.report_back()
+        return item
+
+
 async def build_graph(
     start_items: List[TraverseItem],
     *,
     http_semaphore: Optional[asyncio.Semaphore] = None,
     max_records: Optional[int] = None,
+    time_budget: Optional[float] = None,
+    max_retries: int = 0,
+    skip_failures: bool = False,
+    compact_tracking: bool = False,
+    write_behind: bool = False,
+    memory_budget: Optional[int] = None,
     user_agent: Optional[str] = None,
+    client: Optional[ClientSession] = None,
+    tracer: Optional[Tracer] = None,
+    transport: Optional[Transport] = None,
     cache: Optional[Cache] = None,
     record_callback: Optional[
         Callable[[asyncio.TaskGroup, Record], Awaitable[None]]
@@ -180,8 +381,41 @@ async def build_graph(
     :param start_items: a list of nodes and direction from which to traverse from them
     :param http_semaphore: a semaphore to limit HTTP request concurrency
     :param max_records: the maximum number of records to include in the built graph
+    :param time_budget: the maximum number of seconds to spend building the graph
+    :param max_retries: the number of times to retry a record request that failed
+    :param skip_failures: if True, leave records whose requests failed out of the
+        graph instead of raising an exception
+    :param compact_tracking: if True, track traversal state with
+        :class:`CompactLifecycleTracking`, which uses less memory for
+        traversals of hundreds of thousands of records
+    :param write_behind: if True, store records in ``cache`` in the background
+        with a :class:`WriteBehindCache
+        <geneagrapher_core.cache.WriteBehindCache>` instead of waiting for
+        each write, and wait for the writes to finish before returning
+        (a :class:`TieredCache <geneagrapher_core.cache.TieredCache>` with
+        the ``"write-back"`` policy is also flushed before returning);
+        waiting for writes counts against ``time_budget``, and records
+        not written in time are listed in the graph's ``cache_write_failed``
+    :param memory_budget: the maximum number of records to keep in
+        memory; if set, the graph's ``nodes`` are a
+        :class:`SpillingRecordStore
+        <geneagrapher_core.store.SpillingRecordStore>` that stores the
+        records past the budget in a temporary file, which the caller
+        must close (it is closed here if an exception is raised); use
+        ``json.dumps(graph, default=dict)`` to serialize such a graph
     :param user_agent: a custom user agent string to use in HTTP requests
-    :param cache: a cache object for getting and storing results
+    :param client: a client session object with which to make HTTP
+        requests; if None, a session is created for this graph and
+        closed when it is done (``user_agent`` is ignored if a session
+        is passed)
+    :param tracer: a tracer that records when each record is queued,
+        fetched, and processed
+    :param transport: a transport with which to retrieve record pages
+        instead of making HTTP requests (e.g., to replay saved pages)
+    :param cache: a cache object for getting and storing results; if it
+        implements :class:`ClosureCache`, the cached part of the graph is
+        resolved with one ``get_closure`` call (unless it is larger than
+        ``max_records`` or ``memory_budget``)
     :param record_callback: callback function called with record data as it is retrieved
     :param report_callback: callback function called to report graph-building progress
 
@@ -201,11 +435,16 @@ async def build_graph(
     """
     ggraph: Geneagraph = {
         "start_nodes": [n.id for n in start_items],
-        "nodes": {},
+        "nodes": {} if memory_budget is None else SpillingRecordStore(memory_budget),
         "status": "complete",
     }
 
+    tracer = tracer or NULL_TRACER
+    for item in start_items:
+        tracer.instant("queued", item.id)
+
     continue_event = asyncio.Event()
+    tracking_class = CompactLifecycleTracking if compact_tracking else LifecycleTracking
 
     def below_max_records() -> bool:
         return max_records is None or len(ggraph["nodes"]) < max_records
@@ -219,17 +458,58 @@ async def build_graph(
             else "descendants"
         )
         for id in record[key]:
+            num_todo = tracking.num_todo
             await tracking.create(RecordId(id), traverse_direction)
+            if tracking.num_todo > num_todo:
+                tracer.instant("queued", id)
             if tracking.num_todo > 0:
                 # New work was added to the todo queue. Signal the
                 # loop below.
                 continue_event.set()
 
+    async def fetch_with_retries(
+        item: TraverseItem, client: ClientSession, cache: Optional[Cache]
+    ) -> Optional[Record]:
+        get_record = functools.partial(
+            get_record_inner,
+            item.id,
+            client,
+            http_semaphore,
+            cache,
+            tracer=tracer,
+            transport=transport,
+        )
+        for attempt in range(max_retries):
+            try:
+                return await get_record()
+            except Exception:
+                tracer.instant("retry", item.id)
+                await asyncio.sleep(RETRY_BASE_DELAY * 2**attempt)
+        return await get_record()
+
     async def fetch_and_process(
         item: TraverseItem, client: ClientSession, cache: Optional[Cache]
     ) -> None:
-        record = await get_record_inner(item.id, client, http_semaphore, cache)
+        with tracer.span("record", item.id):
+            await process(item, await fetch(item, client, cache))
+
+        if tracking.all_done:
+            # There's no more work to do. Signal the loop below.
+            continue_event.set()
 
+    async def fetch(
+        item: TraverseItem, client: ClientSession, cache: Optional[Cache]
+    ) -> Optional[Record]:
+        try:
+            return await fetch_with_retries(item, client, cache)
+        except Exception:
+            if not skip_failures:
+                raise
+            ggraph.setdefault("failed", []).append(item.id)
+            tracer.instant("failed", item.id)
+            return None
+
+    async def process(item: TraverseItem, record: Optional[Record]) -> None:
         await tracking.finish(item.id, record is not None)
         if record is not None:
             if below_max_records():
@@ -238,49 +518,129 @@ async def build_graph(
                 if record_callback is not None:
                     await record_callback(tg, record)
 
-                for td in (TraverseDirection.ADVISORS, TraverseDirection.DESCENDANTS):
-                    if td in item.traverse_direction:
-                        await add_neighbor_work(record, td)
+                with tracer.span("enqueue children", item.id):
+                    for td in (
+                        TraverseDirection.ADVISORS,
+                        TraverseDirection.DESCENDANTS,
+                    ):
+                        if td in item.traverse_direction:
+                            await add_neighbor_work(record, td)
             else:
                 # The graph is now as large as it is allowed to be.
                 ggraph["status"] = "truncated"
+                ggraph["truncation_reason"] = "max_records"
 
-        if tracking.all_done:
-            # There's no more work to do. Signal the loop below.
-            continue_event.set()
-
-    headers = None if user_agent is None else {"User-Agent": user_agent}
-    async with ClientSession(
-        "https://www.mathgenealogy.org",
-        headers=headers,
-        connector=build_intermediate_connector(),
+    async def add_closure(closure: CacheClosure, tg: asyncio.TaskGroup) -> None:
+        for record in closure.records.values():
+            if not below_max_records():
+                ggraph["status"] = "truncated"
+                ggraph["truncation_reason"] = "max_records"
+                await tracking.purge_todo()
+                return
+            tracer.instant("cache hit", record["id"])
+            tracking.mark_done(record["id"])
+            ggraph["nodes"][record["id"]] = record
+            if record_callback is not None:
+                await record_callback(tg, record)
+        await tracking.report_back()
+
+    def record_write_failure(ids: List[RecordId], _: Exception) -> None:
+        ggraph.setdefault("cache_write_failed", []).extend(ids)
+
+    closure_cache = None
+    if cache is not None and hasattr(cache, "get_closure"):
+        closure_cache = cast(ClosureCache, cache)
+
+    write_back_cache = None
+    if isinstance(cache, TieredCache) and cache.write_policy == "write-back":
+        write_back_cache = cache
+
+    write_behind_cache = None
+    if write_behind and cache is not None:
+        write_behind_cache = WriteBehindCache(cache, on_error=record_write_failure)
+        cache = write_behind_cache
+
+    async with (
+        make_session(user_agent) if client is None else contextlib.nullcontext(client)
     ) as client:
 
-        async with asyncio.TaskGroup() as tg:
-            tracking = LifecycleTracking(
-                start_items,
-                max_records,
-                None
-                if report_callback is None
-                else functools.partial(report_callback, tg),
-            )
-            while tracking.num_todo > 0:
-                try:
-                    await tracking.process_another()
-                except MaxRecordsException:
-                    # We're done.
-                    await tracking.purge_todo()
-                    break
-
-                item = await tracking.start_next()
-
-                # Create a task to fetch and process the record.
-                tg.create_task(fetch_and_process(item, client, cache))
-
-                if tracking.num_todo == 0:
-                    # There's nothing left to do for now. Wait for
-                    # something to happen.
-                    continue_event.clear()
-                    await continue_event.wait()
+        deadline = (
+            None
+            if time_budget is None
+            else asyncio.get_running_loop().time() + time_budget
+        )
+        try:
+            async with asyncio.timeout_at(deadline):
+                async with asyncio.TaskGroup() as tg:
+                    closure = None
+                    if closure_cache is not None:
+                        # A closure larger than the graph's limits
+                        # would be loaded into memory whole, so
+                        # traverse such graphs incrementally.
+                        limits = [
+                            n for n in (max_records, memory_budget) if n is not None
+                        ]
+                        closure = await closure_cache.get_closure(
+                            start_items, min(limits) if limits else None
+                        )
+                    tracking = tracking_class(
+                        start_items if closure is None else closure.frontier,
+                        max_records,
+                        None
+                        if report_callback is None
+                        else functools.partial(report_callback, tg),
+                    )
+                    if closure is not None:
+                        await add_closure(closure, tg)
+                    while tracking.num_todo > 0:
+                        try:
+                            await tracking.process_another()
+                        except MaxRecordsException:
+                            # We're done.
+                            await tracking.purge_todo()
+                            break
+
+                        item = await tracking.start_next()
+
+                        # Create a task to fetch and process the record.
+                        tg.create_task(fetch_and_process(item, client, cache))
+
+                        if tracking.num_todo == 0:
+                            # There's nothing left to do for now. Wait for
+                            # something to happen.
+                            continue_event.clear()
+                            await continue_event.wait()
+        except TimeoutError:
+            # The time budget ran out. Leaving the task group cancelled
+            # the outstanding fetches, so the graph has what was
+            # retrieved before then.
+            ggraph["status"] = "truncated"
+            ggraph["truncation_reason"] = "time_budget"
+        except BaseException:
+            # The caller will not receive the graph, so it cannot close
+            # the store.
+            if isinstance(ggraph["nodes"], SpillingRecordStore):
+                ggraph["nodes"].close()
+            raise
+        finally:
+            # Writing to the cache counts against the time budget.
+            # Records not written in time are reported in
+            # cache_write_failed.
+            try:
+                async with asyncio.timeout_at(deadline):
+                    if write_behind_cache is not None:
+                        await write_behind_cache.close()
+                    if write_back_cache is not None:
+                        await write_back_cache.close()
+            except TimeoutError as e:
+                unwritten: List[RecordId] = []
+                if write_behind_cache is not None:
+                    unwritten.extend(write_behind_cache.pending)
+                if write_back_cache is not None:
+                    unwritten.extend(write_back_cache.dirty)
+                record_write_failure(unwritten, e)
+
+    if "failed" in ggraph and ggraph["status"] == "complete":
+        ggraph["status"] = "incomplete"
 
     return ggraph
@@ -0,0 +1,105 @@
+from geneagrapher_core.record import Cache, RecordId
+from geneagrapher_core.traverse import (
+    Geneagraph,
+    TraverseDirection,
+    TraverseItem,
+    build_graph,
+)
+
+import asyncio
+from collections import Counter
+from typing import Iterable, List, Literal, Optional
+
+
+class RateLimiter(asyncio.Semaphore):
+    """A semaphore that, in addition to limiting concurrency, spaces
+    acquisitions at least ``1 / rate`` seconds apart. It can be passed
+    anywhere an HTTP semaphore is accepted to cap the request rate.
+
+    :param rate: the maximum number of acquisitions per second
+    :param concurrency: the maximum number of concurrent holders
+    """
+
+    def __init__(self, rate: float, concurrency: int = 1) -> None:
+        super().__init__(concurrency)
+        self.interval = 1 / rate
+        self.next_time = 0.0
+
+    async def acquire(self) -> Literal[True]:
+        await super().acquire()
+        try:
+            now = asyncio.get_running_loop().time()
+            slot = max(now, self.next_time)
+            self.next_time = slot + self.interval
+            if slot > now:
+                await asyncio.sleep(slot - now)
+        except BaseException:
+            self.release()
+            raise
+        return True
+
+
+def parse_direction(text: str) -> TraverseDirection:
+    """Parse a traversal direction written like ``ADVISORS`` or
+    ``ADVISORS|DESCENDANTS``.
+    """
+    direction = TraverseDirection(0)
+    for name in text.split("|"):
+        direction |= TraverseDirection[name.strip().upper()]
+    return direction
+
+
+def read_hotness_log(lines: Iterable[str], top: int) -> List[TraverseItem]:
+    """Return the ``top`` most frequently requested items in a
+    hotness log. Each line of the log records one request as a record
+    ID and a traversal direction (e.g., ``18231 ADVISORS|DESCENDANTS``).
+    Blank lines and lines starting with ``#`` are ignored.
+
+    :param lines: the lines of the log
+    :param top: the number of items to return
+    """
+    counts: Counter[TraverseItem] = Counter()
+    for line in lines:
+        line = line.strip()
+        if line == "" or line.startswith("#"):
+            continue
+        (rid, direction) = line.split(maxsplit=1)
+        counts[TraverseItem(RecordId(int(rid)), parse_direction(direction))] += 1
+    return [item for (item, _) in counts.most_common(top)]
+
+
+async def warm_cache(
+    items: List[TraverseItem],
+    cache: Cache,
+    *,
+    requests_per_second: float = 1.0,
+    max_records: Optional[int] = None,
+    user_agent: Optional[str] = None,
+) -> Geneagraph:
+    """Walk the graphs of ``items`` so that all of their records are
+    in ``cache``. Records the cache already has are not requested
+    again, and requests for the rest are made one at a time at a low
+    rate, so this can run in the background without competing with
+    other traffic. The walked graph is returned.
+
+    :param items: the items whose graphs should be cached
+    :param cache: the cache to fill
+    :param requests_per_second: the maximum rate of HTTP requests
+    :param max_records: the maximum number of records to walk
+    :param user_agent: a custom user agent string to use in HTTP requests
+
+    **Example**::
+
+        with open("hotness.log") as f:
+            items = read_hotness_log(f, 100)
+        await warm_cache(items, cache)
+
+    """
+    return await build_graph(
+        items,
+        http_semaphore=RateLimiter(requests_per_second),
+        max_records=max_records,
+        user_agent=user_agent,
+        cache=cache,
+        skip_failures=True,
+    )
@@ -0,0 +1,377 @@
+from geneagrapher_core.record import (
+    Cache,
+    Record,
+    RecordId,
+    get_record_inner,
+    make_session,
+)
+from geneagrapher_core.traverse import (
+    Geneagraph,
+    TraverseDirection,
+    TraverseItem,
+)
+
+from aiohttp import ClientSession
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    List,
+    Literal,
+    NamedTuple,
+    Optional,
+    Protocol,
+    Tuple,
+)
+
+
+class QueueCounts(NamedTuple):
+    todo: int
+    doing: int
+    done: int
+    records: int
+
+
+class WorkQueue(Protocol):
+    """This defines an interface for traversal state that can be
+    shared by several workers, possibly on different machines.
+
+    Items move from *todo* to *doing* when a worker leases them and
+    from *doing* to *done* when the worker acknowledges them. A lease
+    expires after a time limit, after which the item can be leased
+    again. This way, items leased by a worker that crashed are
+    eventually picked up by another worker.
+    """
+
+    async def add(self, items: List[TraverseItem]) -> None:
+        """Add items to the *todo* state. Items whose record IDs have
+        already been added are ignored.
+
+        :param items: the items to add
+        """
+        ...
+
+    async def lease(
+        self, worker: str, count: int, lease_seconds: float
+    ) -> List[TraverseItem]:
+        """Move up to ``count`` items that are in the *todo* state or
+        whose leases have expired to the *doing* state and return
+        them.
+
+        :param worker: an identifier for the worker taking the lease
+        :param count: the maximum number of items to lease
+        :param lease_seconds: the time after which the lease expires
+        """
+        ...
+
+    async def ack(self, id: RecordId, record: Optional[Record]) -> None:
+        """Move an item to the *done* state and store its record.
+
+        :param id: Math Genealogy Project ID of the item
+        :param record: the retrieved record (or None, if there is no record)
+        """
+        ...
+
+    async def counts(self) -> QueueCounts:
+        """Return the number of items in each state and the number of
+        records stored.
+        """
+        ...
+
+    async def records(self) -> dict[RecordId, Record]:
+        """Return all stored records, in the order their items were
+        added.
+        """
+        ...
+
+
+class SQLiteWorkQueue:
+    """A :class:`WorkQueue` stored in a SQLite database file. Workers
+    in separate processes on the same machine (or sharing the file
+    over a file system with working locks) can each open the same
+    file.
+
+    :param path: the path of the database file
+    :param clock: a function returning the current time in seconds
+    """
+
+    def __init__(self, path: str, clock: Callable[[], float] = time.time) -> None:
+        self.clock = clock
+        # Queries run in worker threads so that waiting for the
+        # database lock (up to the 30 second timeout) does not block
+        # the event loop. The lock keeps one thread at a time on the
+        # connection, so transactions do not interleave.
+        self.db = sqlite3.connect(
+            path, isolation_level=None, timeout=30, check_same_thread=False
+        )
+        self.lock = threading.Lock()
+        self.db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS items (
+                id INTEGER PRIMARY KEY,
+                direction INTEGER NOT NULL,
+                state TEXT NOT NULL DEFAULT 'todo',
+                worker TEXT,
+                lease_expires REAL,
+                seq INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS items_state ON items (state, lease_expires);
+            CREATE TABLE IF NOT EXISTS records (
+                id INTEGER PRIMARY KEY,
+                record TEXT
+            );
+            """
+        )
+
+    def close(self) -> None:
+        with self.lock:
+            self.db.close()
+
+    def transaction(self, *statements: Tuple[str, Iterable[Any]]) -> None:
+        """Run statements, each with a list of parameter tuples, in one
+        write transaction. This blocks while another connection holds
+        the database's write lock.
+        """
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in statements:
+                    self.db.executemany(sql, params)
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+
+    async def add(self, items: List[TraverseItem]) -> None:
+        # seq numbers items in the order they were added. An item is
+        # added while its parent is being processed, so every record's
+        # parent comes before it in this order.
+        await asyncio.to_thread(
+            self.transaction,
+            (
+                """INSERT OR IGNORE INTO items (id, direction, seq)
+                VALUES (?, ?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM items))""",
+                [(item.id, item.traverse_direction.value) for item in items],
+            ),
+        )
+
+    async def lease(
+        self, worker: str, count: int, lease_seconds: float
+    ) -> List[TraverseItem]:
+        now = self.clock()
+
+        def lease() -> List[Tuple[int, int]]:
+            with self.lock:
+                self.db.execute("BEGIN IMMEDIATE")
+                try:
+                    rows = self.db.execute(
+                        """SELECT id, direction FROM items
+                        WHERE state = 'todo'
+                        OR (state = 'doing' AND lease_expires < ?)
+                        ORDER BY seq LIMIT ?""",
+                        (now, count),
+                    ).fetchall()
+                    self.db.executemany(
+                        """UPDATE items
+                        SET state = 'doing', worker = ?, lease_expires = ?
+                        WHERE id = ?""",
+                        [(worker, now + lease_seconds, id) for (id, _) in rows],
+                    )
+                    self.db.execute("COMMIT")
+                except BaseException:
+                    self.db.execute("ROLLBACK")
+                    raise
+            return rows
+
+        return [
+            TraverseItem(RecordId(id), TraverseDirection(direction))
+            for (id, direction) in await asyncio.to_thread(lease)
+        ]
+
+    async def ack(self, id: RecordId, record: Optional[Record]) -> None:
+        await asyncio.to_thread(
+            self.transaction,
+            (
+                """UPDATE items SET state = 'done', worker = NULL, lease_expires = NULL
+                WHERE id = ?""",
+                [(id,)],
+            ),
+            (
+                "INSERT OR REPLACE INTO records (id, record) VALUES (?, ?)",
+                [(id, None if record is None else json.dumps(record))],
+            ),
+        )
+
+    def query(self, sql: str) -> List[Tuple[Any, ...]]:
+        with self.lock:
+            return self.db.execute(sql).fetchall()
+
+    async def counts(self) -> QueueCounts:
+        by_state = dict(
+            await asyncio.to_thread(
+                self.query, "SELECT state, COUNT(*) FROM items GROUP BY state"
+            )
+        )
+        [(num_records,)] = await asyncio.to_thread(
+            self.query, "SELECT COUNT(*) FROM records WHERE record IS NOT NULL"
+        )
+        return QueueCounts(
+            by_state.get("todo", 0),
+            by_state.get("doing", 0),
+            by_state.get("done", 0),
+            num_records,
+        )
+
+    async def records(self) -> dict[RecordId, Record]:
+        rows = await asyncio.to_thread(
+            self.query,
+            """SELECT id, record FROM records JOIN items USING (id)
+            WHERE record IS NOT NULL ORDER BY seq""",
+        )
+        return {RecordId(id): json.loads(record) for (id, record) in rows}
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+async def run_worker(
+    queue: WorkQueue,
+    *,
+    client: Optional[ClientSession] = None,
+    http_semaphore: Optional[asyncio.Semaphore] = None,
+    max_records: Optional[int] = None,
+    user_agent: Optional[str] = None,
+    cache: Optional[Cache] = None,
+    worker_id: Optional[str] = None,
+    batch_size: int = 10,
+    lease_seconds: float = 60.0,
+    poll_interval: float = 1.0,
+) -> int:
+    """Work on a shared traversal until there is nothing left to do
+    and return the number of records this worker retrieved. Run this
+    in as many processes or on as many machines as needed after
+    seeding the queue with :func:`start_traversal`.
+
+    :param queue: the shared traversal state
+    :param client: a client session object with which to make HTTP requests
+        (one is created if not provided)
+    :param http_semaphore: a semaphore to limit HTTP request concurrency
+    :param max_records: the maximum number of records to include in the built graph
+    :param user_agent: a custom user agent string to use in HTTP requests
+    :param cache: a cache object for getting and storing results
+    :param worker_id: an identifier for this worker in leases
+    :param batch_size: the maximum number of items to lease at once
+    :param lease_seconds: the time after which this worker's leases expire
+    :param poll_interval: the time to wait when other workers hold all
+        remaining items
+    """
+    if client is None:
+        async with make_session(user_agent) as client:
+            return await run_worker(
+                queue,
+                client=client,
+                http_semaphore=http_semaphore,
+                max_records=max_records,
+                cache=cache,
+                worker_id=worker_id,
+                batch_size=batch_size,
+                lease_seconds=lease_seconds,
+                poll_interval=poll_interval,
+            )
+
+    worker_id = worker_id or default_worker_id()
+    num_retrieved = 0
+
+    async def process(item: TraverseItem) -> None:
+        nonlocal num_retrieved
+        assert client is not None
+        record = await get_record_inner(item.id, client, http_semaphore, cache)
+        if record is not None:
+            num_retrieved += 1
+            neighbors: List[TraverseItem] = []
+            for td in (TraverseDirection.ADVISORS, TraverseDirection.DESCENDANTS):
+                if td in item.traverse_direction:
+                    key: Literal["advisors", "descendants"] = (
+                        "advisors"
+                        if td is TraverseDirection.ADVISORS
+                        else "descendants"
+                    )
+                    neighbors.extend(
+                        TraverseItem(RecordId(id), td) for id in record[key]
+                    )
+            await queue.add(neighbors)
+        # Acknowledge after adding the neighbors so that a crash in
+        # between leaves the item to be retried rather than losing
+        # its neighbors.
+        await queue.ack(item.id, record)
+
+    while True:
+        counts = await queue.counts()
+        if max_records is not None and counts.records >= max_records:
+            break
+
+        items = await queue.lease(worker_id, batch_size, lease_seconds)
+        if not items:
+            if counts.todo == counts.doing == 0:
+                break
+            # Other workers hold the remaining items. Wait for them to
+            # finish or for their leases to expire.
+            await asyncio.sleep(poll_interval)
+            continue
+
+        async with asyncio.TaskGroup() as tg:
+            for item in items:
+                tg.create_task(process(item))
+
+    return num_retrieved
+
+
+async def start_traversal(queue: WorkQueue, start_items: List[TraverseItem]) -> None:
+    """Seed a shared traversal with its starting items."""
+    await queue.add(start_items)
+
+
+async def collect_graph(
+    queue: WorkQueue,
+    start_items: List[TraverseItem],
+    max_records: Optional[int] = None,
+) -> Geneagraph:
+    """Assemble the graph built by the workers of a shared traversal.
+    If the workers retrieved more than ``max_records`` records, the
+    start records and the records whose items were added to the queue
+    first are kept.
+
+    :param queue: the shared traversal state
+    :param start_items: the items the traversal was started with
+    :param max_records: the maximum number of records to include in the built graph
+    """
+    counts = await queue.counts()
+    nodes = await queue.records()
+    ggraph: Geneagraph = {
+        "start_nodes": [n.id for n in start_items],
+        "nodes": nodes,
+        "status": "complete",
+    }
+    reached_max_records = max_records is not None and len(nodes) >= max_records
+    if max_records is not None and len(nodes) > max_records:
+        # Workers can retrieve a few records past the limit. Keep the
+        # start records and then the earliest added ones, so that
+        # every kept record's parent is also kept.
+        start_ids = {item.id for item in start_items}
+        order = sorted(nodes, key=lambda id: id not in start_ids)
+        ggraph["nodes"] = {id: nodes[id] for id in order[:max_records]}
+        ggraph["status"] = "truncated"
+    elif counts.todo > 0 or counts.doing > 0:
+        ggraph["status"] = "truncated"
+    if ggraph["status"] == "truncated" and reached_max_records:
+        ggraph["truncation_reason"] = "max_records"
+
+    return ggraph
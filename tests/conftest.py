@@ -1,7 +1,12 @@
+from geneagrapher_core.record import CacheResult, Record, RecordId
+from geneagrapher_core.traverse import TraverseItem
+
+import asyncio
 from bs4 import BeautifulSoup
 import os
 import tomllib
-from typing import Any, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from unittest.mock import sentinel as s
 
 CURR_DIR = os.path.dirname(os.path.abspath(__file__))
 RECORD_TESTDATA_DIR = os.path.join(CURR_DIR, "testdata_records")
@@ -20,3 +25,96 @@ def load_soup(filename: str) -> BeautifulSoup:
 def load_record_test(record_id: str) -> Tuple[BeautifulSoup, dict[str, Any]]:
     path_stub = os.path.join(RECORD_TESTDATA_DIR, record_id)
     return load_soup(f"{path_stub}.html"), load_toml(f"{path_stub}.toml")
+
+
+def make_record(
+    rid: int,
+    advisors: Iterable[int] = (),
+    descendants: Iterable[int] = (),
+    *,
+    name: Optional[str] = None,
+    institution: Optional[str] = None,
+    year: Optional[int] = None,
+) -> Record:
+    return {
+        "id": RecordId(rid),
+        "name": f"Name {rid}" if name is None else name,
+        "institution": institution,
+        "year": year,
+        "descendants": list(descendants),
+        "advisors": list(advisors),
+    }
+
+
+class DictCache:
+    def __init__(
+        self, values: Optional[Dict[RecordId, Optional[Record]]] = None
+    ) -> None:
+        self.values = {} if values is None else values
+
+    async def get(self, id: RecordId) -> Tuple[CacheResult, Optional[Record]]:
+        if id in self.values:
+            return (CacheResult.HIT, self.values[id])
+        return (CacheResult.MISS, None)
+
+    async def set(self, id: RecordId, value: Optional[Record]) -> None:
+        self.values[id] = value
+
+
+class BatchDictCache(DictCache):
+    def __init__(
+        self, values: Optional[Dict[RecordId, Optional[Record]]] = None
+    ) -> None:
+        super().__init__(values)
+        self.get_many_calls: List[List[RecordId]] = []
+
+    async def get_many(
+        self, ids: List[RecordId]
+    ) -> Dict[RecordId, Tuple[CacheResult, Optional[Record]]]:
+        self.get_many_calls.append(ids)
+        return {id: await self.get(id) for id in ids}
+
+    async def set_many(self, values: Dict[RecordId, Optional[Record]]) -> None:
+        self.values.update(values)
+
+
+class FakeBuildGraph:
+    """A build_graph replacement that records its calls and returns a
+    graph of ``records`` with the given status. The first record is
+    passed to the ``record_callback`` argument before waiting for
+    ``release`` to be set, and the rest after.
+
+    :param records: the records in each graph
+    :param error: an exception to raise instead of returning a graph
+    :param status: the status fields of each graph
+    """
+
+    def __init__(
+        self,
+        records: Iterable[Record] = (),
+        error: Optional[Exception] = None,
+        **status: Any,
+    ) -> None:
+        self.records = list(records)
+        self.error = error
+        self.status = status or {"status": "complete"}
+        self.calls: List[dict[str, Any]] = []
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def __call__(self, start_items: List[TraverseItem], **kwargs: Any) -> Any:
+        self.calls.append({"start_items": start_items, **kwargs})
+        callback = kwargs.get("record_callback")
+        for i, record in enumerate(self.records):
+            if i == 1:
+                await self.release.wait()
+            if callback is not None:
+                await callback(s.tg, record)
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return {
+            "start_nodes": [item.id for item in start_items],
+            "nodes": {r["id"]: r for r in self.records},
+            **self.status,
+        }
@@ -0,0 +1,190 @@
+from geneagrapher_core.ancestry import AncestryIndex
+from geneagrapher_core.record import RecordId
+from geneagrapher_core.traverse import Geneagraph
+
+from .conftest import make_record
+
+from itertools import permutations
+import random
+import pytest
+from typing import Iterable, List
+from unittest.mock import patch, sentinel as s
+
+
+# 1 and 2 advise 3; 3 advises 4 and 5; 2 advises 6; 4 lists 9, which
+# is not in the graph, as an advisor.
+RECORDS = [
+    make_record(1, [], [3]),
+    make_record(2, [], [3, 6]),
+    make_record(3, [1, 2], [4, 5]),
+    make_record(4, [3, 9], []),
+    make_record(5, [3], []),
+    make_record(6, [2], []),
+]
+ANCESTORS = {1: set(), 2: set(), 3: {1, 2}, 4: {1, 2, 3}, 5: {1, 2, 3}, 6: {2}}
+
+
+@pytest.mark.parametrize("order", list(permutations(range(len(RECORDS))))[::37])
+def test_insertion_order(order: List[int]) -> None:
+    index = AncestryIndex()
+    index.extend(RECORDS[i] for i in order)
+
+    assert len(index) == len(RECORDS)
+    for rid, ancestors in ANCESTORS.items():
+        for other in ANCESTORS:
+            assert index.is_ancestor(RecordId(other), RecordId(rid)) is (
+                other in ancestors
+            )
+        assert index.ancestor_count(RecordId(rid)) == len(ancestors)
+        assert index.descendant_count(RecordId(rid)) == sum(
+            rid in a for a in ANCESTORS.values()
+        )
+
+    order_ids = index.topological_order()
+    for rid, ancestors in ANCESTORS.items():
+        assert all(
+            order_ids.index(RecordId(a)) < order_ids.index(RecordId(rid))
+            for a in ancestors
+        )
+
+
+@pytest.mark.parametrize(
+    "id1,id2,expected",
+    [
+        (4, 5, {3}),
+        (4, 6, {2}),
+        (5, 3, {3}),
+        (1, 6, set()),
+        (4, 4, {4}),
+    ],
+)
+def test_lowest_common_ancestors(id1: int, id2: int, expected: set[int]) -> None:
+    index = AncestryIndex()
+    index.extend(RECORDS)
+    assert index.lowest_common_ancestors(RecordId(id1), RecordId(id2)) == expected
+
+
+def test_add_existing() -> None:
+    index = AncestryIndex()
+    index.add(RECORDS[0])
+    index.add(RECORDS[0])
+    assert len(index) == 1
+
+
+def test_unknown_record() -> None:
+    index = AncestryIndex()
+    index.extend(RECORDS)
+    assert RecordId(9) not in index
+    with pytest.raises(KeyError):
+        index.descendant_count(RecordId(9))
+
+
+def test_from_graph() -> None:
+    ggraph: Geneagraph = {
+        "start_nodes": [RecordId(4)],
+        "nodes": {r["id"]: r for r in RECORDS},
+        "status": "complete",
+    }
+    index = AncestryIndex.from_graph(ggraph)
+    assert index.descendant_count(RecordId(2)) == 4
+
+
+@pytest.mark.asyncio
+async def test_record_callback() -> None:
+    index = AncestryIndex()
+    for record in RECORDS:
+        await index.record_callback(s.tg, record)
+    assert index.is_ancestor(RecordId(1), RecordId(5))
+
+
+def random_advisors(rng: random.Random, size: int) -> dict[int, list[int]]:
+    return {
+        rid: rng.sample(range(rid), min(rid, rng.randint(0, 3))) for rid in range(size)
+    }
+
+
+def find_ancestors(
+    advisors: dict[int, list[int]], rids: Iterable[int]
+) -> dict[int, set[int]]:
+    ancestors: dict[int, set[int]] = {}
+    for rid in sorted(rids):
+        ancestors[rid] = set()
+        for a in advisors[rid]:
+            if a in ancestors:
+                ancestors[rid] |= {a} | ancestors[a]
+    return ancestors
+
+
+def check_index(index: AncestryIndex, ancestors: dict[int, set[int]]) -> None:
+    for rid in ancestors:
+        assert index.ancestor_count(RecordId(rid)) == len(ancestors[rid])
+        assert index.descendant_count(RecordId(rid)) == sum(
+            rid in a for a in ancestors.values()
+        )
+        for other in ancestors:
+            assert index.is_ancestor(RecordId(other), RecordId(rid)) is (
+                other in ancestors[rid]
+            )
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("min_unlabelled", [0, AncestryIndex.MIN_UNLABELLED])
+def test_random_graph(seed: int, min_unlabelled: int) -> None:
+    rng = random.Random(seed)
+    advisors = random_advisors(rng, 60)
+    records = [make_record(rid, a, []) for (rid, a) in advisors.items()]
+    rng.shuffle(records)
+    with patch.object(AncestryIndex, "MIN_UNLABELLED", min_unlabelled):
+        index = AncestryIndex()
+        index.extend(records)
+        check_index(index, find_ancestors(advisors, range(60)))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_streaming(seed: int) -> None:
+    # Records are added in a random order, and the index is queried
+    # after each one.
+    rng = random.Random(seed)
+    advisors = random_advisors(rng, 400)
+    students: dict[int, list[int]] = {rid: [] for rid in advisors}
+    for rid, a in advisors.items():
+        for advisor in a:
+            students[advisor].append(rid)
+    order = list(advisors)
+    rng.shuffle(order)
+
+    index = AncestryIndex()
+    num_labellings = 0
+    for i, rid in enumerate(order):
+        index.add(make_record(rid, advisors[rid], students[rid]))
+        labelled = index.labelled
+        added = order[: i + 1]
+        ancestors = find_ancestors(advisors, added)
+        for _ in range(3):
+            (x, y) = (rng.choice(added), rng.choice(added))
+            assert index.is_ancestor(RecordId(x), RecordId(y)) is (x in ancestors[y])
+        assert index.ancestor_count(RecordId(rid)) == len(ancestors[rid])
+        assert index.descendant_count(RecordId(rid)) == sum(
+            rid in a for a in ancestors.values()
+        )
+        num_labellings += index.labelled != labelled
+    assert num_labellings < 20
+
+
+def test_add_after_query() -> None:
+    index = AncestryIndex()
+    index.extend(RECORDS[:3])
+    assert index.descendant_count(RecordId(1)) == 1
+    index.extend(RECORDS[3:])
+    assert index.descendant_count(RecordId(1)) == 3
+
+
+def test_cycle() -> None:
+    # Cycles are errors in the data, but they do not stop the index
+    # from being built.
+    index = AncestryIndex()
+    index.extend(
+        [make_record(1, [2], []), make_record(2, [1], []), make_record(3, [2], [])]
+    )
+    assert len(index.topological_order()) == 3
+    assert index.is_ancestor(RecordId(2), RecordId(3))
@@ -0,0 +1,330 @@
+from geneagrapher_core.cache import (
+    MemoryCache,
+    StaleWhileRevalidateCache,
+    TieredCache,
+    TierStats,
+    WriteBehindCache,
+)
+from geneagrapher_core.record import CacheResult, Record, RecordId
+
+from .conftest import BatchDictCache, DictCache
+
+import asyncio
+import pytest
+from typing import Optional
+from unittest.mock import ANY, AsyncMock, MagicMock, call, sentinel as s
+
+
+class TestStaleWhileRevalidateCache:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "age,expected_status,expect_refresh",
+        [
+            (0, CacheResult.HIT, False),
+            (10, CacheResult.HIT, False),
+            (11, CacheResult.HIT, True),
+            (100, CacheResult.HIT, True),
+            (101, CacheResult.MISS, False),
+        ],
+    )
+    async def test_get(
+        self, age: float, expected_status: CacheResult, expect_refresh: bool
+    ) -> None:
+        now = [1000.0]
+        m_fetch = AsyncMock(return_value=s.fresh_record)
+        c = StaleWhileRevalidateCache(
+            DictCache(), m_fetch, soft_ttl=10, hard_ttl=100, clock=lambda: now[0]
+        )
+        await c.set(s.rid, s.record)
+
+        now[0] += age
+        assert await c.get(s.rid) == (
+            expected_status,
+            s.record if expected_status is CacheResult.HIT else None,
+        )
+        await c.wait_refreshes()
+
+        if expect_refresh:
+            m_fetch.assert_called_once_with(s.rid)
+            assert await c.get(s.rid) == (CacheResult.HIT, s.fresh_record)
+        else:
+            m_fetch.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_get_miss(self) -> None:
+        m_fetch = AsyncMock()
+        c = StaleWhileRevalidateCache(DictCache(), m_fetch, soft_ttl=10)
+        assert await c.get(s.rid) == (CacheResult.MISS, None)
+        m_fetch.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_get_unknown_age(self) -> None:
+        inner = DictCache()
+        await inner.set(s.rid, s.record)
+        m_fetch = AsyncMock(return_value=s.fresh_record)
+        c = StaleWhileRevalidateCache(inner, m_fetch, soft_ttl=10, hard_ttl=100)
+
+        assert await c.get(s.rid) == (CacheResult.MISS, None)
+        await c.wait_refreshes()
+        m_fetch.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_stored_at_in_cache(self) -> None:
+        now = [1000.0]
+        inner = DictCache()
+        c = StaleWhileRevalidateCache(
+            inner, AsyncMock(), soft_ttl=10, hard_ttl=100, clock=lambda: now[0]
+        )
+        await c.set(s.rid, s.record)
+        await c.set(s.rid2, None)
+        assert inner.values == {
+            s.rid: {"stored_at": 1000.0, "record": s.record},
+            s.rid2: {"stored_at": 1000.0, "record": None},
+        }
+
+        # A new wrapper, as after a restart, knows the records' ages.
+        now[0] += 101
+        c = StaleWhileRevalidateCache(
+            inner, AsyncMock(), soft_ttl=10, hard_ttl=100, clock=lambda: now[0]
+        )
+        assert await c.get(s.rid) == (CacheResult.MISS, None)
+
+    @pytest.mark.asyncio
+    async def test_refresh_deduplicated(self) -> None:
+        release = asyncio.Event()
+
+        async def fetch(id: RecordId) -> object:
+            await release.wait()
+            return s.fresh_record
+
+        m_fetch = AsyncMock(side_effect=fetch)
+        c = StaleWhileRevalidateCache(DictCache(), m_fetch, soft_ttl=-1)
+        await c.set(s.rid1, s.record)
+        await c.set(s.rid2, s.record)
+
+        for rid in (s.rid1, s.rid2, s.rid1, s.rid1):
+            assert await c.get(rid) == (CacheResult.HIT, s.record)
+        release.set()
+        await c.wait_refreshes()
+        assert m_fetch.call_args_list == [call(s.rid1), call(s.rid2)]
+        assert c.refreshing == {}
+
+    @pytest.mark.asyncio
+    async def test_refresh_failure(self) -> None:
+        m_fetch = AsyncMock(side_effect=ValueError())
+        c = StaleWhileRevalidateCache(DictCache(), m_fetch, soft_ttl=-1)
+        await c.set(s.rid, s.record)
+
+        assert await c.get(s.rid) == (CacheResult.HIT, s.record)
+        await c.wait_refreshes()
+        assert c.num_refresh_failures == 1
+        assert await c.get(s.rid) == (CacheResult.HIT, s.record)
+        await c.wait_refreshes()
+
+
+class TestMemoryCache:
+    @pytest.mark.asyncio
+    async def test_get_set(self) -> None:
+        c = MemoryCache()
+        assert await c.get(s.rid) == (CacheResult.MISS, None)
+        await c.set(s.rid, s.record)
+        await c.set(s.rid2, None)
+        assert await c.get(s.rid) == (CacheResult.HIT, s.record)
+        assert await c.get(s.rid2) == (CacheResult.HIT, None)
+
+
+class TestTieredCache:
+    def test_no_tiers(self) -> None:
+        with pytest.raises(ValueError):
+            TieredCache([])
+
+    @pytest.mark.asyncio
+    async def test_get_promotes(self) -> None:
+        tiers = [MemoryCache(), MemoryCache(), MemoryCache()]
+        await tiers[2].set(s.rid, s.record)
+        c = TieredCache(list(tiers))
+
+        assert await c.get(s.rid) == (CacheResult.HIT, s.record)
+        assert all(t.records == {s.rid: s.record} for t in tiers)
+        assert [(st.hits, st.misses) for st in c.stats] == [(0, 1), (0, 1), (1, 0)]
+
+        assert await c.get(s.rid) == (CacheResult.HIT, s.record)
+        assert [(st.hits, st.misses) for st in c.stats] == [(1, 1), (0, 1), (1, 0)]
+        assert [st.hit_rate for st in c.stats] == [0.5, 0.0, 1.0]
+
+    @pytest.mark.asyncio
+    async def test_get_miss(self) -> None:
+        tiers = [MemoryCache(), MemoryCache()]
+        c = TieredCache(list(tiers))
+        assert await c.get(s.rid) == (CacheResult.MISS, None)
+        assert [(st.hits, st.misses) for st in c.stats] == [(0, 1), (0, 1)]
+        assert TierStats().hit_rate == 0.0
+
+    @pytest.mark.asyncio
+    async def test_set_write_through(self) -> None:
+        tiers = [MemoryCache(), MemoryCache()]
+        c = TieredCache(list(tiers))
+        await c.set(s.rid, s.record)
+        assert all(t.records == {s.rid: s.record} for t in tiers)
+        assert c.dirty == {}
+
+    @pytest.mark.asyncio
+    async def test_set_write_back(self) -> None:
+        tiers = [MemoryCache(), MemoryCache(), MemoryCache()]
+        c = TieredCache(list(tiers), write_policy="write-back")
+        await c.set(s.rid, s.record)
+        assert [t.records for t in tiers] == [{s.rid: s.record}, {}, {}]
+
+        await c.flush()
+        assert all(t.records == {s.rid: s.record} for t in tiers)
+        assert c.dirty == {}
+
+    @pytest.mark.asyncio
+    async def test_context_manager(self) -> None:
+        tiers = [MemoryCache(), MemoryCache()]
+        async with TieredCache(list(tiers), write_policy="write-back") as c:
+            await c.set(s.rid, s.record)
+            assert tiers[1].records == {}
+        assert tiers[1].records == {s.rid: s.record}
+        assert c.dirty == {}
+
+    @pytest.mark.asyncio
+    async def test_flush_failure_keeps_dirty(self) -> None:
+        lower = AsyncMock()
+        lower.set.side_effect = ValueError()
+        c = TieredCache([MemoryCache(), lower], write_policy="write-back")
+        await c.set(s.rid, s.record)
+        with pytest.raises(ValueError):
+            await c.flush()
+        assert c.dirty == {s.rid: s.record}
+
+
+class TestWriteBehindCache:
+    @pytest.mark.asyncio
+    async def test_set_does_not_wait(self) -> None:
+        release = asyncio.Event()
+        inner = DictCache()
+
+        async def slow_set(id: RecordId, value: Optional[Record]) -> None:
+            await release.wait()
+            inner.values[id] = value
+
+        m_inner = AsyncMock(spec=DictCache)
+        m_inner.set.side_effect = slow_set
+        m_inner.get.return_value = (CacheResult.MISS, None)
+        c = WriteBehindCache(m_inner)
+
+        await c.set(s.rid, s.record)
+        assert inner.values == {}
+        # Pending writes are visible to readers.
+        assert await c.get(s.rid) == (CacheResult.HIT, s.record)
+        assert await c.get(s.rid2) == (CacheResult.MISS, None)
+
+        release.set()
+        await c.close()
+        assert inner.values == {s.rid: s.record}
+        assert c.pending == {}
+        assert c.writer is None
+
+    @pytest.mark.asyncio
+    async def test_set_many(self) -> None:
+        m_inner = AsyncMock(spec=BatchDictCache)
+        c = WriteBehindCache(m_inner, batch_size=2)
+        for rid in (s.rid1, s.rid2, s.rid3):
+            await c.set(rid, s.record)
+        await c.close()
+
+        m_inner.set.assert_not_called()
+        assert m_inner.set_many.call_args_list == [
+            call({s.rid1: s.record, s.rid2: s.record}),
+            call({s.rid3: s.record}),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_latest_value_written(self) -> None:
+        inner = DictCache()
+        c = WriteBehindCache(inner)
+        await c.set(s.rid, s.record1)
+        await c.set(s.rid, s.record2)
+        await c.flush()
+        assert inner.values == {s.rid: s.record2}
+        assert c.pending == {}
+        await c.close()
+
+    @pytest.mark.asyncio
+    async def test_bounded(self) -> None:
+        release = asyncio.Event()
+        m_inner = AsyncMock(spec=DictCache)
+
+        async def blocked_set(id: RecordId, value: Optional[Record]) -> None:
+            await release.wait()
+
+        m_inner.set.side_effect = blocked_set
+        c = WriteBehindCache(m_inner, max_pending=1, batch_size=1)
+
+        await c.set(s.rid1, s.record)
+        await asyncio.sleep(0)  # the writer takes rid1 from the queue
+        await c.set(s.rid2, s.record)
+        set_task = asyncio.create_task(c.set(s.rid3, s.record))
+        await asyncio.sleep(0)
+        assert not set_task.done()
+
+        release.set()
+        await set_task
+        await c.close()
+        assert m_inner.set.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_write_failure(self) -> None:
+        m_inner = AsyncMock(spec=DictCache)
+        m_inner.set.side_effect = [ValueError(), None]
+        m_on_error = MagicMock()
+        c = WriteBehindCache(m_inner, on_error=m_on_error)
+
+        await c.set(s.rid1, s.record)
+        await c.flush()
+        await c.set(s.rid2, s.record)
+        await c.close()
+
+        assert c.num_write_failures == 1
+        m_on_error.assert_called_once_with([s.rid1], ANY)
+        assert isinstance(m_on_error.call_args.args[1], ValueError)
+        assert c.pending == {}
+
+    @pytest.mark.asyncio
+    async def test_on_error_raises(self) -> None:
+        m_inner = AsyncMock(spec=DictCache)
+        m_inner.set.side_effect = [ValueError(), None]
+        m_on_error = MagicMock(side_effect=RuntimeError())
+        c = WriteBehindCache(m_inner, on_error=m_on_error)
+
+        await c.set(s.rid1, s.record)
+        await asyncio.wait_for(c.flush(), 1)
+        # The writer is still running.
+        await c.set(s.rid2, s.record)
+        await asyncio.wait_for(c.close(), 1)
+
+        m_on_error.assert_called_once()
+        assert m_inner.set.call_args_list == [
+            call(s.rid1, s.record),
+            call(s.rid2, s.record),
+        ]
+        assert c.pending == {}
+
+    @pytest.mark.asyncio
+    async def test_close_cancelled(self) -> None:
+        release = asyncio.Event()
+
+        async def set(id: RecordId, value: Optional[Record]) -> None:
+            await release.wait()
+
+        m_inner = AsyncMock(spec=DictCache)
+        m_inner.set.side_effect = set
+        c = WriteBehindCache(m_inner)
+        await c.set(s.rid, s.record)
+
+        with pytest.raises(TimeoutError):
+            async with asyncio.timeout(0.01):
+                await c.close()
+        assert c.writer is None
+        assert c.pending == {s.rid: s.record}
@@ -0,0 +1,110 @@
+from geneagrapher_core.client import main, parse_item, request_graph
+from geneagrapher_core.server import GraphService, make_app
+
+from .conftest import FakeBuildGraph, make_record
+
+from aiohttp.test_utils import TestServer
+import asyncio
+import http.client
+import io
+import json
+from pathlib import Path
+import pytest
+import subprocess
+import sys
+from typing import Any
+from unittest.mock import patch, sentinel as s
+
+RECORDS = [make_record(1, [2]), make_record(2)]
+
+
+def make_server() -> TestServer:
+    return TestServer(make_app(GraphService(s.client, s.http_semaphore, s.cache)))
+
+
+@pytest.mark.parametrize(
+    "text,expected",
+    [
+        ("18231", {"id": 18231, "direction": "ADVISORS"}),
+        ("18231:descendants", {"id": 18231, "direction": "DESCENDANTS"}),
+        (
+            "18231:ADVISORS|DESCENDANTS",
+            {"id": 18231, "direction": "ADVISORS|DESCENDANTS"},
+        ),
+    ],
+)
+def test_parse_item(text: str, expected: Any) -> None:
+    assert parse_item(text) == expected
+
+
+@pytest.mark.parametrize("text", ["x", "18231:SIDEWAYS"])
+def test_parse_item_invalid(text: str) -> None:
+    with pytest.raises(ValueError):
+        parse_item(text)
+
+
+def test_no_aiohttp_import() -> None:
+    modules = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, geneagrapher_core.client; print(' '.join(sys.modules))",
+        ],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout.split()
+    assert "aiohttp" not in modules
+    assert "bs4" not in modules
+
+
+@pytest.mark.asyncio
+async def test_request_graph() -> None:
+    async with make_server() as server:
+        with patch("geneagrapher_core.server.build_graph", FakeBuildGraph(RECORDS)):
+            connection = http.client.HTTPConnection(server.host, server.port)
+            graph = await asyncio.to_thread(
+                request_graph, connection, [parse_item("1:ADVISORS")], 10
+            )
+            connection.close()
+
+    assert graph == {
+        "start_nodes": [1],
+        "nodes": {1: RECORDS[0], 2: RECORDS[1]},
+        "status": "complete",
+    }
+
+
+@pytest.mark.asyncio
+async def test_request_graph_error() -> None:
+    async with make_server() as server:
+        fake = FakeBuildGraph(RECORDS, error=ValueError("failed"))
+        with patch("geneagrapher_core.server.build_graph", fake):
+            connection = http.client.HTTPConnection(server.host, server.port)
+            with pytest.raises(RuntimeError, match="ValueError"):
+                await asyncio.to_thread(
+                    request_graph, connection, [parse_item("1")], None
+                )
+            connection.close()
+
+
+@pytest.mark.asyncio
+async def test_main() -> None:
+    async with make_server() as server:
+        with patch("geneagrapher_core.server.build_graph", FakeBuildGraph(RECORDS)):
+            argv = ["geneagrapher-core-client", "--url", str(server.make_url("")), "1"]
+            with patch.object(sys, "argv", argv):
+                with patch.object(sys, "stdout", io.StringIO()) as stdout:
+                    await asyncio.to_thread(main)
+
+    assert json.loads(stdout.getvalue())["nodes"] == {
+        "1": RECORDS[0],
+        "2": RECORDS[1],
+    }
+
+
+def test_main_no_server(tmp_path: Path) -> None:
+    argv = ["geneagrapher-core-client", "--socket", str(tmp_path / "none.sock"), "1"]
+    with patch.object(sys, "argv", argv):
+        with pytest.raises(SystemExit):
+            main()
@@ -0,0 +1,96 @@
+from geneagrapher_core.export import (
+    DotExporter,
+    EdgeExporter,
+    EdgeListExporter,
+    Exporter,
+    JSONLinesExporter,
+    make_label,
+)
+
+from .conftest import make_record
+
+import io
+import json
+import pytest
+from typing import Optional
+from unittest.mock import sentinel as s
+
+
+# Record 2 is advised by 1 and 3. Record 4 is a student of 2 who is
+# never seen.
+RECORDS = [
+    make_record(2, [1, 3], [4]),
+    make_record(1, [], [2, 5]),
+    make_record(3, [], [2]),
+]
+
+
+def test_jsonl_exporter() -> None:
+    stream = io.StringIO()
+    JSONLinesExporter(stream).export(RECORDS)
+    assert [json.loads(line) for line in stream.getvalue().splitlines()] == RECORDS
+
+
+def test_edge_list_exporter() -> None:
+    stream = io.StringIO()
+    EdgeListExporter(stream).export(RECORDS)
+    assert stream.getvalue() == "1 2\n3 2\n"
+
+
+@pytest.mark.asyncio
+async def test_record_callback() -> None:
+    stream = io.StringIO()
+    with EdgeListExporter(stream) as exporter:
+        for record in RECORDS:
+            await exporter.record_callback(s.tg, record)
+    assert stream.getvalue() == "1 2\n3 2\n"
+
+
+def test_dot_exporter() -> None:
+    stream = io.StringIO()
+    DotExporter(stream).export(RECORDS)
+    assert (
+        stream.getvalue()
+        == """digraph {
+    graph [charset="utf-8"];
+    node [shape=plaintext];
+    edge [style=bold];
+
+    2 [label="Name 2"];
+    1 [label="Name 1"];
+    1 -> 2;
+    3 [label="Name 3"];
+    3 -> 2;
+}
+"""
+    )
+
+
+@pytest.mark.parametrize(
+    "name,institution,year,expected",
+    [
+        ("Carl Gauß", None, None, "Carl Gauß"),
+        ("Carl Gauß", "Helmstedt", None, "Carl Gauß\\nHelmstedt"),
+        ("Carl Gauß", None, 1799, "Carl Gauß\\n(1799)"),
+        ("Carl Gauß", "Helmstedt", 1799, "Carl Gauß\\nHelmstedt (1799)"),
+        ('A "B" C\\', None, None, 'A \\"B\\" C\\\\'),
+    ],
+)
+def test_make_label(
+    name: str, institution: Optional[str], year: Optional[int], expected: str
+) -> None:
+    assert (
+        make_label(make_record(1, name=name, institution=institution, year=year))
+        == expected
+    )
+
+
+@pytest.mark.parametrize("base", [Exporter, EdgeExporter])
+def test_add_record_required(base: type[Exporter]) -> None:
+    class Incomplete(base):  # type: ignore[misc,valid-type]
+        pass
+
+    # A subclass without add_record fails when it is created, not
+    # partway through an export.
+    with pytest.raises(TypeError):
+        Incomplete(io.StringIO())
@@ -0,0 +1,208 @@
+from geneagrapher_core.graph_cache import GraphResultCache, is_cacheable, request_key
+from geneagrapher_core.record import RecordId
+from geneagrapher_core.store import SpillingRecordStore
+from geneagrapher_core.traverse import (
+    Geneagraph,
+    TraverseDirection,
+    TraverseItem,
+    build_graph,
+)
+
+from .conftest import FakeBuildGraph
+
+import asyncio
+import pytest
+from typing import Any
+from unittest.mock import sentinel as s
+
+A = TraverseDirection.ADVISORS
+D = TraverseDirection.DESCENDANTS
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_request_key() -> None:
+    items = [TraverseItem(RecordId(2), A), TraverseItem(RecordId(1), A | D)]
+    assert request_key(items, 10) == request_key(items[::-1], 10)
+    assert request_key(items, 10) != request_key(items, None)
+    assert request_key(items, 10) != request_key(
+        [TraverseItem(RecordId(2), D), TraverseItem(RecordId(1), A | D)], 10
+    )
+
+
+@pytest.mark.parametrize(
+    "status,expected",
+    [
+        ({"status": "complete"}, True),
+        ({"status": "truncated", "truncation_reason": "max_records"}, True),
+        ({"status": "truncated", "truncation_reason": "time_budget"}, False),
+        ({"status": "incomplete", "failed": [1]}, False),
+    ],
+)
+def test_is_cacheable(status: Any, expected: bool) -> None:
+    ggraph: Any = {"start_nodes": [], "nodes": {}, **status}
+    assert is_cacheable(ggraph) is expected
+
+
+def test_is_cacheable_store() -> None:
+    with SpillingRecordStore(1) as store:
+        ggraph: Any = {"start_nodes": [], "nodes": store, "status": "complete"}
+        assert not is_cacheable(ggraph)
+
+
+@pytest.mark.asyncio
+async def test_build_graph() -> None:
+    build = FakeBuildGraph()
+    graphs = GraphResultCache(build)
+    items = [TraverseItem(RecordId(1), A), TraverseItem(RecordId(2), D)]
+
+    first = await graphs.build_graph(items, max_records=5, cache=s.cache)
+    second = await graphs.build_graph(items[::-1], max_records=5)
+    assert second is first
+    assert build.calls == [{"start_items": items, "max_records": 5, "cache": s.cache}]
+    assert (graphs.hits, graphs.misses) == (1, 1)
+
+    # A different limit is a different request.
+    await graphs.build_graph(items)
+    assert len(build.calls) == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "status",
+    [
+        {"status": "truncated", "truncation_reason": "time_budget"},
+        {"status": "incomplete", "failed": [1]},
+    ],
+)
+async def test_build_graph_not_kept(status: Any) -> None:
+    build = FakeBuildGraph(**status)
+    graphs = GraphResultCache(build)
+    items = [TraverseItem(RecordId(1), A)]
+
+    await graphs.build_graph(items)
+    await graphs.build_graph(items)
+    assert len(build.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_build_graph_deduplicated() -> None:
+    build = FakeBuildGraph()
+    build.release.clear()
+    graphs = GraphResultCache(build)
+    items = [TraverseItem(RecordId(1), A)]
+
+    tasks = [asyncio.create_task(graphs.build_graph(items)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    # Cancelling one caller does not stop the build for the others.
+    tasks[0].cancel()
+    build.release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert len(build.calls) == 1
+    assert isinstance(results[0], asyncio.CancelledError)
+    assert results[1] is results[2]
+    assert graphs.in_flight == {}
+    assert await graphs.build_graph(items) is results[1]
+
+
+@pytest.mark.asyncio
+async def test_build_graph_memory_budget() -> None:
+    build = FakeBuildGraph()
+    graphs = GraphResultCache(build)
+    items = [TraverseItem(RecordId(1), A)]
+    with pytest.raises(ValueError):
+        await graphs.build_graph(items, memory_budget=10)
+    assert build.calls == []
+
+    await graphs.build_graph(items, memory_budget=None)
+    assert len(build.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_build_graph_error() -> None:
+    graphs = GraphResultCache(FakeBuildGraph(error=ValueError("failed")))
+    items = [TraverseItem(RecordId(1), A)]
+    with pytest.raises(ValueError):
+        await graphs.build_graph(items)
+    assert graphs.entries == {}
+    assert graphs.in_flight == {}
+
+
+@pytest.mark.asyncio
+async def test_ttl() -> None:
+    build = FakeBuildGraph()
+    clock = FakeClock()
+    graphs = GraphResultCache(build, ttl=60, clock=clock)
+    items = [TraverseItem(RecordId(1), A)]
+
+    await graphs.build_graph(items)
+    clock.now = 60
+    await graphs.build_graph(items)
+    assert len(build.calls) == 1
+
+    clock.now = 61
+    await graphs.build_graph(items)
+    assert len(build.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_validate() -> None:
+    build = FakeBuildGraph()
+    valid = True
+
+    async def validate(ggraph: Geneagraph) -> bool:
+        return valid
+
+    graphs = GraphResultCache(build, validate=validate)
+    items = [TraverseItem(RecordId(1), A)]
+
+    await graphs.build_graph(items)
+    await graphs.build_graph(items)
+    assert len(build.calls) == 1
+
+    valid = False
+    await graphs.build_graph(items)
+    assert len(build.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_max_entries() -> None:
+    build = FakeBuildGraph()
+    graphs = GraphResultCache(build, max_entries=2)
+    items = [[TraverseItem(RecordId(rid), A)] for rid in range(3)]
+
+    await graphs.build_graph(items[0])
+    await graphs.build_graph(items[1])
+    # Using the first graph makes the second the least recently used.
+    await graphs.build_graph(items[0])
+    await graphs.build_graph(items[2])
+    assert list(graphs.entries) == [
+        request_key(items[0], None),
+        request_key(items[2], None),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_invalidate() -> None:
+    build = FakeBuildGraph()
+    graphs = GraphResultCache(build)
+    items = [TraverseItem(RecordId(1), A)]
+
+    await graphs.build_graph(items, max_records=3)
+    graphs.invalidate(items, 3)
+    await graphs.build_graph(items, max_records=3)
+    assert len(build.calls) == 2
+
+    graphs.clear()
+    assert graphs.entries == {}
+
+
+def test_default_build() -> None:
+    assert GraphResultCache().build is build_graph
@@ -0,0 +1,99 @@
+from geneagrapher_core.layout import (
+    compute_generations,
+    compute_layout,
+    graph_advisors,
+    graph_students,
+)
+from geneagrapher_core.record import Record
+from geneagrapher_core.traverse import Geneagraph
+
+from .conftest import make_record
+
+import pytest
+from typing import List
+
+
+def make_graph(records: List[Record]) -> Geneagraph:
+    return {
+        "start_nodes": [records[0]["id"]],
+        "nodes": {r["id"]: r for r in records},
+        "status": "complete",
+    }
+
+
+# 1 advises 2 and 4; 2 advises 3; 3 and 4 advise 5. Record 5 is two
+# generations below 4 because of its longer chain through 2 and 3.
+# Record 1 lists 9, which is not in the graph, as a student.
+GRAPH = make_graph(
+    [
+        make_record(1, [], [2, 4, 9]),
+        make_record(2, [1], [3]),
+        make_record(3, [2], [5]),
+        make_record(4, [1], [5]),
+        make_record(5, [3, 4], []),
+    ]
+)
+
+
+def test_graph_students() -> None:
+    students = graph_students(GRAPH)
+    assert list(students) == [1, 2, 3, 4, 5]
+    assert students == {1: {2, 4}, 2: {3}, 3: {5}, 4: {5}, 5: set()}
+
+
+@pytest.mark.parametrize(
+    "records",
+    [
+        [make_record(1, [], [2]), make_record(2, [], [])],
+        [make_record(1, [], []), make_record(2, [1], [])],
+    ],
+)
+def test_graph_students_one_sided_edges(records: List[Record]) -> None:
+    # Edges are recognized from either record's lists.
+    assert graph_students(make_graph(records)) == {1: {2}, 2: set()}
+
+
+def test_graph_students_self_edge() -> None:
+    students = graph_students(make_graph([make_record(1, [1], [1])]))
+    assert students == {1: set()}
+
+
+def test_graph_advisors() -> None:
+    advisors = graph_advisors(graph_students(GRAPH))
+    assert advisors == {1: [], 2: [1], 3: [2], 4: [1], 5: [3, 4]}
+
+
+def test_compute_generations_cycle() -> None:
+    students = graph_students(
+        make_graph(
+            [
+                make_record(1, [], [2]),
+                make_record(2, [1, 3], [3]),
+                make_record(3, [2], [2]),
+            ]
+        )
+    )
+    assert compute_generations(students) == [[1], [2, 3]]
+
+
+def test_compute_layout() -> None:
+    layout = compute_layout(GRAPH)
+    assert layout.generation == {1: 0, 2: 1, 4: 1, 3: 2, 5: 3}
+    assert [sorted(layer) for layer in layout.layers] == [[1], [2, 4], [3], [5]]
+    assert layout.in_degree == {1: 0, 2: 1, 3: 1, 4: 1, 5: 2}
+    assert layout.out_degree == {1: 2, 2: 1, 3: 1, 4: 1, 5: 0}
+
+
+def test_compute_layout_ordering() -> None:
+    # Without reordering, the edges 1 -> 4 and 2 -> 3 cross.
+    layout = compute_layout(
+        make_graph(
+            [
+                make_record(1, [], [4]),
+                make_record(2, [], [3]),
+                make_record(3, [2], []),
+                make_record(4, [1], []),
+            ]
+        )
+    )
+    assert layout.layers == [[1, 2], [4, 3]]
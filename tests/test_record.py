@@ -1,20 +1,48 @@
 from geneagrapher_core.record import (
+    PAGE_END_MARKER,
+    Cache,
     CacheResult,
+    Record,
+    RecordId,
+    RecordResult,
+    build_intermediate_connector,
     fetch_document,
+    fetch_page,
     get_advisors,
     get_descendants,
     get_institution,
     get_name,
+    get_record,
     get_record_inner,
+    get_records,
     get_year,
     has_record,
+    intermediate_ssl_context,
+    make_session,
 )
 
-from .conftest import RECORD_TESTDATA_DIR, load_record_test
+from geneagrapher_core.trace import Tracer
+
+from .conftest import (
+    BatchDictCache,
+    DictCache,
+    load_record_test,
+    load_toml,
+    RECORD_TESTDATA_DIR,
+)
+
+from bs4 import BeautifulSoup
 
 from glob import glob
 import os
 import pytest
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Optional,
+)
 from unittest.mock import AsyncMock, MagicMock, patch, sentinel as s
 
 
@@ -43,11 +71,13 @@ def test_has_record(test_record_ids: str) -> None:
 @patch("geneagrapher_core.record.get_institution")
 @patch("geneagrapher_core.record.get_name")
 @patch("geneagrapher_core.record.has_record")
-@patch("geneagrapher_core.record.fetch_document")
+@patch("geneagrapher_core.record.BeautifulSoup")
+@patch("geneagrapher_core.record.fetch_page")
 @patch("geneagrapher_core.record.fake_semaphore")
 async def test_get_record_inner(
     m_fake_semaphore: AsyncMock,
-    m_fetch_document: AsyncMock,
+    m_fetch_page: AsyncMock,
+    m_bs: MagicMock,
     m_has_record: MagicMock,
     m_get_name: MagicMock,
     m_get_institution: MagicMock,
@@ -59,7 +89,7 @@ async def test_get_record_inner(
     cache_hit: bool,
 ) -> None:
     m_has_record.return_value = has_record
-    m_soup = m_fetch_document.return_value
+    m_soup = m_bs.return_value
 
     m_cache = AsyncMock()
     m_cache.get.return_value = (
@@ -76,7 +106,7 @@ async def test_get_record_inner(
         if m_http_semaphore is not None:
             m_http_semaphore.__aenter__.assert_not_called()
 
-        m_fetch_document.assert_not_called()
+        m_fetch_page.assert_not_called()
         m_has_record.assert_not_called()
         m_get_name.assert_not_called()
         m_get_institution.assert_not_called()
@@ -92,7 +122,8 @@ async def test_get_record_inner(
             m_http_semaphore.__aenter__.assert_called_once_with()
             m_fake_semaphore.return_value.__aenter__.assert_not_called()
 
-        m_fetch_document.assert_called_once_with(s.rid, s.client_session)
+        m_fetch_page.assert_called_once_with(s.rid, s.client_session)
+        m_bs.assert_called_once_with(m_fetch_page.return_value, "html.parser")
         m_has_record.assert_called_once_with(m_soup)
 
         if has_record:
@@ -123,15 +154,218 @@ async def test_get_record_inner(
 
 
 @pytest.mark.asyncio
-@patch("geneagrapher_core.record.BeautifulSoup")
+@pytest.mark.parametrize("cache_hit", [False, True])
+@patch("geneagrapher_core.record.fetch_page")
+async def test_get_record_inner_tracer(
+    m_fetch_page: AsyncMock, cache_hit: bool
+) -> None:
+    with open(os.path.join(RECORD_TESTDATA_DIR, "18231.html")) as f:
+        m_fetch_page.return_value = f.read()
+    m_cache = AsyncMock()
+    m_cache.get.return_value = (
+        (CacheResult.HIT, s.cache_record) if cache_hit else (CacheResult.MISS, None)
+    )
+    tracer = Tracer()
+
+    await get_record_inner(RecordId(18231), s.client, None, m_cache, tracer=tracer)
+
+    assert {e["tid"] for e in tracer.events} == {18231}
+    events = [(e["name"], e["ph"]) for e in tracer.events]
+    if cache_hit:
+        assert events == [("cache get", "B"), ("cache get", "E"), ("cache hit", "i")]
+    else:
+        assert events == [
+            ("cache get", "B"),
+            ("cache get", "E"),
+            ("semaphore wait", "B"),
+            ("semaphore wait", "E"),
+            ("http", "B"),
+            ("http", "E"),
+            ("parse", "B"),
+            ("parse", "E"),
+            ("cache set", "B"),
+            ("cache set", "E"),
+        ]
+
+
+@pytest.mark.asyncio
+@patch("geneagrapher_core.record.get_record_inner")
+@patch("geneagrapher_core.record.build_intermediate_connector")
+@patch("geneagrapher_core.record.ClientSession")
+async def test_get_record(
+    m_client_session: MagicMock,
+    m_build_intermediate_connector: MagicMock,
+    m_get_record_inner: AsyncMock,
+) -> None:
+    m_client = m_client_session.return_value.__aenter__.return_value
+    assert await get_record(s.rid, s.cache) == m_get_record_inner.return_value
+    m_client_session.assert_called_once_with(
+        "https://www.mathgenealogy.org",
+        headers=None,
+        connector=m_build_intermediate_connector.return_value,
+    )
+    m_get_record_inner.assert_called_once_with(s.rid, m_client, cache=s.cache)
+
+
+def fake_get_record_inner(
+    records: Dict[RecordId, Optional[Record]]
+) -> Callable[..., Awaitable[Optional[Record]]]:
+    async def get_record_inner(
+        record_id: RecordId,
+        client: object,
+        http_semaphore: object,
+        cache: Optional[Cache],
+    ) -> Optional[Record]:
+        if cache is not None:
+            (status, record) = await cache.get(record_id)
+            if status is CacheResult.HIT:
+                return record
+        record = records[record_id]
+        if isinstance(record, Exception):
+            raise record
+        if cache is not None:
+            await cache.set(record_id, record)
+        return record
+
+    return get_record_inner
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("cache_class", [None, DictCache, BatchDictCache])
+@patch("geneagrapher_core.record.get_record_inner")
+@patch("geneagrapher_core.record.build_intermediate_connector")
+@patch("geneagrapher_core.record.ClientSession")
+async def test_get_records(
+    m_client_session: MagicMock,
+    m_build_intermediate_connector: MagicMock,
+    m_get_record_inner: AsyncMock,
+    cache_class: Optional[type[DictCache]],
+) -> None:
+    error = ValueError("failed")
+    m_get_record_inner.side_effect = fake_get_record_inner(
+        {s.rid1: s.record1, s.rid2: None, s.rid3: error}  # type: ignore[dict-item]
+    )
+    cache = None if cache_class is None else cache_class({s.rid4: s.record4})
+
+    results = [
+        r
+        async for r in get_records(
+            [s.rid1, s.rid2, s.rid3, s.rid1, s.rid4], user_agent="UA", cache=cache
+        )
+    ]
+
+    assert len(results) == 4
+    by_id = {r.id: r for r in results}
+    assert by_id[s.rid1] == RecordResult(s.rid1, s.record1)
+    assert by_id[s.rid2] == RecordResult(s.rid2, None)
+    assert by_id[s.rid3] == RecordResult(s.rid3, None, error)
+    if cache is None:
+        # There is no test record for rid4.
+        assert isinstance(by_id[s.rid4].error, KeyError)
+    else:
+        assert by_id[s.rid4] == RecordResult(s.rid4, s.record4)
+        assert cache.values == {s.rid1: s.record1, s.rid2: None, s.rid4: s.record4}
+
+    m_client_session.assert_called_once_with(
+        "https://www.mathgenealogy.org",
+        headers={"User-Agent": "UA"},
+        connector=m_build_intermediate_connector.return_value,
+    )
+    if isinstance(cache, BatchDictCache):
+        assert cache.get_many_calls == [[s.rid1, s.rid2, s.rid3, s.rid4]]
+        # Only records missing from the cache are requested.
+        assert len(m_get_record_inner.call_args_list) == 3
+    else:
+        assert len(m_get_record_inner.call_args_list) == 4
+
+
+@pytest.mark.asyncio
 @patch("geneagrapher_core.record.ClientSession")
-async def test_fetch_document(m_client_session: MagicMock, m_bs: MagicMock) -> None:
-    m_page = AsyncMock()
-    m_client_session.get.return_value.__aenter__.return_value = m_page
+async def test_get_records_all_cached(m_client_session: MagicMock) -> None:
+    cache = BatchDictCache({s.rid1: s.record1})
+    assert [r async for r in get_records([s.rid1], cache=cache)] == [
+        RecordResult(s.rid1, s.record1)
+    ]
+    m_client_session.assert_not_called()
+
+
+def test_intermediate_ssl_context() -> None:
+    context = intermediate_ssl_context()
+    assert intermediate_ssl_context() is context
+    assert context.get_ca_certs() != []
+
+
+@patch("geneagrapher_core.record.TCPConnector")
+def test_build_intermediate_connector(m_tcp_connector: MagicMock) -> None:
+    assert build_intermediate_connector() is m_tcp_connector.return_value
+    m_tcp_connector.assert_called_once_with(ssl=intermediate_ssl_context())
+
+
+def make_response(body: bytes, chunk_size: int, charset: Optional[str]) -> MagicMock:
+    async def iter_chunked(n: int) -> AsyncIterator[bytes]:
+        for i in range(0, len(body), chunk_size):
+            yield body[i : i + chunk_size]
+
+    m_resp = MagicMock()
+    m_resp.charset = charset
+    m_resp.content.iter_chunked = iter_chunked
+    m_resp.content.read = AsyncMock()
+    return m_resp
+
 
-    assert await fetch_document(s.rid, m_client_session) == m_bs.return_value
+@pytest.mark.asyncio
+@pytest.mark.parametrize("chunk_size", [1, 7, 100, 1000000])
+@pytest.mark.parametrize("charset", [None, "utf-8"])
+async def test_fetch_page(
+    test_record_ids: str, chunk_size: int, charset: Optional[str]
+) -> None:
+    with open(f"{test_record_ids}.html", "rb") as f:
+        body = f.read()
+    m_client_session = MagicMock()
+    m_resp = make_response(body, chunk_size, charset)
+    m_client_session.get.return_value.__aenter__.return_value = m_resp
+
+    page = await fetch_page(s.rid, m_client_session)
     m_client_session.get.assert_called_once_with("/id.php?id=sentinel.rid")
-    m_bs.assert_called_once_with(m_page.text.return_value, "html.parser")
+
+    text = body.decode()
+    if PAGE_END_MARKER in text:
+        assert page == text[: text.index(PAGE_END_MARKER) + len(PAGE_END_MARKER)]
+        m_resp.content.read.assert_awaited_once_with()
+    else:
+        assert page == text
+        m_resp.content.read.assert_not_called()
+
+    # The record extracted from the truncated page is unchanged.
+    soup = BeautifulSoup(page, "html.parser")
+    expected = load_toml(f"{test_record_ids}.toml")
+    assert has_record(soup) is expected["is_valid"]
+    assert get_name(soup) == expected["name"]
+    assert get_institution(soup) == expected.get("institution")
+    assert get_year(soup) == expected.get("year")
+    assert get_descendants(soup) == expected["descendants"]
+    assert get_advisors(soup) == expected["advisors"]
+
+
+@pytest.mark.asyncio
+async def test_fetch_page_charset() -> None:
+    body = f"<h2>Gauß</h2>{PAGE_END_MARKER}footer".encode("latin-1")
+    m_client_session = MagicMock()
+    m_client_session.get.return_value.__aenter__.return_value = make_response(
+        body, 1, "latin-1"
+    )
+    assert (
+        await fetch_page(s.rid, m_client_session) == f"<h2>Gauß</h2>{PAGE_END_MARKER}"
+    )
+
+
+@pytest.mark.asyncio
+@patch("geneagrapher_core.record.BeautifulSoup")
+@patch("geneagrapher_core.record.fetch_page")
+async def test_fetch_document(m_fetch_page: AsyncMock, m_bs: MagicMock) -> None:
+    assert await fetch_document(s.rid, s.client) == m_bs.return_value
+    m_fetch_page.assert_called_once_with(s.rid, s.client)
+    m_bs.assert_called_once_with(m_fetch_page.return_value, "html.parser")
 
 
 def test_get_name(test_record_ids: str) -> None:
@@ -157,3 +391,22 @@ def test_get_descendants(test_record_ids: str) -> None:
 def test_get_advisors(test_record_ids: str) -> None:
     soup, expected = load_record_test(test_record_ids)
     assert get_advisors(soup) == expected["advisors"]
+
+
+@pytest.mark.parametrize(
+    "user_agent,headers", [(None, None), ("UA", {"User-Agent": "UA"})]
+)
+@patch("geneagrapher_core.record.build_intermediate_connector")
+@patch("geneagrapher_core.record.ClientSession")
+def test_make_session(
+    m_client_session: MagicMock,
+    m_build_intermediate_connector: MagicMock,
+    user_agent: Optional[str],
+    headers: Optional[Dict[str, str]],
+) -> None:
+    assert make_session(user_agent) is m_client_session.return_value
+    m_client_session.assert_called_once_with(
+        "https://www.mathgenealogy.org",
+        headers=headers,
+        connector=m_build_intermediate_connector.return_value,
+    )
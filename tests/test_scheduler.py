@@ -0,0 +1,163 @@
+from geneagrapher_core.scheduler import FairScheduler, ScheduledSemaphore
+
+import asyncio
+import pytest
+from typing import List, Tuple
+
+
+async def hold(
+    semaphore: ScheduledSemaphore,
+    name: str,
+    order: List[str],
+    release: asyncio.Event,
+) -> None:
+    async with semaphore:
+        order.append(name)
+        await release.wait()
+
+
+async def run_in_order(
+    scheduler: FairScheduler, requests: List[Tuple[ScheduledSemaphore, str]]
+) -> List[str]:
+    """Queue requests while the scheduler's only slot is held and return
+    the order in which they are granted.
+    """
+    order: List[str] = []
+    release = asyncio.Event()
+    release.set()
+    blocker = scheduler.handle()
+    await blocker.acquire()
+    tasks = []
+    for semaphore, name in requests:
+        tasks.append(asyncio.create_task(hold(semaphore, name, order, release)))
+        await asyncio.sleep(0)
+    blocker.release()
+    await asyncio.gather(*tasks)
+    return order
+
+
+@pytest.mark.asyncio
+async def test_concurrency() -> None:
+    scheduler = FairScheduler(2)
+    first, second = scheduler.handle(), scheduler.handle()
+    await first.acquire()
+    await first.acquire()
+    assert first.locked()
+    assert second.locked()
+
+    task = asyncio.create_task(second.acquire())
+    await asyncio.sleep(0)
+    assert not task.done()
+
+    first.release()
+    await task
+    assert scheduler.available == 0
+
+    first.release()
+    second.release()
+    assert scheduler.available == 2
+    assert not first.locked()
+
+
+@pytest.mark.asyncio
+async def test_alone_uses_all_slots() -> None:
+    scheduler = FairScheduler(3)
+    semaphore = scheduler.handle()
+    for _ in range(3):
+        await semaphore.acquire()
+    assert scheduler.available == 0
+
+
+@pytest.mark.asyncio
+async def test_round_robin() -> None:
+    scheduler = FairScheduler(1)
+    big, small = scheduler.handle(), scheduler.handle()
+    # The big build queues all of its requests before the small one
+    # queues any, but they are still granted in turns.
+    requests = [(big, f"big{i}") for i in range(4)]
+    requests += [(small, f"small{i}") for i in range(2)]
+    order = await run_in_order(scheduler, requests)
+    assert order == ["big0", "small0", "big1", "small1", "big2", "big3"]
+
+
+@pytest.mark.asyncio
+async def test_weighted() -> None:
+    scheduler = FairScheduler(1)
+    heavy, light = scheduler.handle(2), scheduler.handle(1)
+    requests = [(heavy, f"heavy{i}") for i in range(4)]
+    requests += [(light, f"light{i}") for i in range(2)]
+    order = await run_in_order(scheduler, requests)
+    assert order == ["heavy0", "light0", "heavy1", "heavy2", "light1", "heavy3"]
+
+
+@pytest.mark.asyncio
+async def test_idle_credit() -> None:
+    scheduler = FairScheduler(1)
+    busy, idle = scheduler.handle(), scheduler.handle()
+    # The busy build has many grants while the other is idle.
+    for _ in range(5):
+        await busy.acquire()
+        busy.release()
+
+    # The idle build goes first, but it does not get to catch up on
+    # those five grants.
+    requests = [(busy, f"busy{i}") for i in range(3)]
+    requests += [(idle, f"idle{i}") for i in range(3)]
+    order = await run_in_order(scheduler, requests)
+    assert order == ["idle0", "busy0", "idle1", "busy1", "idle2", "busy2"]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter() -> None:
+    scheduler = FairScheduler(1)
+    first, second = scheduler.handle(), scheduler.handle()
+    await first.acquire()
+
+    cancelled = asyncio.create_task(second.acquire())
+    waiting = asyncio.create_task(second.acquire())
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+
+    # The slot skips the cancelled waiter.
+    first.release()
+    await waiting
+    second.release()
+    assert scheduler.available == 1
+    assert scheduler.waiting == {}
+
+
+@pytest.mark.asyncio
+async def test_cancelled_after_grant() -> None:
+    scheduler = FairScheduler(1)
+    first, second = scheduler.handle(), scheduler.handle()
+    await first.acquire()
+
+    task = asyncio.create_task(second.acquire())
+    await asyncio.sleep(0)
+    # The slot is granted, but the task is cancelled before it resumes,
+    # so the slot is released.
+    first.release()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert scheduler.available == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_only_waiter() -> None:
+    scheduler = FairScheduler(1)
+    first, second = scheduler.handle(), scheduler.handle()
+    await first.acquire()
+
+    task = asyncio.create_task(second.acquire())
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    first.release()
+
+    # The cancelled waiter does not hold up later acquisitions.
+    assert not second.locked()
+    await asyncio.wait_for(second.acquire(), 1)
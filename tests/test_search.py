@@ -0,0 +1,107 @@
+from geneagrapher_core.record import RecordId
+from geneagrapher_core.search import SearchIndex, SearchResult, tokenize
+from geneagrapher_core.traverse import TraverseDirection, TraverseItem
+
+from .conftest import make_record
+
+import pytest
+from typing import Any, Dict, List
+from unittest.mock import sentinel as s
+
+
+RECORDS = [
+    make_record(
+        18231,
+        name="Carl Friedrich Gauß",
+        institution="Universität Helmstedt",
+        year=1799,
+    ),
+    make_record(
+        18230,
+        name="Johann Friedrich Pfaff",
+        institution="Georg-August-Universität Göttingen",
+        year=1786,
+    ),
+    make_record(
+        34227,
+        name="Jules Henri Poincaré",
+        institution="Université Paris IV-Sorbonne",
+        year=1879,
+    ),
+    make_record(
+        7401,
+        name="Carl Gustav Jacob Jacobi",
+        institution="Universität Berlin",
+        year=1825,
+    ),
+    make_record(99999, name="Carl Unknown", institution=None, year=None),
+]
+
+
+@pytest.mark.parametrize(
+    "text,expected",
+    [
+        ("Carl Friedrich Gauß", ["carl", "friedrich", "gauss"]),
+        ("Jules Henri Poincaré", ["jules", "henri", "poincare"]),
+        ("Georg-August-Universität", ["georg", "august", "universitat"]),
+        ("", []),
+    ],
+)
+def test_tokenize(text: str, expected: List[str]) -> None:
+    assert tokenize(text) == expected
+
+
+@pytest.mark.parametrize(
+    "kwargs,expected",
+    [
+        ({"name": "gauss"}, [18231]),
+        ({"name": "c f gau"}, [18231]),
+        ({"name": "POINCARE"}, [34227]),
+        ({"name": "friedrich"}, [18231, 18230]),
+        ({"name": "carl"}, [18231, 7401, 99999]),
+        ({"name": "carl", "institution": "berlin"}, [7401]),
+        ({"institution": "universitat"}, [18231, 7401, 18230]),
+        ({"name": "carl", "min_year": 1800}, [7401]),
+        ({"name": "carl", "max_year": 1800}, [18231]),
+        ({"min_year": 1786, "max_year": 1799}, [18231, 18230]),
+        ({"name": "carl", "limit": 2}, [18231, 7401]),
+        ({"name": "nobody"}, []),
+        # Text without any words matches nothing rather than everything.
+        ({"name": "-"}, []),
+        ({"name": ""}, []),
+        ({"name": "carl", "institution": "  "}, []),
+        ({}, [18231, 7401, 99999, 18230, 34227]),
+    ],
+)
+def test_search(kwargs: Dict[str, Any], expected: List[int]) -> None:
+    index = SearchIndex(RECORDS)
+    assert [r.id for r in index.search(**kwargs)] == expected
+
+
+def test_add_replaces() -> None:
+    index = SearchIndex(RECORDS)
+    assert len(index.search(name="gauss")) == 1
+
+    index.add(make_record(18231, name="C. F. Gauss", institution=None, year=1799))
+    assert len(index) == 5
+    assert index.search(name="gauss") == [
+        SearchResult(RecordId(18231), "C. F. Gauss", None, 1799)
+    ]
+    assert index.search(name="friedrich") == [
+        SearchResult(
+            RecordId(18230),
+            "Johann Friedrich Pfaff",
+            "Georg-August-Universität Göttingen",
+            1786,
+        )
+    ]
+
+
+@pytest.mark.asyncio
+async def test_record_callback() -> None:
+    index = SearchIndex()
+    await index.record_callback(s.tg, RECORDS[0])
+    [result] = index.search(name="gauss")
+    assert result.traverse_item(TraverseDirection.ADVISORS) == TraverseItem(
+        RecordId(18231), TraverseDirection.ADVISORS
+    )
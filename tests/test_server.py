@@ -0,0 +1,127 @@
+from geneagrapher_core.record import RecordId
+from geneagrapher_core.scheduler import FairScheduler, ScheduledSemaphore
+from geneagrapher_core.server import (
+    GraphService,
+    format_direction,
+    make_app,
+    request_graph,
+)
+from geneagrapher_core.traverse import Geneagraph, TraverseDirection, TraverseItem
+
+from .conftest import FakeBuildGraph, make_record
+
+from aiohttp import ClientSession
+from aiohttp.test_utils import BaseTestServer, TestServer
+import asyncio
+import pytest
+from typing import Any, List, Optional
+from unittest.mock import patch, sentinel as s
+
+A = TraverseDirection.ADVISORS
+D = TraverseDirection.DESCENDANTS
+
+RECORDS = [make_record(1, [2]), make_record(2)]
+
+
+def make_server(http_semaphore: Any = s.http_semaphore) -> TestServer:
+    return TestServer(make_app(GraphService(s.client, http_semaphore, s.cache)))
+
+
+async def request(
+    server: BaseTestServer, items: List[TraverseItem], max_records: Optional[int] = None
+) -> Geneagraph:
+    async with ClientSession(str(server.make_url(""))) as client:
+        return await request_graph(client, items, max_records)
+
+
+@pytest.mark.parametrize(
+    "direction,expected",
+    [(A, "ADVISORS"), (D, "DESCENDANTS"), (A | D, "ADVISORS|DESCENDANTS")],
+)
+def test_format_direction(direction: TraverseDirection, expected: str) -> None:
+    assert format_direction(direction) == expected
+
+
+@pytest.mark.asyncio
+async def test_graph() -> None:
+    async with make_server() as server:
+        fake = FakeBuildGraph(RECORDS)
+        with patch("geneagrapher_core.server.build_graph", fake):
+            graph = await request(server, [TraverseItem(RecordId(1), A)], 10)
+
+        assert graph == {
+            "start_nodes": [1],
+            "nodes": {1: RECORDS[0], 2: RECORDS[1]},
+            "status": "complete",
+        }
+        assert len(fake.calls) == 1
+        assert fake.calls[0]["start_items"] == [TraverseItem(RecordId(1), A)]
+        assert fake.calls[0]["max_records"] == 10
+        assert fake.calls[0]["client"] is s.client
+        assert fake.calls[0]["http_semaphore"] is s.http_semaphore
+        assert fake.calls[0]["cache"] is s.cache
+
+
+@pytest.mark.asyncio
+async def test_graph_scheduler() -> None:
+    scheduler = FairScheduler(2)
+    async with make_server(scheduler) as server:
+        fake = FakeBuildGraph(RECORDS)
+        with patch("geneagrapher_core.server.build_graph", fake):
+            await request(server, [TraverseItem(RecordId(1), A)])
+            await request(server, [TraverseItem(RecordId(2), A)])
+
+        # Each graph gets its own handle on the shared scheduler.
+        semaphores = [call["http_semaphore"] for call in fake.calls]
+        assert all(isinstance(sem, ScheduledSemaphore) for sem in semaphores)
+        assert all(sem.scheduler is scheduler for sem in semaphores)
+        assert semaphores[0] is not semaphores[1]
+
+
+@pytest.mark.asyncio
+async def test_graph_deduplicated() -> None:
+    async with make_server() as server:
+        fake = FakeBuildGraph(RECORDS)
+        fake.release.clear()
+        with patch("geneagrapher_core.server.build_graph", fake):
+            items = [TraverseItem(RecordId(1), A), TraverseItem(RecordId(3), A | D)]
+            first = asyncio.create_task(request(server, items))
+            while len(fake.calls) == 0:
+                await asyncio.sleep(0.01)
+            # The same graph, with the start items in a different order,
+            # joins the traversal in progress.
+            second = asyncio.create_task(request(server, items[::-1]))
+            # A graph with a different limit is built separately.
+            third = asyncio.create_task(request(server, items, 5))
+            while len(fake.calls) < 2:
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.05)
+            fake.release.set()
+            graphs = await asyncio.gather(first, second, third)
+
+        assert len(fake.calls) == 2
+        assert graphs[0] == graphs[1] == graphs[2]
+        assert len(graphs[0]["nodes"]) == 2
+
+        # Finished graphs are not shared with later requests.
+        fake.release.set()
+        with patch("geneagrapher_core.server.build_graph", fake):
+            await request(server, items)
+        assert len(fake.calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_graph_error() -> None:
+    async with make_server() as server:
+        fake = FakeBuildGraph(RECORDS, error=ValueError("failed"))
+        with patch("geneagrapher_core.server.build_graph", fake):
+            with pytest.raises(RuntimeError, match="ValueError"):
+                await request(server, [TraverseItem(RecordId(1), A)])
+
+
+@pytest.mark.asyncio
+async def test_bad_request() -> None:
+    async with make_server() as server:
+        async with ClientSession(str(server.make_url(""))) as client:
+            async with client.post("/graph", json={"start_items": [{"id": 1}]}) as resp:
+                assert resp.status == 400
@@ -0,0 +1,163 @@
+from geneagrapher_core.record import CacheResult, Record, RecordId
+from geneagrapher_core.sharded import build_graph_sharded, shard_for
+from geneagrapher_core.traverse import TraverseDirection, TraverseItem
+
+from .conftest import make_record
+
+from concurrent.futures import Future
+import pytest
+from typing import Any, Callable, List, Literal, Optional, Tuple
+from unittest.mock import ANY, AsyncMock, call, patch
+
+
+TESTDATA: dict[int, Optional[Record]] = {
+    1: make_record(1, [3, 4], [6, 7]),
+    2: make_record(2, [3, 5], [6, 8]),
+    3: make_record(3, [], [1, 2]),
+    4: make_record(4, [], [1]),
+    5: None,
+    6: make_record(6, [1, 2], [8]),
+    7: make_record(7, [1], [9]),
+    8: make_record(8, [2], [9]),
+    9: None,
+}
+
+
+class TestdataCache:
+    """A cache that holds every record in the test data, so workers
+    never make HTTP requests.
+    """
+
+    async def get(self, id: RecordId) -> Tuple[CacheResult, Optional[Record]]:
+        return (CacheResult.HIT, TESTDATA[id])
+
+    async def set(self, id: RecordId, value: Optional[Record]) -> None:
+        pass
+
+
+class InlineExecutor:
+    """A stand-in for a process pool that runs submitted work
+    immediately in the calling process.
+    """
+
+    def __init__(self, **kwargs: Any) -> None:
+        pass
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> "Future[Any]":
+        future: "Future[Any]" = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def shutdown(self, wait: bool, cancel_futures: bool) -> None:
+        pass
+
+
+def fake_fetch_batch(ids: List[RecordId]) -> List[Tuple[RecordId, Optional[Record]]]:
+    return [(rid, TESTDATA[rid]) for rid in ids]
+
+
+@pytest.mark.parametrize("num_shards", [1, 3, 8])
+def test_shard_for(num_shards: int) -> None:
+    shards = [shard_for(RecordId(rid), num_shards) for rid in range(100)]
+    assert set(shards) == set(range(num_shards))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "start_nodes,max_records,expected_graph_records,expected_status",
+    [
+        (
+            [
+                TraverseItem(RecordId(1), TraverseDirection.ADVISORS),
+                TraverseItem(RecordId(2), TraverseDirection.ADVISORS),
+            ],
+            None,
+            [1, 2, 3, 4],
+            "complete",
+        ),
+        (
+            [
+                TraverseItem(RecordId(1), TraverseDirection.DESCENDANTS),
+                TraverseItem(RecordId(2), TraverseDirection.ADVISORS),
+            ],
+            None,
+            [1, 2, 3, 6, 7, 8],
+            "complete",
+        ),
+        (
+            [
+                TraverseItem(
+                    RecordId(1),
+                    TraverseDirection.ADVISORS | TraverseDirection.DESCENDANTS,
+                ),
+                TraverseItem(RecordId(2), TraverseDirection.ADVISORS),
+            ],
+            7,
+            [1, 2, 3, 4, 6, 7, 8],
+            "complete",
+        ),
+    ],
+)
+@pytest.mark.parametrize("num_shards", [1, 3])
+@pytest.mark.parametrize("batch_size", [1, 50])
+@patch("geneagrapher_core.sharded.fetch_batch", fake_fetch_batch)
+@patch("geneagrapher_core.sharded.ProcessPoolExecutor", InlineExecutor)
+async def test_build_graph_sharded(
+    start_nodes: List[TraverseItem],
+    max_records: Optional[int],
+    expected_graph_records: List[int],
+    expected_status: Literal["complete", "truncated"],
+    num_shards: int,
+    batch_size: int,
+) -> None:
+    m_record_callback = AsyncMock()
+    m_report_callback = AsyncMock()
+
+    ggraph = await build_graph_sharded(
+        start_nodes,
+        num_shards=num_shards,
+        batch_size=batch_size,
+        max_records=max_records,
+        record_callback=m_record_callback,
+        report_callback=m_report_callback,
+    )
+    assert ggraph == {
+        "start_nodes": [r.id for r in start_nodes],
+        "nodes": {rid: TESTDATA[rid] for rid in expected_graph_records},
+        "status": expected_status,
+    }
+
+    assert len(m_record_callback.mock_calls) == len(expected_graph_records)
+    for rid in expected_graph_records:
+        assert call(ANY, TESTDATA[rid]) in m_record_callback.mock_calls
+    assert m_report_callback.call_args.args[1:3] == (0, 0)
+
+
+@pytest.mark.asyncio
+@patch("geneagrapher_core.sharded.fetch_batch", fake_fetch_batch)
+@patch("geneagrapher_core.sharded.ProcessPoolExecutor", InlineExecutor)
+async def test_build_graph_sharded_truncated() -> None:
+    ggraph = await build_graph_sharded(
+        [
+            TraverseItem(
+                RecordId(1), TraverseDirection.ADVISORS | TraverseDirection.DESCENDANTS
+            )
+        ],
+        num_shards=2,
+        max_records=3,
+    )
+    assert len(ggraph["nodes"]) == 3
+    assert ggraph["status"] == "truncated"
+    assert ggraph["truncation_reason"] == "max_records"
+
+
+@pytest.mark.asyncio
+async def test_build_graph_sharded_processes() -> None:
+    """Run the traversal with real worker processes."""
+    ggraph = await build_graph_sharded(
+        [TraverseItem(RecordId(1), TraverseDirection.DESCENDANTS)],
+        num_shards=2,
+        cache_factory=TestdataCache,
+    )
+    assert ggraph["nodes"] == {rid: TESTDATA[rid] for rid in (1, 6, 7, 8)}
+    assert ggraph["status"] == "complete"
@@ -0,0 +1,279 @@
+from geneagrapher_core.record import Cache, CacheResult, Record, RecordId
+from geneagrapher_core.sqlite_cache import SQLiteCache
+from geneagrapher_core.sync import SyncClient
+from geneagrapher_core.traverse import (
+    TraverseDirection,
+    TraverseItem,
+    build_graph,
+)
+
+from .conftest import DictCache, make_record
+
+import asyncio
+from pathlib import Path
+import pytest
+import sqlite3
+from typing import Any, Dict, List, Optional
+from unittest.mock import MagicMock, patch, sentinel as s
+
+A = TraverseDirection.ADVISORS
+D = TraverseDirection.DESCENDANTS
+
+
+# 1 and 2 advised 3, which advised 4 and 5. 6 and 8 are not cached,
+# and 7 is cached as not existing.
+RECORDS: Dict[RecordId, Optional[Record]] = {
+    RecordId(1): make_record(1, [6], [3]),
+    RecordId(2): make_record(2, [7], [3]),
+    RecordId(3): make_record(3, [1, 2], [4, 5]),
+    RecordId(4): make_record(4, [3], []),
+    RecordId(5): make_record(5, [3], [8]),
+    RecordId(7): None,
+}
+
+
+async def make_cache(tmp_path: Path) -> SQLiteCache:
+    cache = SQLiteCache(str(tmp_path / "cache.db"))
+    await cache.set_many(RECORDS)
+    return cache
+
+
+@pytest.mark.asyncio
+async def test_get_set(tmp_path: Path) -> None:
+    cache = SQLiteCache(str(tmp_path / "cache.db"))
+    assert await cache.get(RecordId(1)) == (CacheResult.MISS, None)
+
+    await cache.set(RecordId(1), RECORDS[RecordId(1)])
+    await cache.set(RecordId(7), None)
+    assert await cache.get(RecordId(1)) == (CacheResult.HIT, RECORDS[RecordId(1)])
+    assert await cache.get(RecordId(7)) == (CacheResult.HIT, None)
+    cache.close()
+
+    # The records are in the file.
+    cache = SQLiteCache(str(tmp_path / "cache.db"))
+    assert await cache.get(RecordId(1)) == (CacheResult.HIT, RECORDS[RecordId(1)])
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_get_many(tmp_path: Path) -> None:
+    cache = await make_cache(tmp_path)
+    assert await cache.get_many([RecordId(1), RecordId(6), RecordId(7)]) == {
+        1: (CacheResult.HIT, RECORDS[RecordId(1)]),
+        6: (CacheResult.MISS, None),
+        7: (CacheResult.HIT, None),
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "items,expected_records,expected_frontier",
+    [
+        ([TraverseItem(RecordId(4), A)], [1, 2, 3, 4], [TraverseItem(RecordId(6), A)]),
+        (
+            [TraverseItem(RecordId(1), D)],
+            [1, 3, 4, 5],
+            [TraverseItem(RecordId(8), D)],
+        ),
+        (
+            [TraverseItem(RecordId(3), A | D)],
+            [1, 2, 3, 4, 5],
+            [TraverseItem(RecordId(6), A), TraverseItem(RecordId(8), D)],
+        ),
+        # Uncached start items are in the frontier.
+        (
+            [TraverseItem(RecordId(9), A | D), TraverseItem(RecordId(5), D)],
+            [5],
+            [TraverseItem(RecordId(9), A | D), TraverseItem(RecordId(8), D)],
+        ),
+    ],
+)
+async def test_get_closure(
+    tmp_path: Path,
+    items: List[TraverseItem],
+    expected_records: List[int],
+    expected_frontier: List[TraverseItem],
+) -> None:
+    cache = await make_cache(tmp_path)
+    closure = await cache.get_closure(items)
+    assert closure is not None
+    assert closure.records == {rid: RECORDS[RecordId(rid)] for rid in expected_records}
+    assert sorted(closure.frontier) == sorted(expected_frontier)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "items",
+    [
+        # 1 is an advisor of 4's advisor 3.
+        [TraverseItem(RecordId(4), A), TraverseItem(RecordId(1), D)],
+        # 6 is not cached, but is reached as an advisor of 1.
+        [TraverseItem(RecordId(1), A), TraverseItem(RecordId(6), D)],
+    ],
+)
+async def test_get_closure_overlapping(
+    tmp_path: Path, items: List[TraverseItem]
+) -> None:
+    cache = await make_cache(tmp_path)
+    assert await cache.get_closure(items) is None
+
+
+@pytest.mark.asyncio
+@patch("geneagrapher_core.traverse.get_record_inner")
+async def test_build_graph_overlapping(
+    m_get_record_inner: MagicMock, tmp_path: Path
+) -> None:
+    # 3 advised 2, which advised 1 and 4. build_graph does not follow
+    # 2's advisors, because 2 is a start item with the DESCENDANTS
+    # direction.
+    records: Dict[RecordId, Optional[Record]] = {
+        RecordId(1): make_record(1, [2], []),
+        RecordId(2): make_record(2, [3], [1, 4]),
+        RecordId(3): make_record(3, [], [2]),
+        RecordId(4): make_record(4, [2], []),
+    }
+    items = [TraverseItem(RecordId(1), A), TraverseItem(RecordId(2), D)]
+
+    async def get_record_inner(
+        record_id: RecordId,
+        client: object,
+        semaphore: object,
+        cache: Cache,
+        **kwargs: object,
+    ) -> Optional[Record]:
+        (status, record) = await cache.get(record_id)
+        assert status is CacheResult.HIT
+        return record
+
+    m_get_record_inner.side_effect = get_record_inner
+
+    sqlite_cache = SQLiteCache(str(tmp_path / "cache.db"))
+    await sqlite_cache.set_many(records)
+    graphs = [
+        await build_graph(items, client=s.client, cache=cache)
+        for cache in (DictCache(dict(records)), sqlite_cache)
+    ]
+    assert sorted(graphs[0]["nodes"]) == [1, 2, 4]
+    assert graphs[1] == graphs[0]
+
+
+@pytest.mark.asyncio
+@patch("geneagrapher_core.traverse.get_record_inner")
+async def test_build_graph(m_get_record_inner: MagicMock, tmp_path: Path) -> None:
+    cache = await make_cache(tmp_path)
+    fetched = {
+        RecordId(6): make_record(6, [], [1]),
+        RecordId(8): make_record(8, [5], []),
+    }
+
+    async def get_record_inner(
+        record_id: RecordId, *args: object, **kwargs: object
+    ) -> object:
+        return fetched[record_id]
+
+    m_get_record_inner.side_effect = get_record_inner
+    received: List[Any] = []
+
+    async def record_callback(tg: object, record: Record) -> None:
+        received.append(record["id"])
+
+    ggraph = await build_graph(
+        [TraverseItem(RecordId(3), A | D)],
+        client=s.client,
+        cache=cache,
+        record_callback=record_callback,
+    )
+
+    # Only the records outside the cached closure were requested.
+    assert sorted(c.args[0] for c in m_get_record_inner.call_args_list) == [6, 8]
+    expected_nodes: Dict[RecordId, Optional[Record]] = {
+        RecordId(rid): RECORDS[RecordId(rid)] for rid in range(1, 6)
+    }
+    expected_nodes.update(fetched)
+    assert ggraph == {
+        "start_nodes": [3],
+        "nodes": expected_nodes,
+        "status": "complete",
+    }
+    assert sorted(received) == [1, 2, 3, 4, 5, 6, 8]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "limit,expected_records", [(5, [1, 2, 3]), (4, None), (None, [1, 2, 3])]
+)
+async def test_get_closure_limit(
+    tmp_path: Path, limit: Optional[int], expected_records: Optional[List[int]]
+) -> None:
+    cache = await make_cache(tmp_path)
+    # The advisors of 3 visit 3, 1, 2, 6 and 7.
+    closure = await cache.get_closure([TraverseItem(RecordId(3), A)], limit)
+    if expected_records is None:
+        assert closure is None
+    else:
+        assert closure is not None
+        assert sorted(closure.records) == expected_records
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("limits", [{"max_records": 3}, {"memory_budget": 3}])
+@patch("geneagrapher_core.traverse.get_record_inner")
+async def test_build_graph_closure_too_large(
+    m_get_record_inner: MagicMock, tmp_path: Path, limits: Dict[str, Any]
+) -> None:
+    cache = await make_cache(tmp_path)
+
+    async def get_record_inner(
+        record_id: RecordId,
+        client: object,
+        semaphore: object,
+        cache: SQLiteCache,
+        **kwargs: object,
+    ) -> Optional[Record]:
+        return (await cache.get(record_id))[1]
+
+    m_get_record_inner.side_effect = get_record_inner
+
+    with patch.object(cache, "get_closure", wraps=cache.get_closure) as m_get_closure:
+        ggraph = await build_graph(
+            [TraverseItem(RecordId(3), A | D)], client=s.client, cache=cache, **limits
+        )
+
+    # The closure was not loaded, and the graph was built one record
+    # at a time instead.
+    m_get_closure.assert_called_once_with([TraverseItem(RecordId(3), A | D)], 3)
+    assert m_get_record_inner.call_count >= 3
+    if "max_records" in limits:
+        assert len(ggraph["nodes"]) == 3
+        assert ggraph["status"] == "truncated"
+        assert ggraph["truncation_reason"] == "max_records"
+
+
+@pytest.mark.asyncio
+async def test_locked_file(tmp_path: Path) -> None:
+    cache = SQLiteCache(str(tmp_path / "cache.db"))
+
+    # While another connection holds the write lock, storing a record
+    # waits without blocking the event loop.
+    other = sqlite3.connect(str(tmp_path / "cache.db"), isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    store = asyncio.create_task(cache.set(RecordId(7), None))
+    await asyncio.sleep(0.1)
+    assert not store.done()
+
+    other.execute("COMMIT")
+    await store
+    assert await cache.get(RecordId(7)) == (CacheResult.HIT, None)
+    other.close()
+    cache.close()
+
+
+def test_other_thread(tmp_path: Path) -> None:
+    cache = SQLiteCache(str(tmp_path / "cache.db"))
+    with SyncClient() as client:
+        client.run(cache.set(RecordId(1), RECORDS[RecordId(1)]))
+        assert client.run(cache.get(RecordId(1))) == (
+            CacheResult.HIT,
+            RECORDS[RecordId(1)],
+        )
+    cache.close()
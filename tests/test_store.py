@@ -0,0 +1,69 @@
+from geneagrapher_core.record import RecordId
+from geneagrapher_core.store import SpillingRecordStore
+
+from .conftest import make_record
+
+from pathlib import Path
+import pytest
+
+
+def test_spilling() -> None:
+    with SpillingRecordStore(2) as store:
+        for rid in range(1, 6):
+            store[RecordId(rid)] = make_record(rid)
+
+        assert len(store) == 5
+        assert list(store.memory) == [1, 2]
+        assert store.num_spilled == 3
+        assert list(store) == [1, 2, 3, 4, 5]
+        assert store[RecordId(4)] == make_record(4)
+        assert RecordId(5) in store
+        assert RecordId(6) not in store
+        assert dict(store) == {rid: make_record(rid) for rid in range(1, 6)}
+        with pytest.raises(KeyError):
+            store[RecordId(6)]
+
+
+def test_replace() -> None:
+    with SpillingRecordStore(1) as store:
+        store[RecordId(1)] = make_record(1)
+        store[RecordId(2)] = make_record(2)
+        # Replacing records does not change the count, whether they are
+        # in memory or spilled.
+        store[RecordId(1)] = make_record(3)
+        store[RecordId(2)] = make_record(4)
+        assert len(store) == 2
+        assert store[RecordId(1)] == make_record(3)
+        assert store[RecordId(2)] == make_record(4)
+
+
+def test_delete() -> None:
+    with SpillingRecordStore(1) as store:
+        store[RecordId(1)] = make_record(1)
+        store[RecordId(2)] = make_record(2)
+        store[RecordId(3)] = make_record(3)
+
+        del store[RecordId(1)]
+        del store[RecordId(2)]
+        assert len(store) == 1
+        with pytest.raises(KeyError):
+            del store[RecordId(2)]
+
+        # The freed memory slot takes a spilled record that is
+        # replaced, so it is not stored twice.
+        store[RecordId(3)] = make_record(4)
+        assert store.memory == {3: make_record(4)}
+        assert store.num_spilled == 0
+        assert list(store) == [3]
+
+
+def test_path(tmp_path: Path) -> None:
+    path = tmp_path / "records.db"
+    with SpillingRecordStore(0, str(path)) as store:
+        store[RecordId(1)] = make_record(1)
+        assert path.exists()
+        assert store[RecordId(1)] == make_record(1)
+
+    # Reopening the file starts with an empty store.
+    with SpillingRecordStore(0, str(path)) as store:
+        assert len(store) == 0
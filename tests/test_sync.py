@@ -0,0 +1,114 @@
+from geneagrapher_core.record import Record, RecordId
+from geneagrapher_core.sync import SyncClient
+from geneagrapher_core.traverse import Geneagraph, TraverseDirection, TraverseItem
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import threading
+from typing import Any, Iterator, List, Optional
+from unittest.mock import AsyncMock, MagicMock, patch, sentinel as s
+
+
+@pytest.fixture
+def m_client_session() -> Iterator[MagicMock]:
+    with patch("geneagrapher_core.record.build_intermediate_connector"), patch(
+        "geneagrapher_core.record.ClientSession"
+    ) as m_client_session:
+        m_client_session.return_value = AsyncMock()
+        yield m_client_session
+
+
+def test_init_and_close(m_client_session: MagicMock) -> None:
+    m_client: AsyncMock = m_client_session.return_value
+    with SyncClient(http_concurrency=3, user_agent="UA", cache=s.cache) as client:
+        assert client.thread.is_alive()
+        assert client.client is m_client
+        assert client.cache is s.cache
+        assert client.http_semaphore._value == 3
+        assert m_client_session.call_args.kwargs["headers"] == {"User-Agent": "UA"}
+
+    assert not client.thread.is_alive()
+    assert client.loop.is_closed()
+    m_client.close.assert_awaited_once_with()
+    # Closing again does nothing.
+    client.close()
+
+
+def test_get_record(m_client_session: MagicMock) -> None:
+    threads = set()
+
+    async def get_record_inner(
+        record_id: RecordId, client: object, http_semaphore: object, cache: object
+    ) -> Optional[Record]:
+        assert client is m_client_session.return_value
+        assert isinstance(http_semaphore, asyncio.Semaphore)
+        assert cache is s.cache
+        threads.add(threading.current_thread())
+        await asyncio.sleep(0.01)
+        return record_id  # type: ignore[return-value]
+
+    with SyncClient(cache=s.cache) as client, patch(
+        "geneagrapher_core.sync.get_record_inner", get_record_inner
+    ):
+        # Calls from several threads share the background loop.
+        with ThreadPoolExecutor(4) as executor:
+            results: List[object] = list(executor.map(client.get_record, range(8)))
+        assert results == list(range(8))
+        assert threads == {client.thread}
+
+
+def test_get_record_timeout(m_client_session: MagicMock) -> None:
+    cancelled = threading.Event()
+
+    async def get_record_inner(*args: Any) -> Optional[Record]:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        return None
+
+    with SyncClient() as client, patch(
+        "geneagrapher_core.sync.get_record_inner", get_record_inner
+    ):
+        with pytest.raises(TimeoutError):
+            client.get_record(s.rid, timeout=0.01)
+        assert cancelled.wait(1)
+
+
+def test_get_record_error(m_client_session: MagicMock) -> None:
+    async def get_record_inner(*args: Any) -> Optional[Record]:
+        raise ValueError("failed")
+
+    with SyncClient() as client, patch(
+        "geneagrapher_core.sync.get_record_inner", get_record_inner
+    ):
+        with pytest.raises(ValueError):
+            client.get_record(s.rid)
+
+
+def test_build_graph(m_client_session: MagicMock) -> None:
+    calls: List[dict[str, Any]] = []
+
+    async def build_graph(start_items: List[TraverseItem], **kwargs: Any) -> Geneagraph:
+        calls.append({"start_items": start_items, **kwargs})
+        return s.graph  # type: ignore[no-any-return]
+
+    items = [TraverseItem(RecordId(1), TraverseDirection.ADVISORS)]
+    with SyncClient(cache=s.cache) as client, patch(
+        "geneagrapher_core.sync.build_graph", build_graph
+    ):
+        assert client.build_graph(items, max_records=5, skip_failures=True) is s.graph
+        assert calls == [
+            {
+                "start_items": items,
+                "http_semaphore": client.http_semaphore,
+                "max_records": 5,
+                "time_budget": None,
+                "max_retries": 0,
+                "skip_failures": True,
+                "client": m_client_session.return_value,
+                "cache": s.cache,
+            }
+        ]
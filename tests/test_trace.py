@@ -0,0 +1,49 @@
+from geneagrapher_core.trace import NULL_TRACER, Tracer
+
+import io
+import json
+import os
+import pytest
+
+
+def test_tracer() -> None:
+    now = [10.0]
+    tracer = Tracer(clock=lambda: now[0])
+
+    tracer.instant("queued", 1)
+    now[0] += 0.5
+    with tracer.span("http", 1):
+        now[0] += 0.25
+        tracer.begin("parse", 2)
+    tracer.end("parse", 2)
+
+    pid = os.getpid()
+    assert tracer.events == [
+        {"name": "queued", "ph": "i", "ts": 0.0, "pid": pid, "tid": 1},
+        {"name": "http", "ph": "B", "ts": 500000.0, "pid": pid, "tid": 1},
+        {"name": "parse", "ph": "B", "ts": 750000.0, "pid": pid, "tid": 2},
+        {"name": "http", "ph": "E", "ts": 750000.0, "pid": pid, "tid": 1},
+        {"name": "parse", "ph": "E", "ts": 750000.0, "pid": pid, "tid": 2},
+    ]
+
+    f = io.StringIO()
+    tracer.write(f)
+    assert json.loads(f.getvalue()) == {
+        "traceEvents": tracer.events,
+        "displayTimeUnit": "ms",
+    }
+
+
+def test_span_exception() -> None:
+    tracer = Tracer()
+    with pytest.raises(ValueError):
+        with tracer.span("http", 1):
+            raise ValueError()
+    assert [e["ph"] for e in tracer.events] == ["B", "E"]
+
+
+def test_null_tracer() -> None:
+    NULL_TRACER.instant("queued", 1)
+    with NULL_TRACER.span("http", 1):
+        pass
+    assert NULL_TRACER.events == []
@@ -0,0 +1,75 @@
+from geneagrapher_core.record import RecordId, get_record_inner
+from geneagrapher_core.transport import (
+    DirectoryTransport,
+    HTTPTransport,
+    RecordingTransport,
+)
+from geneagrapher_core.traverse import TraverseDirection, TraverseItem, build_graph
+
+from .conftest import RECORD_TESTDATA_DIR, load_toml
+
+import os
+from pathlib import Path
+import pytest
+from unittest.mock import AsyncMock, patch, sentinel as s
+
+
+@pytest.mark.asyncio
+@patch("geneagrapher_core.transport.fetch_page")
+async def test_http_transport(m_fetch_page: AsyncMock) -> None:
+    transport = HTTPTransport(s.client)
+    assert await transport.fetch(s.rid) is m_fetch_page.return_value
+    m_fetch_page.assert_called_once_with(s.rid, s.client)
+
+
+@pytest.mark.asyncio
+async def test_directory_transport() -> None:
+    transport = DirectoryTransport(RECORD_TESTDATA_DIR)
+    with open(os.path.join(RECORD_TESTDATA_DIR, "18231.html")) as f:
+        assert await transport.fetch(RecordId(18231)) == f.read()
+
+    with pytest.raises(FileNotFoundError):
+        await transport.fetch(RecordId(1))
+
+
+@pytest.mark.asyncio
+async def test_get_record_inner_transport() -> None:
+    record = await get_record_inner(
+        RecordId(18231),
+        s.client,
+        transport=DirectoryTransport(RECORD_TESTDATA_DIR),
+    )
+    expected = load_toml(os.path.join(RECORD_TESTDATA_DIR, "18231.toml"))
+    assert record is not None
+    assert record["name"] == expected["name"]
+    assert record["advisors"] == expected["advisors"]
+
+
+@pytest.mark.asyncio
+async def test_record_and_replay(tmp_path: Path) -> None:
+    m_transport = AsyncMock()
+    m_transport.fetch.side_effect = lambda id: f"<p>page {id}</p>"
+    recorder = RecordingTransport(m_transport, tmp_path / "pages")
+
+    assert await recorder.fetch(RecordId(1)) == "<p>page 1</p>"
+    assert await recorder.fetch(RecordId(2)) == "<p>page 2</p>"
+    assert sorted(p.name for p in (tmp_path / "pages").iterdir()) == [
+        "1.html",
+        "2.html",
+    ]
+
+    replay = DirectoryTransport(tmp_path / "pages")
+    assert await replay.fetch(RecordId(2)) == "<p>page 2</p>"
+
+
+@pytest.mark.asyncio
+async def test_build_graph_replay(tmp_path: Path) -> None:
+    # Record 18231 from the test data, then replay the recording
+    # without the test data.
+    recorder = RecordingTransport(DirectoryTransport(RECORD_TESTDATA_DIR), tmp_path)
+    start_items = [TraverseItem(RecordId(18231), TraverseDirection(0))]
+    recorded = await build_graph(start_items, transport=recorder)
+    replayed = await build_graph(start_items, transport=DirectoryTransport(tmp_path))
+
+    assert set(recorded["nodes"]) == {18231}
+    assert replayed == recorded
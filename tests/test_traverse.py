@@ -1,14 +1,25 @@
 from geneagrapher_core.traverse import (
+    CompactLifecycleTracking,
     LifecycleTracking,
     MaxRecordsException,
+    RETRY_BASE_DELAY,
+    RecordIdBitmap,
     TraverseDirection,
     TraverseItem,
     build_graph,
 )
-from geneagrapher_core.record import RecordId
+from geneagrapher_core.cache import MemoryCache, TieredCache, WriteBehindCache
+from geneagrapher_core.record import Cache, Record, RecordId
+from geneagrapher_core.store import SpillingRecordStore
+from geneagrapher_core.trace import NULL_TRACER, Tracer
 
+from .conftest import make_record
+
+import asyncio
+import json
 import pytest
-from typing import List, Literal, Optional
+import sqlite3
+from typing import Any, List, Literal, Optional
 from unittest.mock import (
     ANY,
     AsyncMock,
@@ -212,6 +223,20 @@ class TestLifecycleTracking:
         assert t.num_records_received == expected_num_records_received
         m_report_back.assert_called_once_with()
 
+    @pytest.mark.parametrize(
+        "tracking_class", [LifecycleTracking, CompactLifecycleTracking]
+    )
+    @pytest.mark.asyncio
+    async def test_mark_done(self, tracking_class: type[LifecycleTracking]) -> None:
+        t = tracking_class([], None)
+        t.mark_done(RecordId(1))
+        assert t.num_records_received == 1
+        assert RecordId(1) in t.done
+
+        # Records that are done are not added again.
+        await t.create(RecordId(1), TraverseDirection.ADVISORS)
+        assert t.num_todo == 0
+
     @pytest.mark.asyncio
     @pytest.mark.parametrize(
         "max_records,num_records_received,num_potential_fetched_records,expected_num_fre_clear_calls,\
@@ -269,6 +294,119 @@ expected_num_fre_wait_calls,expect_exception",
             report_callback.assert_called_once_with(1, 0, 0)
 
 
+class TestRecordIdBitmap:
+    def test_add(self) -> None:
+        b = RecordIdBitmap()
+        for rid in (18231, 3, 3, 0, 8):
+            b.add(RecordId(rid))
+        assert len(b) == 4
+        assert list(b) == [0, 3, 8, 18231]
+        assert RecordId(18231) in b
+        assert RecordId(18230) not in b
+        assert RecordId(99999) not in b
+        assert -1 not in b
+        assert s.rid not in b
+
+    def test_discard(self) -> None:
+        b = RecordIdBitmap()
+        b.add(RecordId(7))
+        b.add(RecordId(8))
+        b.discard(RecordId(7))
+        b.discard(RecordId(7))
+        b.discard(RecordId(99999))
+        assert len(b) == 1
+        assert list(b) == [8]
+
+    @pytest.mark.parametrize(
+        "rid", [9999999999999999999999999, RecordIdBitmap.MAX_DENSE_ID + 1, -1]
+    )
+    def test_outside_bitmap(self, rid: int) -> None:
+        b = RecordIdBitmap()
+        b.add(RecordId(3))
+        b.add(RecordId(rid))
+        b.add(RecordId(rid))
+        assert len(b) == 2
+        assert RecordId(rid) in b
+        assert list(b) == [3, rid]
+        # Only the small ID takes space in the bitmap.
+        assert len(b.bits) == 1
+
+        b.discard(RecordId(rid))
+        assert RecordId(rid) not in b
+        assert list(b) == [3]
+
+    def test_sparse(self) -> None:
+        b = RecordIdBitmap()
+        for rid in range(0, RecordIdBitmap.MAX_DENSE_ID + 1, 1 << 20):
+            b.add(RecordId(rid))
+        assert len(b) == 16
+        assert len(b.bits) <= (RecordIdBitmap.MAX_DENSE_ID + 1) // 8
+
+
+class TestCompactLifecycleTracking:
+    @pytest.mark.asyncio
+    async def test_lifecycle(self) -> None:
+        m_report_callback = AsyncMock()
+        t = CompactLifecycleTracking(
+            [
+                TraverseItem(RecordId(1), TraverseDirection.ADVISORS),
+                TraverseItem(
+                    RecordId(2),
+                    TraverseDirection.ADVISORS | TraverseDirection.DESCENDANTS,
+                ),
+            ],
+            s.max_records,
+            m_report_callback,
+        )
+        assert t.num_todo == 2
+        assert not t.all_done
+
+        item = await t.start_next()
+        assert item == TraverseItem(
+            RecordId(2), TraverseDirection.ADVISORS | TraverseDirection.DESCENDANTS
+        )
+        assert t.doing == {2: item}
+
+        # Records that are todo, doing, or done are not added again.
+        await t.create(RecordId(1), TraverseDirection.DESCENDANTS)
+        await t.create(RecordId(2), TraverseDirection.DESCENDANTS)
+        await t.finish(RecordId(2), True)
+        await t.create(RecordId(2), TraverseDirection.DESCENDANTS)
+        assert t.num_todo == 1
+
+        await t.create(RecordId(3), TraverseDirection.DESCENDANTS)
+        assert await t.start_next() == TraverseItem(
+            RecordId(3), TraverseDirection.DESCENDANTS
+        )
+        await t.finish(RecordId(3), False)
+        assert t.num_records_received == 1
+        assert list(t.done) == [2, 3]
+        assert m_report_callback.call_args == call(1, 0, 2)
+
+        await t.purge_todo()
+        assert t.all_done
+
+    @pytest.mark.asyncio
+    async def test_large_ids(self) -> None:
+        large = RecordId(9999999999999999999999999)
+        t = CompactLifecycleTracking(
+            [TraverseItem(RecordId(1), TraverseDirection.ADVISORS)], None
+        )
+        await t.create(large, TraverseDirection.DESCENDANTS)
+        await t.create(RecordId(-1), TraverseDirection.ADVISORS)
+        await t.create(large, TraverseDirection.ADVISORS)
+        assert t.num_todo == 3
+
+        items = [await t.start_next() for _ in range(3)]
+        assert sorted(items) == [
+            TraverseItem(RecordId(-1), TraverseDirection.ADVISORS),
+            TraverseItem(RecordId(1), TraverseDirection.ADVISORS),
+            TraverseItem(large, TraverseDirection.DESCENDANTS),
+        ]
+        await t.finish(large, False)
+        assert large in t.done
+
+
 @pytest.mark.asyncio
 @pytest.mark.parametrize(
     "start_nodes,max_records,user_agent,expected_graph_records,expected_call_ids,\
@@ -357,13 +495,15 @@ expected_num_report_callbacks,expected_status",
         ),
     ],
 )
+@pytest.mark.parametrize("compact_tracking", [False, True])
 @patch("geneagrapher_core.traverse.get_record_inner")
-@patch("geneagrapher_core.traverse.build_intermediate_connector")
-@patch("geneagrapher_core.traverse.ClientSession")
+@patch("geneagrapher_core.record.build_intermediate_connector")
+@patch("geneagrapher_core.record.ClientSession")
 async def test_build_graph(
     m_client_session: MagicMock,
     m_build_intermediate_connector: MagicMock,
     m_get_record_inner: MagicMock,
+    compact_tracking: bool,
     start_nodes: List[TraverseItem],
     max_records: Optional[int],
     user_agent: Optional[str],
@@ -420,14 +560,16 @@ async def test_build_graph(
     }
     m_build_intermediate_connector.return_value = s.connector
     m_get_record_inner.side_effect = (
-        lambda record_id, client, semaphore, cache: testdata[record_id]
+        lambda record_id, client, semaphore, cache, **kwargs: testdata[record_id]
     )
 
-    expected = {
+    expected: dict[str, Any] = {
         "start_nodes": [r.id for r in start_nodes],
         "nodes": {rid: testdata[rid] for rid in expected_graph_records},
         "status": expected_status,
     }
+    if expected_status == "truncated":
+        expected["truncation_reason"] = "max_records"
 
     assert (
         await build_graph(
@@ -438,6 +580,7 @@ async def test_build_graph(
             cache=s.cache,
             record_callback=m_record_callback,
             report_callback=m_report_callback,
+            compact_tracking=compact_tracking,
         )
         == expected
     )
@@ -448,7 +591,15 @@ async def test_build_graph(
 
     assert len(m_get_record_inner.call_args_list) == len(expected_call_ids)
     for c in [
-        call(rid, m_session, m_http_semaphore, s.cache) for rid in expected_call_ids
+        call(
+            rid,
+            m_session,
+            m_http_semaphore,
+            s.cache,
+            tracer=NULL_TRACER,
+            transport=None,
+        )
+        for rid in expected_call_ids
     ]:
         assert c in m_get_record_inner.call_args_list
 
@@ -465,3 +616,358 @@ async def test_build_graph(
             call(ANY, testdata[record_id]) in m_record_callback.mock_calls
         )  # ANY is a placeholder for the TaskGroup object passed to the callback
         # function
+
+
+@pytest.mark.asyncio
+@patch("geneagrapher_core.traverse.get_record_inner")
+@patch("geneagrapher_core.record.build_intermediate_connector")
+@patch("geneagrapher_core.record.ClientSession")
+async def test_build_graph_time_budget(
+    m_client_session: MagicMock,
+    m_build_intermediate_connector: MagicMock,
+    m_get_record_inner: MagicMock,
+) -> None:
+    m_client_session.return_value.__aenter__.return_value = AsyncMock()
+
+    async def get_record_inner(
+        record_id: RecordId,
+        client: object,
+        semaphore: object,
+        cache: object,
+        **kwargs: object,
+    ) -> Record:
+        if record_id == 3:
+            # This record's fetch never finishes.
+            await asyncio.Event().wait()
+        return make_record(record_id, [3] if record_id == 1 else [])
+
+    m_get_record_inner.side_effect = get_record_inner
+
+    assert await build_graph(
+        [
+            TraverseItem(RecordId(1), TraverseDirection.ADVISORS),
+            TraverseItem(RecordId(2), TraverseDirection.ADVISORS),
+        ],
+        time_budget=0.01,
+    ) == {
+        "start_nodes": [1, 2],
+        "nodes": {1: make_record(1, [3]), 2: make_record(2)},
+        "status": "truncated",
+        "truncation_reason": "time_budget",
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "max_retries,num_failures,skip_failures,expected_failed,expected_num_calls",
+    [
+        (0, 0, False, None, 1),
+        (0, 1, True, [2], 1),
+        (1, 1, False, None, 2),
+        (1, 1, True, None, 2),
+        (2, 3, True, [2], 3),
+    ],
+)
+@patch("geneagrapher_core.traverse.asyncio.sleep")
+@patch("geneagrapher_core.traverse.get_record_inner")
+@patch("geneagrapher_core.record.build_intermediate_connector")
+@patch("geneagrapher_core.record.ClientSession")
+async def test_build_graph_failures(
+    m_client_session: MagicMock,
+    m_build_intermediate_connector: MagicMock,
+    m_get_record_inner: MagicMock,
+    m_sleep: AsyncMock,
+    max_retries: int,
+    num_failures: int,
+    skip_failures: bool,
+    expected_failed: Optional[List[int]],
+    expected_num_calls: int,
+) -> None:
+    m_client_session.return_value.__aenter__.return_value = AsyncMock()
+
+    record_1 = {"id": 1, "advisors": [2], "descendants": []}
+    record_2 = {"id": 2, "advisors": [], "descendants": []}
+    failures = [ValueError("failed")] * num_failures
+    m_get_record_inner.side_effect = [record_1] + failures + [record_2]
+
+    ggraph = await build_graph(
+        [TraverseItem(RecordId(1), TraverseDirection.ADVISORS)],
+        max_retries=max_retries,
+        skip_failures=skip_failures,
+    )
+
+    assert len(m_get_record_inner.call_args_list) == 1 + expected_num_calls
+    assert m_sleep.call_args_list == [
+        call(RETRY_BASE_DELAY * 2**attempt)
+        for attempt in range(min(num_failures, max_retries))
+    ]
+    if expected_failed is None:
+        assert ggraph == {
+            "start_nodes": [1],
+            "nodes": {1: record_1, 2: record_2},
+            "status": "complete",
+        }
+    else:
+        assert ggraph == {
+            "start_nodes": [1],
+            "nodes": {1: record_1},
+            "status": "incomplete",
+            "failed": expected_failed,
+        }
+
+
+@pytest.mark.asyncio
+@patch("geneagrapher_core.traverse.get_record_inner")
+@patch("geneagrapher_core.record.build_intermediate_connector")
+@patch("geneagrapher_core.record.ClientSession")
+async def test_build_graph_failure_raises(
+    m_client_session: MagicMock,
+    m_build_intermediate_connector: MagicMock,
+    m_get_record_inner: MagicMock,
+) -> None:
+    m_client_session.return_value.__aenter__.return_value = AsyncMock()
+    m_get_record_inner.side_effect = ValueError("failed")
+
+    with pytest.raises(ExceptionGroup):
+        await build_graph([TraverseItem(RecordId(1), TraverseDirection.ADVISORS)])
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fail_writes", [False, True])
+@patch("geneagrapher_core.traverse.get_record_inner")
+@patch("geneagrapher_core.record.build_intermediate_connector")
+@patch("geneagrapher_core.record.ClientSession")
+async def test_build_graph_write_behind(
+    m_client_session: MagicMock,
+    m_build_intermediate_connector: MagicMock,
+    m_get_record_inner: MagicMock,
+    fail_writes: bool,
+) -> None:
+    m_client_session.return_value.__aenter__.return_value = AsyncMock()
+    m_cache = AsyncMock(spec=Cache)
+    if fail_writes:
+        m_cache.set.side_effect = ValueError("failed")
+
+    record_1: Any = {"id": 1, "advisors": [2], "descendants": []}
+    record_2: Any = {"id": 2, "advisors": [], "descendants": []}
+
+    async def get_record_inner(
+        record_id: RecordId,
+        client: object,
+        semaphore: object,
+        cache: Cache,
+        **kwargs: object,
+    ) -> object:
+        assert isinstance(cache, WriteBehindCache)
+        assert cache.cache is m_cache
+        record = {1: record_1, 2: record_2}[record_id]
+        await cache.set(record_id, record)
+        return record
+
+    m_get_record_inner.side_effect = get_record_inner
+
+    ggraph = await build_graph(
+        [TraverseItem(RecordId(1), TraverseDirection.ADVISORS)],
+        cache=m_cache,
+        write_behind=True,
+    )
+
+    # All writes were made before build_graph returned.
+    assert sorted(m_cache.set.call_args_list) == [
+        call(1, record_1),
+        call(2, record_2),
+    ]
+    if fail_writes:
+        assert sorted(ggraph.pop("cache_write_failed")) == [1, 2]
+    assert ggraph == {
+        "start_nodes": [1],
+        "nodes": {1: record_1, 2: record_2},
+        "status": "complete",
+    }
+
+
+@pytest.mark.asyncio
+@patch("geneagrapher_core.traverse.get_record_inner")
+@patch("geneagrapher_core.record.ClientSession")
+async def test_build_graph_write_behind_time_budget(
+    m_client_session: MagicMock, m_get_record_inner: MagicMock
+) -> None:
+    m_client_session.return_value.__aenter__.return_value = AsyncMock()
+    record = make_record(1)
+
+    async def get_record_inner(
+        record_id: RecordId,
+        client: object,
+        semaphore: object,
+        cache: Cache,
+        **kwargs: object,
+    ) -> Record:
+        await cache.set(record_id, record)
+        return record
+
+    async def set(id: RecordId, value: Optional[Record]) -> None:
+        await asyncio.Event().wait()
+
+    m_get_record_inner.side_effect = get_record_inner
+    m_cache = AsyncMock(spec=Cache)
+    m_cache.set.side_effect = set
+
+    # The write never finishes, so waiting for it uses up the budget.
+    ggraph = await asyncio.wait_for(
+        build_graph(
+            [TraverseItem(RecordId(1), TraverseDirection.ADVISORS)],
+            cache=m_cache,
+            write_behind=True,
+            time_budget=0.1,
+        ),
+        1,
+    )
+    assert ggraph == {
+        "start_nodes": [1],
+        "nodes": {1: record},
+        "status": "complete",
+        "cache_write_failed": [1],
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("write_behind", [False, True])
+@patch("geneagrapher_core.traverse.get_record_inner")
+@patch("geneagrapher_core.record.ClientSession")
+async def test_build_graph_write_back(
+    m_client_session: MagicMock, m_get_record_inner: MagicMock, write_behind: bool
+) -> None:
+    m_client_session.return_value.__aenter__.return_value = AsyncMock()
+    record = make_record(1)
+
+    async def get_record_inner(
+        record_id: RecordId,
+        client: object,
+        semaphore: object,
+        cache: Cache,
+        **kwargs: object,
+    ) -> Record:
+        await cache.set(record_id, record)
+        return record
+
+    m_get_record_inner.side_effect = get_record_inner
+    tiers = [MemoryCache(), MemoryCache()]
+
+    await build_graph(
+        [TraverseItem(RecordId(1), TraverseDirection.ADVISORS)],
+        cache=TieredCache(list(tiers), write_policy="write-back"),
+        write_behind=write_behind,
+    )
+
+    # The lower tier was written before build_graph returned.
+    assert tiers[1].records == {1: record}
+
+
+@pytest.mark.asyncio
+@patch("geneagrapher_core.traverse.get_record_inner")
+@patch("geneagrapher_core.record.ClientSession")
+async def test_build_graph_client(
+    m_client_session: MagicMock, m_get_record_inner: MagicMock
+) -> None:
+    record = {"id": 1, "advisors": [], "descendants": []}
+    m_get_record_inner.return_value = record
+
+    ggraph = await build_graph(
+        [TraverseItem(RecordId(1), TraverseDirection.ADVISORS)], client=s.client
+    )
+
+    m_client_session.assert_not_called()
+    m_get_record_inner.assert_called_once_with(
+        RecordId(1), s.client, None, None, tracer=NULL_TRACER, transport=None
+    )
+    assert ggraph["nodes"] == {1: record}
+
+
+@pytest.mark.asyncio
+@patch("geneagrapher_core.traverse.get_record_inner")
+async def test_build_graph_memory_budget(m_get_record_inner: MagicMock) -> None:
+    records: Any = {
+        rid: {"id": rid, "advisors": [rid + 1] if rid < 5 else [], "descendants": []}
+        for rid in range(1, 6)
+    }
+
+    async def get_record_inner(
+        record_id: RecordId, *args: object, **kwargs: object
+    ) -> object:
+        return records[record_id]
+
+    m_get_record_inner.side_effect = get_record_inner
+
+    ggraph = await build_graph(
+        [TraverseItem(RecordId(1), TraverseDirection.ADVISORS)],
+        client=s.client,
+        memory_budget=2,
+    )
+
+    nodes = ggraph["nodes"]
+    assert isinstance(nodes, SpillingRecordStore)
+    assert len(nodes.memory) == 2
+    assert nodes.num_spilled == 3
+    assert dict(nodes) == records
+    # The graph serializes like one whose nodes are a dict.
+    assert json.dumps(ggraph, default=dict) == json.dumps({**ggraph, "nodes": records})
+    nodes.close()
+
+
+@pytest.mark.asyncio
+@patch("geneagrapher_core.traverse.get_record_inner")
+async def test_build_graph_memory_budget_error(m_get_record_inner: MagicMock) -> None:
+    m_get_record_inner.side_effect = ValueError("failed")
+    stores: List[SpillingRecordStore] = []
+
+    class RecordingStore(SpillingRecordStore):
+        def __init__(self, max_in_memory: int) -> None:
+            super().__init__(max_in_memory)
+            stores.append(self)
+
+    with patch("geneagrapher_core.traverse.SpillingRecordStore", RecordingStore):
+        with pytest.raises(ExceptionGroup):
+            await build_graph(
+                [TraverseItem(RecordId(1), TraverseDirection.ADVISORS)],
+                client=s.client,
+                memory_budget=2,
+            )
+
+    # The store's database was closed.
+    with pytest.raises(sqlite3.ProgrammingError):
+        stores[0].db.execute("SELECT 1")
+
+
+@pytest.mark.asyncio
+@patch("geneagrapher_core.traverse.get_record_inner")
+async def test_build_graph_tracer(m_get_record_inner: MagicMock) -> None:
+    records: Any = {
+        1: {"id": 1, "advisors": [2, 3], "descendants": []},
+        2: {"id": 2, "advisors": [3], "descendants": []},
+        3: {"id": 3, "advisors": [], "descendants": []},
+    }
+    m_get_record_inner.side_effect = lambda rid, *args, **kwargs: records[rid]
+    tracer = Tracer()
+
+    await build_graph(
+        [TraverseItem(RecordId(1), TraverseDirection.ADVISORS)],
+        client=s.client,
+        tracer=tracer,
+    )
+
+    for c in m_get_record_inner.call_args_list:
+        assert c.kwargs["tracer"] is tracer
+    events: dict[int, list[tuple[str, str]]] = {}
+    for event in tracer.events:
+        events.setdefault(event["tid"], []).append((event["name"], event["ph"]))
+    for rid in (1, 2, 3):
+        # Record 3 is an advisor of records 1 and 2, but it is only
+        # queued once.
+        assert events[rid] == [
+            ("queued", "i"),
+            ("record", "B"),
+            ("enqueue children", "B"),
+            ("enqueue children", "E"),
+            ("record", "E"),
+        ]
+    assert [e["ts"] for e in tracer.events] == sorted(e["ts"] for e in tracer.events)
@@ -0,0 +1,95 @@
+from geneagrapher_core.record import RecordId
+from geneagrapher_core.traverse import TraverseDirection, TraverseItem
+from geneagrapher_core.warm import (
+    RateLimiter,
+    parse_direction,
+    read_hotness_log,
+    warm_cache,
+)
+
+import asyncio
+import pytest
+from unittest.mock import ANY, AsyncMock, patch, sentinel as s
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter() -> None:
+    limiter = RateLimiter(50, concurrency=3)
+    loop = asyncio.get_running_loop()
+    times = []
+
+    async def acquire() -> None:
+        async with limiter:
+            times.append(loop.time())
+
+    start = loop.time()
+    await asyncio.gather(*[acquire() for _ in range(4)])
+    # Each acquisition is in its own 20 ms slot. A task can wake up
+    # late, so only the start of each slot is checked.
+    assert all(t >= start + 0.02 * i - 0.002 for (i, t) in enumerate(sorted(times)))
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_cancelled() -> None:
+    limiter = RateLimiter(1)
+    async with limiter:
+        pass
+
+    # The next slot is a second away. Cancelling the wait releases the
+    # semaphore.
+    task = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert not limiter.locked()
+
+
+@pytest.mark.parametrize(
+    "text,expected",
+    [
+        ("ADVISORS", TraverseDirection.ADVISORS),
+        ("descendants", TraverseDirection.DESCENDANTS),
+        (
+            "ADVISORS | DESCENDANTS",
+            TraverseDirection.ADVISORS | TraverseDirection.DESCENDANTS,
+        ),
+    ],
+)
+def test_parse_direction(text: str, expected: TraverseDirection) -> None:
+    assert parse_direction(text) == expected
+
+
+def test_read_hotness_log() -> None:
+    log = """# record direction
+18231 ADVISORS
+38586 DESCENDANTS
+
+18231 ADVISORS|DESCENDANTS
+38586 DESCENDANTS
+18231 ADVISORS
+38586 DESCENDANTS
+"""
+    assert read_hotness_log(log.splitlines(), 2) == [
+        TraverseItem(RecordId(38586), TraverseDirection.DESCENDANTS),
+        TraverseItem(RecordId(18231), TraverseDirection.ADVISORS),
+    ]
+
+
+@pytest.mark.asyncio
+@patch("geneagrapher_core.warm.build_graph", new_callable=AsyncMock)
+async def test_warm_cache(m_build_graph: AsyncMock) -> None:
+    items = [TraverseItem(RecordId(18231), TraverseDirection.DESCENDANTS)]
+    assert (
+        await warm_cache(items, s.cache, max_records=s.max_records)
+        == m_build_graph.return_value
+    )
+    m_build_graph.assert_called_once_with(
+        items,
+        http_semaphore=ANY,
+        max_records=s.max_records,
+        user_agent=None,
+        cache=s.cache,
+        skip_failures=True,
+    )
+    assert isinstance(m_build_graph.call_args.kwargs["http_semaphore"], RateLimiter)
@@ -0,0 +1,205 @@
+from geneagrapher_core.record import Record, RecordId
+from geneagrapher_core.traverse import TraverseDirection, TraverseItem
+from geneagrapher_core.workqueue import (
+    QueueCounts,
+    SQLiteWorkQueue,
+    collect_graph,
+    run_worker,
+    start_traversal,
+)
+
+from .conftest import make_record
+
+import asyncio
+from pathlib import Path
+import pytest
+import sqlite3
+from typing import Optional
+from unittest.mock import patch, sentinel as s
+
+A = TraverseDirection.ADVISORS
+D = TraverseDirection.DESCENDANTS
+
+
+TESTDATA: dict[int, Optional[Record]] = {
+    1: make_record(1, [3, 4], [6, 7]),
+    2: make_record(2, [3, 5], [6, 8]),
+    3: make_record(3, [], [1, 2]),
+    4: make_record(4, [], [1]),
+    5: None,
+    6: make_record(6, [1, 2], [8]),
+    7: make_record(7, [1], [9]),
+    8: make_record(8, [2], [9]),
+    9: None,
+}
+
+
+async def fake_get_record_inner(
+    record_id: RecordId,
+    client: object,
+    http_semaphore: object,
+    cache: object,
+) -> Optional[Record]:
+    await asyncio.sleep(0)
+    return TESTDATA[record_id]
+
+
+class TestSQLiteWorkQueue:
+    @pytest.mark.asyncio
+    async def test_add_and_lease(self, tmp_path: Path) -> None:
+        q = SQLiteWorkQueue(str(tmp_path / "q.db"))
+        await q.add([TraverseItem(RecordId(1), A), TraverseItem(RecordId(2), A | D)])
+        await q.add([TraverseItem(RecordId(1), D)])
+        assert await q.counts() == QueueCounts(2, 0, 0, 0)
+
+        items = await q.lease("w1", 10, 60)
+        assert sorted(items) == [
+            TraverseItem(RecordId(1), A),
+            TraverseItem(RecordId(2), A | D),
+        ]
+        assert await q.counts() == QueueCounts(0, 2, 0, 0)
+        assert await q.lease("w2", 10, 60) == []
+
+    @pytest.mark.asyncio
+    async def test_ack(self, tmp_path: Path) -> None:
+        q = SQLiteWorkQueue(str(tmp_path / "q.db"))
+        await q.add([TraverseItem(RecordId(1), A), TraverseItem(RecordId(5), A)])
+        await q.lease("w1", 10, 60)
+        await q.ack(RecordId(1), TESTDATA[1])
+        await q.ack(RecordId(5), None)
+        assert await q.counts() == QueueCounts(0, 0, 2, 1)
+        assert await q.records() == {1: TESTDATA[1]}
+
+        # Done items are not added again.
+        await q.add([TraverseItem(RecordId(1), A)])
+        assert await q.counts() == QueueCounts(0, 0, 2, 1)
+
+    @pytest.mark.asyncio
+    async def test_expired_lease(self, tmp_path: Path) -> None:
+        now = [1000.0]
+        q = SQLiteWorkQueue(str(tmp_path / "q.db"), clock=lambda: now[0])
+        await q.add([TraverseItem(RecordId(1), A)])
+        assert len(await q.lease("w1", 10, 60)) == 1
+
+        now[0] += 59
+        assert await q.lease("w2", 10, 60) == []
+
+        now[0] += 2
+        assert await q.lease("w2", 10, 60) == [TraverseItem(RecordId(1), A)]
+
+    @pytest.mark.asyncio
+    async def test_shared_file(self, tmp_path: Path) -> None:
+        q1 = SQLiteWorkQueue(str(tmp_path / "q.db"))
+        q2 = SQLiteWorkQueue(str(tmp_path / "q.db"))
+        await q1.add([TraverseItem(RecordId(1), A), TraverseItem(RecordId(2), A)])
+        leased = await q1.lease("w1", 1, 60) + await q2.lease("w2", 1, 60)
+        assert sorted(item.id for item in leased) == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_locked_file(self, tmp_path: Path) -> None:
+        q = SQLiteWorkQueue(str(tmp_path / "q.db"))
+        await q.add([TraverseItem(RecordId(1), A)])
+
+        # While another connection holds the write lock, leasing waits
+        # without blocking the event loop.
+        other = sqlite3.connect(str(tmp_path / "q.db"), isolation_level=None)
+        other.execute("BEGIN IMMEDIATE")
+        lease = asyncio.create_task(q.lease("w1", 10, 60))
+        await asyncio.sleep(0.1)
+        assert not lease.done()
+
+        other.execute("COMMIT")
+        assert await lease == [TraverseItem(RecordId(1), A)]
+        other.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("num_workers", [1, 3])
+@patch("geneagrapher_core.workqueue.get_record_inner", fake_get_record_inner)
+async def test_run_worker(tmp_path: Path, num_workers: int) -> None:
+    start_items = [
+        TraverseItem(RecordId(1), A | D),
+        TraverseItem(RecordId(2), A),
+    ]
+    path = str(tmp_path / "q.db")
+    await start_traversal(SQLiteWorkQueue(path), start_items)
+
+    retrieved = await asyncio.gather(
+        *[
+            run_worker(
+                SQLiteWorkQueue(path),
+                client=s.client,
+                worker_id=f"w{i}",
+                batch_size=2,
+                poll_interval=0,
+            )
+            for i in range(num_workers)
+        ]
+    )
+    assert sum(retrieved) == 7
+
+    ggraph = await collect_graph(SQLiteWorkQueue(path), start_items)
+    assert ggraph == {
+        "start_nodes": [1, 2],
+        "nodes": {rid: TESTDATA[rid] for rid in (1, 2, 3, 4, 6, 7, 8)},
+        "status": "complete",
+    }
+
+
+@pytest.mark.asyncio
+@patch("geneagrapher_core.workqueue.get_record_inner", fake_get_record_inner)
+async def test_run_worker_max_records(tmp_path: Path) -> None:
+    start_items = [TraverseItem(RecordId(1), A | D)]
+    q = SQLiteWorkQueue(str(tmp_path / "q.db"))
+    await start_traversal(q, start_items)
+    await run_worker(q, client=s.client, max_records=2, batch_size=1)
+
+    ggraph = await collect_graph(q, start_items, max_records=2)
+    assert len(ggraph["nodes"]) == 2
+    assert 1 in ggraph["nodes"]
+    assert ggraph["status"] == "truncated"
+    assert ggraph["truncation_reason"] == "max_records"
+
+
+@pytest.mark.asyncio
+async def test_collect_graph_overshoot(tmp_path: Path) -> None:
+    # Workers acknowledged more records than max_records. The start
+    # record and the records added first are kept, whatever their IDs.
+    q = SQLiteWorkQueue(str(tmp_path / "q.db"))
+    start_items = [TraverseItem(RecordId(100), A)]
+    await start_traversal(q, start_items)
+    await q.lease("w1", 10, 60)
+    await q.add([TraverseItem(RecordId(60), A), TraverseItem(RecordId(50), A)])
+    await q.ack(RecordId(100), make_record(100, [60, 50]))
+    assert await q.lease("w1", 10, 60) == [
+        TraverseItem(RecordId(60), A),
+        TraverseItem(RecordId(50), A),
+    ]
+    await q.ack(RecordId(50), make_record(50))
+    await q.ack(RecordId(60), make_record(60))
+    assert list(await q.records()) == [100, 60, 50]
+
+    ggraph = await collect_graph(q, start_items, max_records=2)
+    assert ggraph == {
+        "start_nodes": [100],
+        "nodes": {100: make_record(100, [60, 50]), 60: make_record(60)},
+        "status": "truncated",
+        "truncation_reason": "max_records",
+    }
+
+
+@pytest.mark.asyncio
+@patch("geneagrapher_core.workqueue.get_record_inner", fake_get_record_inner)
+async def test_run_worker_crashed_worker(tmp_path: Path) -> None:
+    # A worker leased an item and crashed without acknowledging it.
+    now = [1000.0]
+    q = SQLiteWorkQueue(str(tmp_path / "q.db"), clock=lambda: now[0])
+    start_items = [TraverseItem(RecordId(3), D)]
+    await start_traversal(q, start_items)
+    await q.lease("crashed", 10, 60)
+
+    now[0] += 61
+    await run_worker(q, client=s.client, poll_interval=0)
+    ggraph = await collect_graph(q, start_items)
+    assert set(ggraph["nodes"]) == {1, 2, 3, 6, 7, 8}
+    assert ggraph["status"] == "complete"